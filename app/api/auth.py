@@ -7,7 +7,9 @@ from fastapi.responses import RedirectResponse
 from starlette.responses import JSONResponse
 
 from app.core.config import settings
-from app.core.auth import create_spotify_oauth
+from app.core.auth import create_spotify_oauth, get_session_user, set_session_user
+from app.services.spotify import SpotifyService
+from app.services.sync import get_sync_scheduler
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -56,10 +58,19 @@ async def callback(request: Request, code: Optional[str] = None, error: Optional
         token_info = auth.get_access_token(code)
         logger.info("Successfully obtained Spotify access token")
         
-        # Store token in session
+        # Store token in session, under a new ID so one planted before login is useless
+        request.session.regenerate_id()
         request.session["access_token"] = token_info["access_token"]
         request.session["refresh_token"] = token_info["refresh_token"]
         request.session["token_expiry"] = str(token_info["expires_at"])
+        # A different account may have been logged in on this browser before
+        request.session.pop("user_id", None)
+        request.session.pop("user_token", None)
+        try:
+            profile = await SpotifyService(token_info["access_token"]).get_current_user()
+            set_session_user(request.session, profile["id"])
+        except Exception as e:
+            logger.warning(f"Could not fetch profile after login: {str(e)}")
 
         logger.info("Token info stored in session, redirecting to dashboard")
         return RedirectResponse(url="/")
@@ -72,7 +83,10 @@ async def callback(request: Request, code: Optional[str] = None, error: Optional
 
 @router.get("/logout")
 async def logout(request: Request, response: Response):
-    """Log out the user by clearing their session."""
+    """Log out the user by clearing their session and ending background syncs."""
+    user_id = get_session_user(request.session)
+    if user_id:
+        get_sync_scheduler().unregister(user_id)
     request.session.clear()
     logger.info("User logged out successfully")
     return RedirectResponse(url="/")
@@ -1,19 +1,192 @@
 """Frontend routes for the application."""
 
+import asyncio
+import hashlib
 import logging
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, Request, HTTPException
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 
-from app.services.spotify import SpotifyService
+from app.services.spotify import SpotifyService, SpotifyUnavailable
+from app.services.listening_sessions import get_listening_sessions
 from app.services.mood_analyzer import MoodAnalyzer
-from app.core.auth import create_spotify_oauth
+from app.services.sync import RECENTLY_PLAYED_NAMESPACE, get_sync_scheduler, store_recent_plays
+from app.core.auth import create_spotify_oauth, get_session_user, set_session_user
+from app.core.cache import get_cache
 from app.core.config import settings
+from app.core.lifecycle import background_tasks
+from app.core.metrics import DASHBOARD_DEGRADED
+from app.core.pagination import paginate
+from app.core.static_assets import StaticAssets
+from app.core.templating import TemplateRenderer
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
-templates = Jinja2Templates(directory="app/frontend/templates")
+
+# Recently played tracks the dashboard analyzes
+DASHBOARD_RECENT_TRACKS = 20
+
+# Listening sessions the dashboard shows
+DASHBOARD_SESSIONS = 5
+
+# Cache namespace of each user's last dashboard, served while Spotify is down
+DASHBOARD_NAMESPACE = "dashboards"
+templates = TemplateRenderer(
+    directory="app/frontend/templates",
+    bytecode_cache_dir=settings.TEMPLATE_BYTECODE_CACHE_DIR,
+    auto_reload=not settings.is_production,
+    fragment_cache_size=settings.FRAGMENT_CACHE_SIZE,
+    fragment_cache_ttl=settings.FRAGMENT_CACHE_TTL
+)
+static_assets = StaticAssets(
+    directory="app/frontend/static",
+    prefix="/static",
+    max_age=settings.STATIC_MAX_AGE
+)
+templates.env.globals["static_url"] = static_assets.url
+
+
+def _summarize_track(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a recently-played item to the fields the dashboard renders.
+
+    Spotify play history items carry the full track object (album, markets,
+    external ids and so on). Only a handful of fields are shown, so the rest
+    is dropped before the data reaches the template.
+
+    Args:
+        item: Play history item from Spotify
+
+    Returns:
+        Dict[str, Any]: Track summary
+    """
+    track = item.get("track", item)
+    artists = track.get("artists") or [{}]
+    images = (track.get("album") or {}).get("images") or []
+    return {
+        "id": track.get("id"),
+        "name": track.get("name"),
+        "artist": artists[0].get("name"),
+        # Spotify lists images largest first; the dashboard shows a thumbnail
+        "image_url": images[-1].get("url") if images else None,
+        "played_at": item.get("played_at"),
+    }
+
+async def _record_plays(spotify: SpotifyService, items: List[Dict[str, Any]]) -> None:
+    """Keep recently played tracks in the user's play history and mood statistics."""
+    profile = await spotify.get_current_user()
+    await store_recent_plays(spotify, profile["id"], items, profile.get("country"))
+
+def _format_time(played_at_ms: int) -> str:
+    return datetime.fromtimestamp(played_at_ms / 1000, timezone.utc).strftime("%Y-%m-%d %H:%M")
+
+async def _listening_sessions(user_id: Optional[str]) -> List[Dict[str, Any]]:
+    """Return the user's latest listening sessions with their mood arcs, as rendered.
+
+    Each session's ``arc`` is the average mood of each stretch of steady
+    mood, in percent, None where no play was scored.
+    """
+    if not user_id:
+        return []
+    try:
+        sessions = await asyncio.to_thread(get_listening_sessions().get, user_id, DASHBOARD_SESSIONS)
+    except Exception as e:
+        logger.warning(f"Could not segment listening sessions: {str(e)}")
+        return []
+    return [
+        {
+            "start": _format_time(session["start"]),
+            "end": _format_time(session["end"])[-5:],
+            "plays": session["plays"],
+            "mood": round(session["mood"] * 100) if session["mood"] is not None else None,
+            "arc": [
+                round(segment["mood"] * 100) if segment["mood"] is not None else None
+                for segment in session["segments"]
+            ],
+        }
+        for session in sessions
+    ]
+
+async def _recent_tracks(request: Request, spotify: SpotifyService) -> List[Dict[str, Any]]:
+    """Return the user's recently played tracks, synced ahead of time when possible.
+
+    The user is registered with the sync scheduler, which keeps their
+    recently played tracks cached; only a cache miss, e.g. on a user's first
+    visit, fetches them from Spotify.
+
+    Raises:
+        SpotifyUnavailable: If the tracks are not cached and Spotify is
+            down, slow or rate limiting
+    """
+    user_id = get_session_user(request.session)
+    try:
+        if not user_id:
+            user_id = (await spotify.get_current_user())["id"]
+            set_session_user(request.session, user_id)
+        if settings.SYNC_MODE != "off":
+            get_sync_scheduler().register(
+                user_id,
+                spotify.access_token,
+                request.session.get("refresh_token"),
+                request.session.get("token_expiry")
+            )
+        cached = await get_cache().get(user_id, namespace=RECENTLY_PLAYED_NAMESPACE)
+        if cached is not None:
+            return cached[:DASHBOARD_RECENT_TRACKS]
+    except Exception as e:
+        logger.warning(f"Could not use synced tracks: {str(e)}")
+
+    try:
+        recent_tracks = await spotify.fetch_recently_played(DASHBOARD_RECENT_TRACKS)
+    except SpotifyUnavailable:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching recent tracks: {str(e)}")
+        return []
+    if recent_tracks:
+        background_tasks.spawn(_record_plays(spotify, recent_tracks), name="record-plays")
+    return recent_tracks
+
+async def _degraded_dashboard(request: Request, cursor: Optional[str], error: SpotifyUnavailable):
+    """Render the user's last dashboard, marked stale, while Spotify is unavailable.
+
+    Falls back to the error page, with Spotify's status, if there is none.
+    """
+    user_id = get_session_user(request.session)
+    snapshot = await get_cache().get(user_id, namespace=DASHBOARD_NAMESPACE) if user_id else None
+    if snapshot is None:
+        DASHBOARD_DEGRADED.labels("error").inc()
+        return templates.TemplateResponse(
+            "error.html",
+            {
+                "request": request,
+                "error": "Spotify is unavailable right now, please try again in a few minutes"
+            },
+            status_code=error.status_code,
+            headers=error.headers
+        )
+    DASHBOARD_DEGRADED.labels("stale").inc()
+    logger.warning(f"Serving stale dashboard from {snapshot['generated_at']}: {error.detail}")
+    try:
+        tracks_page = paginate(snapshot["recent_tracks"], cursor, settings.DASHBOARD_TRACKS_PAGE_SIZE)
+    except ValueError:
+        tracks_page = paginate(snapshot["recent_tracks"], None, settings.DASHBOARD_TRACKS_PAGE_SIZE)
+    return templates.StreamingTemplateResponse(
+        "dashboard.html",
+        {
+            "request": request,
+            "user_key": hashlib.sha256(request.session["access_token"].encode()).hexdigest()[:16],
+            "current_mood": snapshot["current_mood"],
+            "recent_tracks": tracks_page.items,
+            "tracks_cursor": cursor,
+            "tracks_next_cursor": tracks_page.next_cursor,
+            "trend_data": snapshot["trend_data"],
+            "recommendations": snapshot["recommendations"],
+            "sessions": snapshot.get("sessions", []),
+            "stale": True,
+            "stale_since": snapshot["generated_at"]
+        }
+    )
 
 @router.get("/", response_class=HTMLResponse)
 async def index(request: Request):
@@ -42,8 +215,13 @@ async def index(request: Request):
         )
 
 @router.get("/dashboard", response_class=HTMLResponse)
-async def dashboard(request: Request):
-    """Render the dashboard page."""
+async def dashboard(request: Request, cursor: Optional[str] = None):
+    """Render the dashboard page.
+
+    Args:
+        request: FastAPI request object
+        cursor: Cursor for the page of recent tracks to show
+    """
     try:
         # Check if user is logged in
         access_token = request.session.get("access_token")
@@ -59,7 +237,10 @@ async def dashboard(request: Request):
         mood_analyzer = MoodAnalyzer()
 
         # Get user's recent tracks
-        recent_tracks = await spotify.get_recently_played_tracks()
+        try:
+            recent_tracks = await _recent_tracks(request, spotify)
+        except SpotifyUnavailable as e:
+            return await _degraded_dashboard(request, cursor, e)
         if not recent_tracks:
             logger.warning("No recent tracks found")
             recent_tracks = []
@@ -70,15 +251,44 @@ async def dashboard(request: Request):
         recommendations = mood_analyzer.get_recommendations(current_mood)
 
         logger.info(f"Generated mood analysis: {current_mood['primary_mood']}")
+
+        user_id = get_session_user(request.session)
+        sessions = await _listening_sessions(user_id)
+        if user_id:
+            # Kept for degraded mode
+            await get_cache().set(
+                user_id,
+                {
+                    "recent_tracks": [_summarize_track(item) for item in recent_tracks],
+                    "current_mood": current_mood,
+                    "trend_data": trend_data,
+                    "recommendations": recommendations,
+                    "sessions": sessions,
+                    "generated_at": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC"),
+                },
+                expire=settings.DASHBOARD_STALE_TTL,
+                namespace=DASHBOARD_NAMESPACE
+            )
+
+        try:
+            tracks_page = paginate(recent_tracks, cursor, settings.DASHBOARD_TRACKS_PAGE_SIZE)
+        except ValueError:
+            tracks_page = paginate(recent_tracks, None, settings.DASHBOARD_TRACKS_PAGE_SIZE)
         
-        return templates.TemplateResponse(
+        return templates.StreamingTemplateResponse(
             "dashboard.html",
             {
                 "request": request,
+                # Scopes cached per-user fragments without exposing the token
+                "user_key": hashlib.sha256(access_token.encode()).hexdigest()[:16],
                 "current_mood": current_mood,
-                "recent_tracks": recent_tracks,
+                "recent_tracks": [_summarize_track(item) for item in tracks_page.items],
+                "tracks_cursor": cursor,
+                "tracks_next_cursor": tracks_page.next_cursor,
                 "trend_data": trend_data,
-                "recommendations": recommendations
+                "recommendations": recommendations,
+                "sessions": sessions,
+                "stale": False
             }
         )
     except Exception as e:
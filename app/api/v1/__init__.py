@@ -1,7 +1,8 @@
 """API v1 router."""
 
 from fastapi import APIRouter
-from app.api.v1 import mood
+from app.api.v1 import export, mood
 
 api_router = APIRouter()
 api_router.include_router(mood.router, prefix="/mood", tags=["mood"])
+api_router.include_router(export.router, prefix="/export", tags=["export"])
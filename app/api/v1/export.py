@@ -0,0 +1,65 @@
+"""API routes for exporting listening history."""
+
+import hmac
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.services.spotify import SpotifyService
+
+router = APIRouter()
+
+@router.get("/plays")
+async def export_plays(
+    request: Request,
+    format: Literal["parquet", "arrow"] = "parquet",
+    scope: Literal["me", "all"] = "me",
+    x_export_key: Optional[str] = Header(None)
+) -> StreamingResponse:
+    """Download play history with audio features and mood scores.
+    
+    The file is produced while it is sent, one row group or record batch
+    at a time, so the download size does not affect server memory.
+    
+    Args:
+        request: FastAPI request object
+        format: ``parquet``, or ``arrow`` for an Arrow IPC stream
+        scope: ``me`` for the logged-in user, ``all`` for every user
+        x_export_key: Must match ``settings.EXPORT_API_KEY`` for ``all``
+        
+    Returns:
+        StreamingResponse: The export file
+        
+    Raises:
+        HTTPException: If the caller may not export the requested scope
+    """
+    if scope == "all":
+        if not settings.EXPORT_API_KEY or not hmac.compare_digest(x_export_key or "", settings.EXPORT_API_KEY):
+            raise HTTPException(status_code=403, detail="All-user exports require a valid export key")
+    else:
+        access_token = request.session.get("access_token")
+        if not access_token:
+            raise HTTPException(status_code=401, detail="Not logged in")
+
+    # Imported here so NumPy and PyArrow only load when an export is requested
+    from app.services.export import EXPORT_EXTENSIONS, EXPORT_FORMATS, PlayExporter
+    from app.services.features import get_feature_store
+    from app.services.history import get_play_history
+
+    history = get_play_history()
+    if scope == "all":
+        user_ids: List[str] = history.users()
+    else:
+        profile = await SpotifyService(access_token).get_current_user()
+        user_ids = [profile["id"]]
+
+    exporter = PlayExporter(history, get_feature_store(), chunk_size=settings.EXPORT_CHUNK_SIZE)
+    filename = f"plays-{scope}.{EXPORT_EXTENSIONS[format]}"
+    # A sync iterator, so Starlette runs the encoding in its thread pool
+    return StreamingResponse(
+        exporter.iter_bytes(user_ids, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -1,37 +1,217 @@
 """API routes for mood analysis."""
 
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Literal, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query
 from starlette.requests import Request
 
+from app.core.cache import get_cache
+from app.core.pagination import cursor_snapshot, paginate, parse_fields
+from app.core.responses import LAYOUT_ROWS, TRACK_FIELDS, render_analysis
 from app.schemas.mood import MoodAnalysis
+from app.services.mood_aggregates import GLOBAL_COHORT, get_mood_aggregates, region_cohort
+from app.services.listening_sessions import get_listening_sessions
 from app.services.mood_analyzer import MoodAnalyzer
+from app.services.mood_stats import get_mood_stats
+from app.services.spotify import SpotifyService
 from app.core.config import settings
 
 router = APIRouter()
+
+# Cache namespace of analyses being paged through
+ANALYSIS_NAMESPACE = "analyses"
 mood_analyzer = MoodAnalyzer(debug=True)  # TODO: Use settings.DEBUG
 
 @router.get("/recent", response_model=MoodAnalysis)
 async def analyze_recent_mood(
     request: Request,
-    limit: Optional[int] = 50
+    limit: Optional[int] = 50,
+    layout: Literal["rows", "columnar"] = LAYOUT_ROWS,
+    cursor: Optional[str] = None,
+    page_size: int = Query(settings.TRACKS_PAGE_SIZE, ge=1, le=settings.TRACKS_MAX_PAGE_SIZE),
+    fields: Optional[str] = None
 ) -> MoodAnalysis:
     """Analyze mood from recent tracks.
     
+    The analysis is rendered directly to JSON, skipping FastAPI's
+    re-validation against ``response_model``. Tracks are paginated; the
+    response carries ``next_cursor`` and ``total_tracks``. An analysis with
+    more than one page is cached, and later pages are read from it, so all
+    pages belong to the same analysis.
+    
     Args:
         request: FastAPI request object
         limit: Maximum number of tracks to analyze
+        layout: ``rows`` for one object per track, ``columnar`` for parallel arrays
+        cursor: Cursor from a previous page
+        page_size: Maximum number of tracks per page
+        fields: Comma-separated track fields to include, e.g. ``mood_score,valence``
         
     Returns:
         MoodAnalysis: Analysis results including mood scores and trends
         
     Raises:
-        HTTPException: If mood analysis fails
+        HTTPException: If the cursor or fields are invalid, the cursor
+            has expired, or mood analysis fails
     """
     try:
-        return await mood_analyzer.analyze_debug_data()
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to analyze mood: {str(e)}"
-        )
+        selected_fields = parse_fields(fields, TRACK_FIELDS)
+        snapshot = cursor_snapshot(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if snapshot is not None:
+        cached = await get_cache().get(snapshot, namespace=ANALYSIS_NAMESPACE)
+        if cached is None:
+            raise HTTPException(status_code=400, detail="Cursor expired, start again from the first page")
+        analysis = MoodAnalysis.model_validate(cached)
+    else:
+        try:
+            analysis = await mood_analyzer.analyze_debug_data()
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to analyze mood: {str(e)}"
+            )
+        if len(analysis.tracks) > page_size:
+            snapshot = uuid.uuid4().hex
+            await get_cache().set(
+                snapshot,
+                analysis.model_dump(),
+                expire=settings.ANALYSIS_SNAPSHOT_TTL,
+                namespace=ANALYSIS_NAMESPACE
+            )
+
+    try:
+        page = paginate(analysis.tracks, cursor, page_size, snapshot)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return render_analysis(analysis, layout, selected_fields, page)
+
+@router.get("/stats")
+async def get_mood_statistics(
+    request: Request,
+    days: int = Query(7, ge=1, le=366)
+) -> Dict[str, Any]:
+    """Return the logged-in user's mood statistics.
+    
+    Statistics are maintained incrementally as plays are recorded, so this
+    reads one all-time bucket and one bucket per day of the window.
+    
+    Args:
+        request: FastAPI request object
+        days: Number of UTC days in the recent window, today included
+        
+    Returns:
+        Dict[str, Any]: ``all_time`` and ``recent`` statistics: plays,
+            average mood, mood volatility (standard deviation), moving
+            average, average energy and mood percentiles
+        
+    Raises:
+        HTTPException: If the user is not logged in
+    """
+    access_token = request.session.get("access_token")
+    if not access_token:
+        raise HTTPException(status_code=401, detail="Not logged in")
+    profile = await SpotifyService(access_token).get_current_user()
+    store = get_mood_stats()
+    return {
+        "all_time": store.get(profile["id"]).summary(),
+        "recent": {"days": days, **store.get_days(profile["id"], days).summary()},
+    }
+
+@router.get("/sessions")
+async def get_listening_sessions_with_mood(
+    request: Request,
+    limit: int = Query(20, ge=1, le=500)
+) -> Dict[str, Any]:
+    """Return the logged-in user's listening sessions and their mood arcs.
+    
+    Finished sessions are cached, so only plays of the latest session are
+    segmented again.
+    
+    Args:
+        request: FastAPI request object
+        limit: Maximum number of sessions, newest first
+        
+    Returns:
+        Dict[str, Any]: ``sessions``, each with start and end play times in
+            epoch milliseconds, plays, average mood and ``segments`` of
+            steady mood
+        
+    Raises:
+        HTTPException: If the user is not logged in
+    """
+    access_token = request.session.get("access_token")
+    if not access_token:
+        raise HTTPException(status_code=401, detail="Not logged in")
+    profile = await SpotifyService(access_token).get_current_user()
+    sessions = await asyncio.to_thread(get_listening_sessions().get, profile["id"], limit)
+    return {"sessions": sessions}
+
+def _aggregates_window(days: int) -> Tuple[datetime, datetime]:
+    """Return the start and end of the last ``days`` whole UTC days, today included."""
+    end = datetime.now(timezone.utc)
+    start = (end - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return start, end
+
+@router.get("/aggregates")
+async def get_mood_aggregate_series(
+    cohort: str = GLOBAL_COHORT,
+    resolution: Literal["hour", "day"] = "day",
+    days: int = Query(7, ge=1, le=366)
+) -> Dict[str, Any]:
+    """Return a cohort's mood index over time.
+    
+    Aggregates are rolled up as plays are recorded and the response is
+    cached briefly, so this never scans play histories.
+    
+    Args:
+        cohort: ``global`` or ``region:<CC>``, e.g. ``region:SE``
+        resolution: ``hour`` or ``day`` buckets
+        days: Number of UTC days in the window, today included
+        
+    Returns:
+        Dict[str, Any]: Plays, distinct users, overall mood, average energy,
+            mood volatility and percentiles for the whole window and for
+            each bucket; aggregates of too few users are only marked
+            ``suppressed``
+        
+    Raises:
+        HTTPException: If the cohort is not global or a region with plays
+    """
+    aggregates = get_mood_aggregates()
+    known = [region_cohort(region) for region in aggregates.regions()]
+    if cohort != GLOBAL_COHORT and cohort not in known:
+        raise HTTPException(status_code=400, detail=f"Unknown cohort {cohort!r}")
+    start, end = _aggregates_window(days)
+
+    async def compute() -> Dict[str, Any]:
+        return aggregates.series(cohort, resolution, start, end)
+
+    key = f"{cohort}:{resolution}:{days}"
+    return await get_cache().get_or_compute(
+        key, compute, expire=settings.MOOD_AGGREGATES_CACHE_TTL, namespace="aggregates"
+    )
+
+@router.get("/aggregates/regions")
+async def get_mood_aggregates_by_region(days: int = Query(7, ge=1, le=366)) -> Dict[str, Any]:
+    """Return each region's mood index over a window of whole UTC days.
+    
+    Args:
+        days: Number of UTC days in the window, today included
+        
+    Returns:
+        Dict[str, Any]: ``days`` and ``regions``, mapping country codes to
+            their aggregates; regions with too few users are left out
+    """
+    start, end = _aggregates_window(days)
+
+    async def compute() -> Dict[str, Any]:
+        return {"days": days, "regions": get_mood_aggregates().by_region(start, end)}
+
+    return await get_cache().get_or_compute(
+        f"regions:{days}", compute, expire=settings.MOOD_AGGREGATES_CACHE_TTL, namespace="aggregates"
+    )
@@ -0,0 +1,147 @@
+"""Command-line tasks for operating MindBeat.
+
+    python -m app.cli build-catalog --output data/features.catalog
+    python -m app.cli export-plays --format parquet --output plays.parquet
+    python -m app.cli backfill --user USER_ID --workers 4 my_spotify_data/
+    python -m app.cli sync-worker
+"""
+
+import argparse
+import logging
+import os
+import sys
+from typing import List
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def build_catalog(args: argparse.Namespace) -> int:
+    """Write the features in the Redis feature cache to the on-disk catalog."""
+    from app.services.feature_catalog import FeatureCatalogBuilder, open_catalog
+    from app.services.features import get_feature_store
+
+    builder = FeatureCatalogBuilder()
+    if not args.rebuild:
+        existing = open_catalog(args.output)
+        if existing is not None:
+            with existing:
+                print(f"Appending to {args.output} ({builder.add_catalog(existing)} tracks)")
+    added = builder.add_many(get_feature_store().iter_cached(args.batch_size))
+    print(f"Read {added} tracks from the feature cache")
+    print(f"Wrote {builder.write(args.output)} tracks to {args.output}")
+    return 0
+
+
+def export_plays(args: argparse.Namespace) -> int:
+    """Export play history with features and mood scores to a file."""
+    from app.services.export import PlayExporter
+    from app.services.features import get_feature_store
+    from app.services.history import get_play_history
+
+    history = get_play_history()
+    user_ids = args.user or history.users()
+    exporter = PlayExporter(history, get_feature_store(), chunk_size=args.chunk_size)
+    rows = exporter.write(args.output, user_ids, args.format)
+    print(f"Exported {rows} plays of {len(user_ids)} users to {args.output}")
+    return 0
+
+
+def backfill(args: argparse.Namespace) -> int:
+    """Import Spotify extended streaming history files."""
+    from app.services.backfill import run_backfill
+
+    results = run_backfill(
+        args.paths,
+        workers=args.workers,
+        user_id=args.user,
+        access_token=args.access_token,
+        batch_size=args.batch_size,
+        min_ms_played=args.min_ms_played
+    )
+    failed = 0
+    for result in results:
+        if result.error:
+            failed += 1
+            print(f"{result.path}: failed: {result.error}")
+        else:
+            print(
+                f"{result.path}: {result.records} records, {result.new_plays} new plays, "
+                f"{result.duplicates} duplicates, {result.skipped} skipped, "
+                f"{result.tracks_without_features} of {result.tracks} tracks without features"
+            )
+    print(f"Imported {sum(r.new_plays for r in results)} new plays from {len(results) - failed} files")
+    return 1 if failed else 0
+
+
+def sync_worker(args: argparse.Namespace) -> int:
+    """Run the recently played sync scheduler until interrupted."""
+    import asyncio
+
+    from app.core.http import close_http_session, open_http_session
+    from app.core.redis_client import InMemoryRedis, get_redis_client
+    from app.services.features import get_feature_store
+    from app.services.sync import get_sync_scheduler
+
+    if isinstance(get_redis_client(), InMemoryRedis):
+        print("The in-memory Redis stand-in is per process; set REDIS_URL or use SYNC_MODE=in-process")
+        return 1
+
+    async def run() -> None:
+        open_http_session(settings.HTTP_POOL_SIZE)
+        features = get_feature_store()
+        flushing = asyncio.create_task(
+            features.run_hot_flusher(settings.FEATURE_HOT_FLUSH_INTERVAL, settings.FEATURE_HOT_TRIM_INTERVAL)
+        )
+        try:
+            await get_sync_scheduler().run()
+        finally:
+            features.stop()
+            await flushing
+            await close_http_session()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv: List[str] = None) -> int:
+    """Parse arguments and run a command."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    catalog = commands.add_parser("build-catalog", help="Build the memory-mapped feature catalog")
+    catalog.add_argument("--output", default=settings.FEATURE_CATALOG_PATH or "data/features.catalog")
+    catalog.add_argument("--rebuild", action="store_true", help="Ignore the existing catalog")
+    catalog.add_argument("--batch-size", type=int, default=500, help="Keys read per Redis round trip")
+    catalog.set_defaults(handler=build_catalog)
+
+    export = commands.add_parser("export-plays", help="Export play history as Parquet or Arrow")
+    export.add_argument("--output", required=True)
+    export.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    export.add_argument("--user", action="append", help="User to export, repeatable; all users by default")
+    export.add_argument("--chunk-size", type=int, default=settings.EXPORT_CHUNK_SIZE, help="Plays per row group")
+    export.set_defaults(handler=export_plays)
+
+    history = commands.add_parser("backfill", help="Import extended streaming history files")
+    history.add_argument("paths", nargs="+", help="Files or directories of Streaming_History_Audio*.json")
+    history.add_argument("--user", help="Spotify user ID of the plays; each record's username by default")
+    history.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1), help="Files imported in parallel")
+    history.add_argument("--access-token", help="Spotify token for fetching uncached audio features")
+    history.add_argument("--batch-size", type=int, default=settings.BACKFILL_BATCH_SIZE)
+    history.add_argument("--min-ms-played", type=int, default=settings.BACKFILL_MIN_MS_PLAYED)
+    history.set_defaults(handler=backfill)
+
+    sync = commands.add_parser("sync-worker", help="Sync active users' recently played tracks")
+    sync.set_defaults(handler=sync_worker)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,81 @@
 """Authentication utilities."""
-from typing import Optional, Dict, Any
+import base64
+import hashlib
+from typing import TYPE_CHECKING, Optional, Dict, Any
 from datetime import datetime, timedelta
-import spotipy
 
 from app.core.config import settings
 
-def create_spotify_oauth() -> spotipy.oauth2.SpotifyOAuth:
-    """Create a SpotifyOAuth instance."""
-    return spotipy.oauth2.SpotifyOAuth(
+if TYPE_CHECKING:
+    from spotipy.oauth2 import SpotifyOAuth
+
+def create_spotify_oauth() -> "SpotifyOAuth":
+    """Create a SpotifyOAuth instance.
+
+    spotipy (and requests with it) is imported here rather than at module
+    level, since it is only needed for the OAuth flow.
+    """
+    from spotipy.oauth2 import SpotifyOAuth
+
+    return SpotifyOAuth(
         client_id=settings.SPOTIFY_CLIENT_ID,
         client_secret=settings.SPOTIFY_CLIENT_SECRET,
         redirect_uri=settings.get_spotify_redirect_uri(),
         scope="user-read-recently-played user-read-private user-read-email"
     )
 
+def token_fingerprint(access_token: str) -> str:
+    """Return a short hash identifying an access token, safe to store."""
+    return hashlib.sha256(access_token.encode()).hexdigest()[:16]
+
+class TokenCipher:
+    """Encrypts tokens kept outside the session, e.g. for scheduled syncs.
+
+    The key is derived from ``SECRET_KEY``, so rotating it makes stored
+    tokens unreadable rather than exposing them.
+    """
+
+    def __init__(self, secret: str):
+        """Initialize the cipher.
+
+        Args:
+            secret: Application secret the encryption key is derived from
+        """
+        # Imported here so importing the app does not load cryptography
+        from cryptography.fernet import Fernet
+
+        key = hashlib.sha256(f"mindbeat-tokens:{secret}".encode()).digest()
+        self._fernet = Fernet(base64.urlsafe_b64encode(key))
+
+    def encrypt(self, token: str) -> str:
+        """Return the encrypted token."""
+        return self._fernet.encrypt(token.encode()).decode()
+
+    def decrypt(self, encrypted: str) -> Optional[str]:
+        """Return the token, or None if it was not encrypted with this key."""
+        from cryptography.fernet import InvalidToken
+
+        try:
+            return self._fernet.decrypt(encrypted.encode()).decode()
+        except InvalidToken:
+            return None
+
+def set_session_user(session: Dict[str, Any], user_id: str) -> None:
+    """Record the Spotify user the session's current access token belongs to."""
+    session["user_id"] = user_id
+    session["user_token"] = token_fingerprint(session["access_token"])
+
+def get_session_user(session: Dict[str, Any]) -> Optional[str]:
+    """Return the Spotify user ID of the session's current access token, if known.
+
+    A user ID recorded for another token, e.g. of an account that logged in
+    earlier in the same browser, is never returned.
+    """
+    access_token = session.get("access_token")
+    if not access_token or session.get("user_token") != token_fingerprint(access_token):
+        return None
+    return session.get("user_id")
+
 def get_token_info(session: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """Get token info from session."""
     access_token = session.get("access_token")
@@ -1,27 +1,155 @@
 """Redis cache module."""
 
-from typing import Optional, Any
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+import asyncio
 import json
-from redis import Redis
+import logging
+import math
+import random
+import re
+import threading
+import time
+import uuid
 from app.core.config import settings
+from app.core.local_cache import MISS, LocalCache
+from app.core.metrics import CACHE_REQUESTS
+from app.core.redis_client import get_redis_client
+from app.core.tracing import span
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NAMESPACE = "default"
+_INVALID_NAMESPACE = re.compile(r"[{}*?\[\]\\]")
+
+_CACHE_HITS = CACHE_REQUESTS.labels("hit")
+_CACHE_MISSES = CACHE_REQUESTS.labels("miss")
+_CACHE_ERRORS = CACHE_REQUESTS.labels("error")
+
+
+class Codec(NamedTuple):
+    """Serialization used for cached values."""
+
+    name: str
+    dumps: Callable[[Any], str]
+    loads: Callable[[str], Any]
+
+
+CODECS: Dict[str, Codec] = {
+    "json": Codec("json", json.dumps, json.loads),
+}
+if orjson is not None:
+    # Both codecs produce JSON, so values written by one can be read by the other
+    CODECS["orjson"] = Codec("orjson", lambda value: orjson.dumps(value).decode(), orjson.loads)
+
+
+def jittered_ttl(expire: int, jitter: float) -> int:
+    """Spread a TTL uniformly by up to ``jitter`` (a fraction) either way.
+
+    Entries written together, e.g. after a deploy, then expire at different
+    times instead of all at once.
+    """
+    if jitter <= 0:
+        return expire
+    return max(1, round(expire * random.uniform(1 - jitter, 1 + jitter)))
+
 
 class RedisCache:
-    """Redis cache manager."""
-    
-    def __init__(self):
-        """Initialize Redis connection."""
-        self.redis = Redis(
-            host=settings.REDIS_HOST,
-            port=settings.REDIS_PORT,
-            password=settings.REDIS_PASSWORD,
-            decode_responses=True
-        )
+    """Redis cache manager.
+
+    Keys live in namespaces, each with a generation counter stored in Redis,
+    under a cache-wide epoch::
+
+        cache:{epoch}:{namespace}:{generation}:{key}
+
+    Bumping a generation (``invalidate_namespace``) or the epoch (``clear``)
+    makes every older key unreachable in O(1); the old keys are queued for
+    ``CacheSweeper`` to delete in the background. Nothing outside the
+    ``cache:`` prefix is touched, so sessions sharing the database survive.
+
+    ``get_or_compute`` protects expensive entries against stampedes.
+    """
+
+    def __init__(
+        self,
+        codec: Optional[str] = None,
+        prefix: str = "cache",
+        generation_ttl: float = settings.CACHE_GENERATION_TTL,
+        ttl_jitter: float = settings.CACHE_TTL_JITTER
+    ):
+        """Initialize Redis connection.
         
-    async def get(self, key: str) -> Optional[Any]:
+        Args:
+            codec: Name of the codec in ``CODECS`` used for values,
+                ``settings.CACHE_CODEC`` when None
+            prefix: Prefix of every key the cache owns
+            generation_ttl: Seconds generations are memoized in process, the
+                longest another worker may read an invalidated namespace
+            ttl_jitter: Default fraction by which TTLs are randomly spread
+        """
+        self.redis = get_redis_client()
+        self.codec = CODECS[codec or settings.CACHE_CODEC]
+        self.prefix = prefix
+        self.generation_ttl = generation_ttl
+        self.ttl_jitter = ttl_jitter
+        self.epoch_key = f"{prefix}:meta:epoch"
+        self.sweep_key = f"{prefix}:meta:sweep"
+        # Namespace to (expires_at, epoch, generation)
+        self._generations: Dict[str, Tuple[float, int, int]] = {}
+
+    def _generation_key(self, namespace: str) -> str:
+        return f"{self.prefix}:meta:gen:{{{namespace}}}"
+
+    def _current_generation(self, namespace: str) -> Tuple[int, int]:
+        memo = self._generations.get(namespace)
+        now = time.monotonic()
+        if memo is not None and memo[0] > now:
+            return memo[1], memo[2]
+        epoch, generation = self.redis.mget([self.epoch_key, self._generation_key(namespace)])
+        epoch, generation = int(epoch or 0), int(generation or 0)
+        self._generations[namespace] = (now + self.generation_ttl, epoch, generation)
+        return epoch, generation
+
+    def resolve(self, key: str, namespace: str = DEFAULT_NAMESPACE) -> str:
+        """Return the Redis key of ``key`` in the namespace's current generation.
+
+        Raises:
+            ValueError: If the namespace contains ``}`` or glob characters
+        """
+        if _INVALID_NAMESPACE.search(namespace):
+            raise ValueError(f"Invalid cache namespace: {namespace!r}")
+        epoch, generation = self._current_generation(namespace)
+        # Braces keep "a" generation 1 from matching the patterns of "a:1"
+        return f"{self.prefix}:{epoch}:{{{namespace}}}:{generation}:{key}"
+        
+    def _read(self, key: str) -> Optional[str]:
+        """Read a raw value, counting hits and misses; raises on Redis errors."""
+        try:
+            with span("cache"):
+                value = self.redis.get(key)
+        except Exception:
+            _CACHE_ERRORS.inc()
+            raise
+        if value is None:
+            _CACHE_MISSES.inc()
+        else:
+            _CACHE_HITS.inc()
+        return value
+
+    async def get(self, key: str, namespace: str = DEFAULT_NAMESPACE) -> Optional[Any]:
         """Get value from cache."""
         try:
-            value = self.redis.get(key)
-            return json.loads(value) if value else None
+            value = self._read(self.resolve(key, namespace))
+        except Exception:
+            return None
+        if value is None:
+            return None
+        try:
+            return self.codec.loads(value)
         except Exception:
             return None
             
@@ -29,31 +157,408 @@ class RedisCache:
         self,
         key: str,
         value: Any,
-        expire: int = settings.CACHE_TTL
+        expire: int = settings.CACHE_TTL,
+        namespace: str = DEFAULT_NAMESPACE,
+        jitter: Optional[float] = None
     ) -> bool:
-        """Set value in cache with expiration."""
+        """Set value in cache with expiration.
+        
+        Args:
+            key: Cache key
+            value: JSON-serializable value
+            expire: TTL in seconds, before jitter
+            namespace: Namespace of the key
+            jitter: Fraction by which to spread the TTL, ``self.ttl_jitter`` when None
+        """
         try:
-            return self.redis.setex(
-                key,
-                expire,
-                json.dumps(value)
-            )
+            with span("cache"):
+                return self.redis.setex(
+                    self.resolve(key, namespace),
+                    jittered_ttl(expire, self.ttl_jitter if jitter is None else jitter),
+                    self.codec.dumps(value)
+                )
         except Exception:
             return False
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        expire: int = settings.CACHE_TTL,
+        namespace: str = DEFAULT_NAMESPACE,
+        beta: float = settings.CACHE_XFETCH_BETA,
+        lease_ms: int = settings.CACHE_LOCK_LEASE_MS
+    ) -> Any:
+        """Return a cached value, computing it with stampede protection.
+
+        Entries are stored with how long they took to compute and when they
+        expire. Each read recomputes early with a probability that rises as
+        expiry approaches, scaled by compute time (XFetch), so one request
+        usually refreshes a hot entry before it expires. Recomputation takes
+        a lock with a short lease (``SET NX PX``): while another worker holds
+        it, callers keep serving the current value, or wait for the new one
+        when there is none. Entries written here must be read through this
+        method.
+
+        Args:
+            key: Cache key
+            compute: Coroutine function producing the value
+            expire: TTL in seconds, before jitter
+            namespace: Namespace of the key
+            beta: Eagerness of early recomputation, 0 to disable
+            lease_ms: Lock lease, the longest callers wait for another
+                worker's computation
+
+        Returns:
+            Any: The cached or computed value
+        """
+        entry = await self.get(key, namespace)
+        if not isinstance(entry, dict) or "v" not in entry:
+            entry = None
+        elif not self._expires_early(entry, beta):
+            return entry["v"]
+
+        token = uuid.uuid4().hex
+        try:
+            lock_key = self.resolve(key, namespace) + ":lock"
+            acquired = bool(self.redis.set(lock_key, token, nx=True, px=lease_ms))
+        except Exception:
+            # Without Redis there is nothing to coordinate on
+            lock_key, acquired = None, False
+        if not acquired and lock_key is not None:
+            if entry is not None:
+                return entry["v"]
+            entry = await self._wait_for(key, namespace, lease_ms / 1000)
+            if entry is not None:
+                return entry["v"]
+
+        try:
+            start = time.perf_counter()
+            value = await compute()
+            delta = time.perf_counter() - start
+            ttl = jittered_ttl(expire, self.ttl_jitter)
+            await self.set(key, {"v": value, "d": delta, "e": time.time() + ttl}, ttl, namespace, jitter=0)
+            return value
+        finally:
+            if acquired:
+                self._release(lock_key, token)
+
+    @staticmethod
+    def _expires_early(entry: Dict[str, Any], beta: float) -> bool:
+        """XFetch: decide whether to recompute an entry before it expires."""
+        if beta <= 0:
+            return False
+        return time.time() - entry["d"] * beta * math.log(1.0 - random.random()) >= entry["e"]
+
+    async def _wait_for(self, key: str, namespace: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Poll Redis for an entry another worker is computing."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            try:
+                raw = self._read(self.resolve(key, namespace))
+            except Exception:
+                return None
+            if raw is not None:
+                entry = self.codec.loads(raw)
+                if isinstance(entry, dict) and "v" in entry:
+                    return entry
+        return None
+
+    def _release(self, lock_key: str, token: str) -> None:
+        """Release a recompute lock if it is still ours."""
+        try:
+            # A lease that ran out may have been taken over; only delete our own
+            if self.redis.get(lock_key) == token:
+                self.redis.delete(lock_key)
+        except Exception as e:
+            logger.error(f"Error releasing cache lock: {str(e)}")
             
-    async def delete(self, key: str) -> bool:
+    async def delete(self, key: str, namespace: str = DEFAULT_NAMESPACE) -> bool:
         """Delete value from cache."""
         try:
-            return bool(self.redis.delete(key))
+            return bool(self.redis.delete(self.resolve(key, namespace)))
         except Exception:
             return False
+
+    async def invalidate_namespace(self, namespace: str) -> bool:
+        """Invalidate every key in a namespace, e.g. one user's entries.
+
+        Returns:
+            bool: True if the generation was bumped
+        """
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.incr(self._generation_key(namespace))
+            pipe.get(self.epoch_key)
+            generation, epoch = pipe.execute()
+            self._generations.pop(namespace, None)
+            self.redis.sadd(self.sweep_key, f"{self.prefix}:{int(epoch or 0)}:{{{namespace}}}:{generation - 1}:*")
+            return True
+        except Exception as e:
+            logger.error(f"Error invalidating cache namespace {namespace}: {str(e)}")
+            return False
             
     async def clear(self) -> bool:
-        """Clear all cache."""
+        """Clear all cache entries, leaving other data in the database alone."""
+        try:
+            epoch = self.redis.incr(self.epoch_key)
+            self._generations.clear()
+            self.redis.sadd(self.sweep_key, f"{self.prefix}:{epoch - 1}:*")
+            return True
+        except Exception as e:
+            logger.error(f"Error clearing cache: {str(e)}")
+            return False
+
+
+class CacheSweeper:
+    """Delete keys of invalidated cache generations in the background.
+
+    Patterns queued by ``RedisCache`` are walked with SCAN and deleted with
+    UNLINK in small batches, yielding between batches so neither Redis nor
+    the event loop is blocked for long. A pattern is removed from the queue
+    only once it has been fully swept, so sweeps resume after a restart.
+    """
+
+    def __init__(self, redis: Any, sweep_key: str, batch_size: int = 500, pause: float = 0.01):
+        """Initialize the sweeper.
+
+        Args:
+            redis: Redis client
+            sweep_key: Set of key patterns to sweep, ``RedisCache.sweep_key``
+            batch_size: SCAN COUNT hint and maximum keys per UNLINK
+            pause: Seconds to wait between batches
+        """
+        self.redis = redis
+        self.sweep_key = sweep_key
+        self.batch_size = batch_size
+        self.pause = pause
+        self._stopping = asyncio.Event()
+
+    async def sweep_once(self) -> Optional[int]:
+        """Sweep one queued pattern.
+
+        Returns:
+            Optional[int]: Keys deleted, or None if nothing was queued
+        """
+        pattern = self.redis.srandmember(self.sweep_key)
+        if pattern is None:
+            return None
+        deleted = 0
+        cursor = 0
+        while True:
+            cursor, keys = self.redis.scan(cursor, match=pattern, count=self.batch_size)
+            if keys:
+                deleted += self.redis.unlink(*keys)
+            if cursor == 0 or self._stopping.is_set():
+                break
+            await asyncio.sleep(self.pause)
+        if cursor == 0:
+            self.redis.srem(self.sweep_key, pattern)
+            logger.info(f"Swept {deleted} cache keys matching {pattern}")
+        return deleted
+
+    async def run(self, interval: float) -> None:
+        """Sweep queued patterns until ``stop`` is called."""
+        self._stopping.clear()
+        while not self._stopping.is_set():
+            try:
+                if await self.sweep_once() is not None:
+                    continue
+            except Exception as e:
+                logger.error(f"Cache sweep failed: {str(e)}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self) -> None:
+        """Ask ``run`` to return after the current batch."""
+        self._stopping.set()
+
+
+class TieredCache(RedisCache):
+    """``RedisCache`` with an in-process ``LocalCache`` in front.
+
+    Reads are served locally when possible, including negative entries for
+    keys missing from Redis. Writes go to both tiers and are announced on a
+    Redis pub/sub channel so other workers drop their local copy; local
+    entries also expire after ``local.ttl`` seconds, which bounds staleness
+    if an invalidation is missed.
+    """
+
+    def __init__(
+        self,
+        local: LocalCache,
+        codec: Optional[str] = None,
+        channel: str = settings.CACHE_INVALIDATION_CHANNEL,
+        **kwargs: Any
+    ):
+        """Initialize the cache.
+
+        Args:
+            local: In-process tier
+            codec: Name of the codec in ``CODECS`` used for values
+            channel: Pub/sub channel for invalidations
+            **kwargs: Passed to ``RedisCache``
+        """
+        super().__init__(codec, **kwargs)
+        self.local = local
+        self.channel = channel
+        # Identifies this process's own invalidations on the shared channel
+        self.origin = uuid.uuid4().hex[:12]
+        self._listener: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    async def get(self, key: str, namespace: str = DEFAULT_NAMESPACE) -> Optional[Any]:
+        """Get value from the local tier, falling back to Redis."""
+        try:
+            key = self.resolve(key, namespace)
+        except Exception:
+            return None
+        value = self.local.get(key)
+        if value is not MISS:
+            return value
+        try:
+            raw = self._read(key)
+        except Exception:
+            return None
+        if raw is None:
+            self.local.set_negative(key)
+            return None
+        try:
+            value = self.codec.loads(raw)
+        except Exception:
+            return None
+        self.local.set(key, value, size=len(raw))
+        return value
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        expire: int = settings.CACHE_TTL,
+        namespace: str = DEFAULT_NAMESPACE,
+        jitter: Optional[float] = None
+    ) -> bool:
+        """Set value in both tiers and invalidate it in other workers."""
+        try:
+            key = self.resolve(key, namespace)
+            raw = self.codec.dumps(value)
+            expire = jittered_ttl(expire, self.ttl_jitter if jitter is None else jitter)
+            with span("cache"):
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.setex(key, expire, raw)
+                pipe.publish(self.channel, f"{self.origin} key {key}")
+                stored = bool(pipe.execute()[0])
+        except Exception:
+            self.local.delete(key)
+            return False
+        self.local.set(key, value, size=len(raw), ttl=min(self.local.ttl, expire))
+        return stored
+
+    async def delete(self, key: str, namespace: str = DEFAULT_NAMESPACE) -> bool:
+        """Delete value from both tiers and invalidate it in other workers."""
         try:
-            return bool(self.redis.flushdb())
+            key = self.resolve(key, namespace)
         except Exception:
             return False
+        self.local.delete(key)
+        try:
+            deleted = bool(self.redis.delete(key))
+        except Exception:
+            return False
+        self._publish(f"key {key}")
+        return deleted
+
+    async def invalidate_namespace(self, namespace: str) -> bool:
+        """Invalidate a namespace here and in every other worker.
+
+        Local entries of the old generation become unreachable and age out.
+        """
+        invalidated = await super().invalidate_namespace(namespace)
+        self._publish(f"namespace {namespace}")
+        return invalidated
+
+    async def clear(self) -> bool:
+        """Clear both tiers and every worker's local tier."""
+        self.local.clear()
+        cleared = await super().clear()
+        self._publish("all")
+        return cleared
+
+    def _publish(self, event: str) -> None:
+        try:
+            self.redis.publish(self.channel, f"{self.origin} {event}")
+        except Exception as e:
+            logger.error(f"Error publishing cache invalidation: {str(e)}")
+
+    def invalidate_local(self, message: str) -> None:
+        """Apply an invalidation message from the channel.
+
+        Messages are ``<origin> key <redis key>``, ``<origin> namespace
+        <namespace>`` or ``<origin> all``.
+        """
+        origin, _, event = message.partition(" ")
+        if origin == self.origin:
+            return
+        kind, _, target = event.partition(" ")
+        if kind == "key":
+            self.local.delete(target)
+        elif kind == "namespace":
+            self._generations.pop(target, None)
+        elif kind == "all":
+            self._generations.clear()
+            self.local.clear()
+
+    def start_listener(self) -> None:
+        """Apply other workers' invalidations from a background thread."""
+        if self._listener is not None:
+            return
+        self._stopping.clear()
+        self._listener = threading.Thread(target=self._listen, name="cache-invalidation", daemon=True)
+        self._listener.start()
+
+    def stop_listener(self) -> None:
+        """Stop the invalidation thread."""
+        if self._listener is None:
+            return
+        self._stopping.set()
+        self._listener.join(timeout=2)
+        self._listener = None
+
+    def _listen(self) -> None:
+        pubsub = None
+        while not self._stopping.is_set():
+            try:
+                if pubsub is None:
+                    pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(self.channel)
+                    # Anything published while disconnected was missed
+                    self._generations.clear()
+                    self.local.clear()
+                message = pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message and message["type"] == "message":
+                    self.invalidate_local(message["data"])
+            except Exception as e:
+                logger.error(f"Cache invalidation listener error: {str(e)}")
+                pubsub = None
+                self._stopping.wait(1.0)
+        if pubsub is not None:
+            pubsub.close()
+
+
+_cache: Optional[TieredCache] = None
+
 
-# Global cache instance
-cache = RedisCache()
+def get_cache() -> TieredCache:
+    """Return the process-wide cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        _cache = TieredCache(LocalCache(
+            settings.LOCAL_CACHE_MAX_BYTES,
+            ttl=settings.LOCAL_CACHE_TTL,
+            negative_ttl=settings.LOCAL_CACHE_NEGATIVE_TTL,
+            name="cache"
+        ))
+    return _cache
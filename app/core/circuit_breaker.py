@@ -0,0 +1,132 @@
+"""Circuit breakers for upstream APIs.
+
+When an upstream is down or slow, every call waits for its timeout and
+ties up a worker. A breaker counts consecutive failures of one endpoint
+and, past a threshold, opens: calls fail at once without reaching the
+upstream. After ``recovery_timeout`` seconds it lets a limited number of
+probe calls through (half-open); a successful probe closes it again and a
+failed one reopens it.
+
+Breakers are per process, so each worker decides from the failures it
+sees itself.
+"""
+
+import logging
+import time
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.metrics import CIRCUIT_BREAKER_REJECTIONS, CIRCUIT_BREAKER_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit {name} is open, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with half-open probing."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        """Initialize the breaker, closed.
+
+        Args:
+            name: Name for logs and metrics, e.g. the endpoint
+            failure_threshold: Consecutive failures that open the breaker
+            recovery_timeout: Seconds the breaker stays open before probing
+            half_open_max_calls: Probe calls allowed at once when half-open
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probes = 0
+        self._probe_started = 0.0
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            logger.warning(f"Circuit {self.name} {self.state} -> {state}")
+            CIRCUIT_BREAKER_TRANSITIONS.labels(self.name, state).inc()
+            self.state = state
+
+    def retry_after(self, now: Optional[float] = None) -> float:
+        """Seconds until an open breaker lets a probe through."""
+        now = time.monotonic() if now is None else now
+        return max(0.0, self.opened_at + self.recovery_timeout - now)
+
+    def allow(self, now: Optional[float] = None) -> None:
+        """Admit a call, or raise if the breaker rejects it.
+
+        Every admitted call must be followed by ``record_success`` or
+        ``record_failure``.
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with all
+                probe slots taken
+        """
+        now = time.monotonic() if now is None else now
+        if self.state == OPEN:
+            if now - self.opened_at < self.recovery_timeout:
+                CIRCUIT_BREAKER_REJECTIONS.labels(self.name).inc()
+                raise CircuitOpenError(self.name, self.retry_after(now))
+            self._transition(HALF_OPEN)
+            self._probes = 0
+        if self.state == HALF_OPEN:
+            # Probes never recorded, e.g. cancelled, stop counting after a while
+            if self._probes >= self.half_open_max_calls and now - self._probe_started < self.recovery_timeout:
+                CIRCUIT_BREAKER_REJECTIONS.labels(self.name).inc()
+                raise CircuitOpenError(self.name, self.recovery_timeout)
+            if self._probes >= self.half_open_max_calls:
+                self._probes = 0
+            self._probes += 1
+            self._probe_started = now
+
+    def record_success(self) -> None:
+        """Record an admitted call that succeeded, closing a half-open breaker."""
+        self.failures = 0
+        if self.state == HALF_OPEN:
+            self._probes = 0
+            self._transition(CLOSED)
+
+    def record_failure(self, now: Optional[float] = None) -> None:
+        """Record an admitted call that failed, opening the breaker past the threshold."""
+        now = time.monotonic() if now is None else now
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = now
+            self._probes = 0
+            self._transition(OPEN)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Return the process-wide breaker of an upstream endpoint, creating it on first use."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(
+            name,
+            failure_threshold=settings.SPOTIFY_BREAKER_FAILURES,
+            recovery_timeout=settings.SPOTIFY_BREAKER_RECOVERY_TIMEOUT
+        )
+    return breaker
@@ -0,0 +1,185 @@
+"""Response compression middleware with gzip/brotli negotiation."""
+
+import zlib
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.static_assets import negotiate_encoding
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+DEFAULT_GZIP_LEVELS = {"text/html": 6, "application/json": 5}
+DEFAULT_BROTLI_LEVELS = {"text/html": 5, "application/json": 4}
+
+# Content types worth compressing when they have no explicit level
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+# Server-sent events must reach the client as soon as they are written
+NEVER_COMPRESS_TYPES = ("text/event-stream",)
+
+
+class _Encoder:
+    """Incremental gzip or brotli encoder."""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=level)
+        else:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        """Compress a chunk, flushing it to the output when requested."""
+        if self.encoding == "br":
+            out = self._compressor.process(data)
+            return out + self._compressor.flush() if flush else out
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self, data: bytes = b"") -> bytes:
+        """Compress the last chunk and close the stream."""
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.finish()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """Compress responses with brotli or gzip, whichever the client prefers.
+
+    Responses smaller than ``minimum_size``, already encoded, or of a
+    type that does not compress well are passed through untouched, as are
+    server-sent event streams. Other streamed responses are compressed
+    chunk by chunk and flushed after each chunk, so streaming still works.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_levels: Optional[Dict[str, int]] = None,
+        brotli_levels: Optional[Dict[str, int]] = None,
+        default_gzip_level: int = 6,
+        default_brotli_level: int = 4
+    ):
+        """Initialize the middleware.
+
+        Args:
+            app: ASGI application
+            minimum_size: Smallest body in bytes worth compressing
+            gzip_levels: Content type to gzip level (1-9)
+            brotli_levels: Content type to brotli quality (0-11)
+            default_gzip_level: Gzip level for other compressible types
+            default_brotli_level: Brotli quality for other compressible types
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_levels = DEFAULT_GZIP_LEVELS if gzip_levels is None else gzip_levels
+        self.brotli_levels = DEFAULT_BROTLI_LEVELS if brotli_levels is None else brotli_levels
+        self.default_gzip_level = default_gzip_level
+        self.default_brotli_level = default_brotli_level
+        self.encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(
+            Headers(scope=scope).get("accept-encoding", ""),
+            self.encodings
+        )
+        if encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    def level_for(self, encoding: str, content_type: str) -> Optional[int]:
+        """Return the compression level for a content type, or None to skip it."""
+        media_type = content_type.split(";", 1)[0].strip().lower()
+        if media_type.startswith(NEVER_COMPRESS_TYPES):
+            return None
+        levels = self.brotli_levels if encoding == "br" else self.gzip_levels
+        if media_type in levels:
+            return levels[media_type]
+        if media_type.startswith(COMPRESSIBLE_TYPES):
+            return self.default_brotli_level if encoding == "br" else self.default_gzip_level
+        return None
+
+
+class _CompressionResponder:
+    """Wraps ``send`` for a single response."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start_message: Optional[Message] = None
+        self.level = 0
+        self.encoder: Optional[_Encoder] = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            level = self.middleware.level_for(self.encoding, headers.get("content-type", ""))
+            if (
+                level is None
+                or "content-encoding" in headers
+                or message["status"] in (204, 304)
+            ):
+                self.passthrough = True
+                await self._send(message)
+                return
+            self.start_message = message
+            self.level = level
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                self.passthrough = True
+                await self._send(self.start_message)
+                await self._send(message)
+                return
+
+            self.encoder = _Encoder(self.encoding, self.level)
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+                body = self.encoder.compress(body, flush=True)
+            else:
+                body = self.encoder.finish(body)
+                headers["Content-Length"] = str(len(body))
+            self.start_message["headers"] = headers.raw
+            await self._send(self.start_message)
+            await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
+            return
+
+        if more_body:
+            body = self.encoder.compress(body, flush=True)
+        else:
+            body = self.encoder.finish(body)
+        await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
@@ -0,0 +1,170 @@
+"""Adaptive concurrency limiting and load shedding.
+
+Nothing else bounds how many requests a worker runs at once, and under a
+burst every dashboard request opens Spotify connections and runs analysis
+work until latency collapses for everyone. ``ConcurrencyLimitMiddleware``
+admits requests against per-route limits and rejects the rest at once
+with 503 and ``Retry-After``, which costs next to nothing.
+
+Limits adapt with AIMD (additive increase, multiplicative decrease) on
+observed latency: while requests finish within the latency target and the
+limit is in use, it grows by one; when a request overshoots the target it
+shrinks by ``backoff_ratio``, at most once per target interval so a burst
+of slow requests does not collapse it to the minimum. Health checks,
+metrics and static files are in a priority lane that is never shed.
+"""
+
+import json
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.metrics import CONCURRENCY_LIMIT, REQUESTS_SHED
+
+
+class AIMDLimiter:
+    """Concurrency limit adapted to latency with AIMD."""
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 20,
+        min_limit: int = 4,
+        max_limit: int = 200,
+        latency_target: float = 1.0,
+        backoff_ratio: float = 0.9
+    ):
+        """Initialize the limiter.
+
+        Args:
+            name: Name for logs and metrics
+            initial_limit: Requests admitted at once before any adaptation
+            min_limit: The limit never shrinks below this
+            max_limit: The limit never grows above this
+            latency_target: Seconds; slower requests shrink the limit
+            backoff_ratio: Factor the limit is multiplied by on overshoot
+        """
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff_ratio = backoff_ratio
+        self.limit = float(min(max_limit, max(min_limit, initial_limit)))
+        self.inflight = 0
+        self._last_decrease = float("-inf")
+        self._gauge = CONCURRENCY_LIMIT.labels(name)
+        self._gauge.set(self.limit)
+
+    def try_acquire(self) -> bool:
+        """Admit a request if the limit allows; admitted requests must be released."""
+        if self.inflight >= int(self.limit):
+            return False
+        self.inflight += 1
+        return True
+
+    def release(self, latency: float, now: Optional[float] = None) -> None:
+        """Finish an admitted request and adapt the limit to its latency.
+
+        Args:
+            latency: Seconds the request took
+        """
+        now = time.monotonic() if now is None else now
+        # Only grow a limit that is being used; idle capacity says nothing
+        utilized = self.inflight * 2 >= self.limit
+        self.inflight -= 1
+        if latency > self.latency_target:
+            if now - self._last_decrease >= self.latency_target:
+                self._last_decrease = now
+                self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+                self._gauge.set(self.limit)
+        elif utilized and self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1)
+            self._gauge.set(self.limit)
+
+
+def _matches(path: str, pattern: str) -> bool:
+    """Match a path against an exact path, or a prefix ending with ``*``."""
+    if pattern.endswith("*"):
+        return path.startswith(pattern[:-1])
+    return path == pattern
+
+
+class ConcurrencyLimitMiddleware:
+    """Shed load with per-route adaptive concurrency limits."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limits: Dict[str, int],
+        routes: Dict[str, str],
+        priority_paths: Iterable[str] = (),
+        default_limiter: str = "default",
+        initial_limit: int = 20,
+        min_limit: int = 4,
+        latency_target: float = 1.0,
+        retry_after: int = 1
+    ):
+        """Initialize the middleware.
+
+        Args:
+            app: ASGI application
+            limits: Maximum limit of each limiter, by limiter name
+            routes: Limiter name by path; paths ending with ``*`` are prefixes
+            priority_paths: Paths never limited; ending with ``*`` for prefixes
+            default_limiter: Limiter of paths not in ``routes``
+            initial_limit: Starting limit of each limiter, capped at its maximum
+            min_limit: Smallest limit of each limiter
+            latency_target: Seconds; slower requests shrink their route's limit
+            retry_after: ``Retry-After`` seconds sent with 503s
+        """
+        self.app = app
+        self.limiters = {
+            name: AIMDLimiter(name, initial_limit, min(min_limit, max_limit), max_limit, latency_target)
+            for name, max_limit in limits.items()
+        }
+        # Longest pattern first, so /api/v1/export/* wins over /api/*
+        self.routes: List[Tuple[str, str]] = sorted(routes.items(), key=lambda item: -len(item[0]))
+        self.priority_paths = tuple(priority_paths)
+        self.default_limiter = default_limiter
+        self.retry_after = retry_after
+        self._rejection = json.dumps({"detail": "Server is busy, please retry shortly"}).encode()
+
+    def limiter_for(self, path: str) -> Optional[AIMDLimiter]:
+        """Return the limiter of a path, or None for the priority lane."""
+        if any(_matches(path, pattern) for pattern in self.priority_paths):
+            return None
+        for pattern, name in self.routes:
+            if _matches(path, pattern):
+                return self.limiters.get(name)
+        return self.limiters.get(self.default_limiter)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        limiter = self.limiter_for(scope["path"])
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        if not limiter.try_acquire():
+            REQUESTS_SHED.labels(limiter.name).inc()
+            await self._reject(send)
+            return
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.monotonic() - start)
+
+    async def _reject(self, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(self._rejection)).encode()),
+                (b"retry-after", str(self.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": self._rejection})
@@ -1,6 +1,6 @@
 """Configuration settings."""
 import logging
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 logger = logging.getLogger(__name__)
@@ -16,6 +16,8 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "dev-secret-key-change-in-production"
     SESSION_COOKIE_NAME: str = "mindbeat_session"
     SESSION_MAX_AGE: int = 14 * 24 * 60 * 60  # 14 days in seconds
+    SESSION_LOCAL_CACHE_SIZE: int = 10000  # Hot sessions kept in process
+    SESSION_LOCAL_CACHE_TTL: int = 10  # seconds before re-reading session data from Redis
 
     # CORS
     _ALLOWED_HOSTS: str = "*"  # Store as comma-separated string
@@ -38,12 +40,114 @@ class Settings(BaseSettings):
     SPOTIFY_CLIENT_ID: Optional[str] = None
     SPOTIFY_CLIENT_SECRET: Optional[str] = None
     SPOTIFY_REDIRECT_URI: Optional[str] = None
+    SPOTIFY_API_BASE_URL: str = "https://api.spotify.com/v1"  # Point at a mock for load tests
 
     # Redis - Optional
+    REDIS_BACKEND: Optional[str] = None  # "redis" or "memory" (development only); "redis" when unset in production or with REDIS_URL/REDIS_HOST
     REDIS_URL: Optional[str] = None
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
+    REDIS_PASSWORD: Optional[str] = None
+    CACHE_TTL: int = 3600  # seconds
+    CACHE_CODEC: str = "json"  # "json" or "orjson"
+    CACHE_INVALIDATION_CHANNEL: str = "mindbeat:cache:invalidate"
+    CACHE_TTL_JITTER: float = 0.1  # Spread TTLs by up to 10% either way
+    CACHE_XFETCH_BETA: float = 1.0  # >1 recomputes earlier, 0 disables early recompute
+    CACHE_LOCK_LEASE_MS: int = 3000  # Recompute lock lease
+    CACHE_GENERATION_TTL: float = 5.0  # seconds namespace generations are memoized
+    CACHE_SWEEP_INTERVAL: float = 30.0  # seconds between checks for invalidated keys
+    CACHE_SWEEP_BATCH_SIZE: int = 500
+    LOCAL_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # In-process tier per worker
+    LOCAL_CACHE_TTL: int = 60  # seconds, bounds staleness of the local tier
+    LOCAL_CACHE_NEGATIVE_TTL: int = 10  # seconds to remember missing keys
+    USER_PROFILE_CACHE_TTL: int = 300  # seconds
+
+    # Audio features
+    FEATURE_CACHE_TTL: int = 30 * 24 * 60 * 60  # Audio features never change
+    FEATURE_LOCAL_CACHE_BYTES: int = 32 * 1024 * 1024
+    FEATURE_HOT_TRACKS: int = 100000  # Size of the shared hot-track ranking
+    FEATURE_HOT_FLUSH_INTERVAL: float = 10.0  # seconds between flushes of feature lookups to the ranking
+    FEATURE_HOT_TRIM_INTERVAL: float = 300.0  # seconds between trims of the ranking to FEATURE_HOT_TRACKS
+    FEATURE_CATALOG_PATH: str = ""  # e.g. data/features.catalog, built with `python -m app.cli build-catalog`; "" disables it
+
+    # Mood statistics
+    MOOD_EMA_DAYS: float = 7.0  # Time constant of the per-user mood moving average
+    MOOD_AGGREGATES_CACHE_TTL: int = 60  # seconds cohort mood aggregates are cached
+    MOOD_AGGREGATES_MIN_USERS: int = 10  # Aggregates of fewer distinct users are suppressed
+
+    # Listening sessions
+    LISTENING_SESSION_GAP_MINUTES: float = 30.0  # Inactivity that ends a listening session
+    LISTENING_SESSION_CHANGE_THRESHOLD: float = 0.6  # CUSUM sum of mood deviations that marks a mood shift
+    LISTENING_SESSION_CHANGE_DRIFT: float = 0.05  # Mood deviation per play tolerated as noise
+    LISTENING_SESSION_MAX_CACHED: int = 500  # Finished sessions kept per user
+
+    # Play history import and export
+    BACKFILL_BATCH_SIZE: int = 5000  # History records per insert and checkpoint
+    BACKFILL_MIN_MS_PLAYED: int = 30000  # Shorter plays are skips, as Spotify counts streams
+    EXPORT_CHUNK_SIZE: int = 10000  # Plays per Parquet row group / Arrow batch
+    EXPORT_API_KEY: str = ""  # X-Export-Key for all-user exports, "" disables them
+
+    # Pagination
+    TRACKS_PAGE_SIZE: int = 100
+    TRACKS_MAX_PAGE_SIZE: int = 1000
+    DASHBOARD_TRACKS_PAGE_SIZE: int = 5
+    ANALYSIS_SNAPSHOT_TTL: int = 600  # seconds a paged analysis can be paged through
+
+    # Templates
+    TEMPLATE_BYTECODE_CACHE_DIR: Optional[str] = None  # Temporary directory when unset
+    FRAGMENT_CACHE_SIZE: int = 1024
+    FRAGMENT_CACHE_TTL: int = 300  # seconds
+
+    # Static assets
+    STATIC_MAX_AGE: int = 365 * 24 * 60 * 60  # 1 year in seconds, for fingerprinted files
+
+    # Response compression
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # bytes
+    COMPRESSION_GZIP_LEVELS: Dict[str, int] = {"text/html": 6, "application/json": 5}
+    COMPRESSION_BROTLI_LEVELS: Dict[str, int] = {"text/html": 5, "application/json": 4}
+
+    # Request tracing and profiling
+    SERVER_TIMING_ENABLED: Optional[bool] = None  # Send the Server-Timing header; off in production when unset, as it exposes internal timings
+    SLOW_REQUEST_THRESHOLD_MS: int = 1000
+    PROFILE_SLOW_REQUESTS: bool = False
+    PROFILE_OUTPUT_DIR: str = "profiles"
+    PROFILE_SAMPLE_INTERVAL_MS: float = 5.0
+
+    # Load shedding
+    CONCURRENCY_LIMIT_ENABLED: bool = True
+    CONCURRENCY_LIMITS: Dict[str, int] = {"dashboard": 50, "export": 4, "api": 100, "default": 200}  # Maximum per limiter
+    CONCURRENCY_ROUTES: Dict[str, str] = {"/": "dashboard", "/dashboard": "dashboard", "/api/v1/export/*": "export", "/api/*": "api"}
+    CONCURRENCY_PRIORITY_PATHS: List[str] = ["/health", "/metrics", "/static/*"]  # Never shed
+    CONCURRENCY_INITIAL_LIMIT: int = 20
+    CONCURRENCY_MIN_LIMIT: int = 4
+    CONCURRENCY_LATENCY_TARGET: float = 1.0  # seconds; slower requests shrink their route's limit
+    CONCURRENCY_RETRY_AFTER: int = 1  # seconds, sent with 503s
+
+    # Worker lifecycle
+    HTTP_POOL_SIZE: int = 100  # Shared upstream connections per worker
+    WARMUP_FEATURE_CACHE_KEYS: int = 5000  # Hot tracks preloaded at startup, 0 to skip
+    SHUTDOWN_DRAIN_TIMEOUT: float = 20.0  # seconds
+
+    # Spotify outages
+    SPOTIFY_TIMEOUT: float = 5.0  # seconds per request, including reading the response
+    SPOTIFY_CONNECT_TIMEOUT: float = 2.0  # seconds to get a pooled or new connection
+    SPOTIFY_BREAKER_FAILURES: int = 5  # Consecutive failures that open an endpoint's circuit
+    SPOTIFY_BREAKER_RECOVERY_TIMEOUT: float = 30.0  # seconds before an open circuit is probed
+    DASHBOARD_STALE_TTL: int = 7 * 24 * 60 * 60  # How long the last analysis is kept for degraded mode
+
+    # Scheduled sync of recently played tracks
+    SYNC_MODE: str = "in-process"  # "in-process", "worker" (python -m app.cli sync-worker) or "off"
+    SYNC_MIN_INTERVAL: float = 300.0  # seconds between syncs of the most active listeners
+    SYNC_MAX_INTERVAL: float = 3600.0  # seconds between syncs of idle users
+    SYNC_TARGET_PLAYS: float = 10.0  # New plays expected per sync; Spotify only returns the last 50
+    SYNC_JITTER: float = 0.2  # Spread sync times by up to 20% either way
+    SYNC_ACTIVE_DAYS: float = 14.0  # Users stop being synced this long after their last visit
+    SYNC_RATE_LIMIT: float = 5.0  # Spotify requests per second for syncing, shared by every worker through Redis
+    SYNC_CONCURRENCY: int = 8  # Users synced at once per scheduler
+    SYNC_RATE_LIMIT_BACKOFF: float = 30.0  # seconds every scheduler pauses after a 429
+    SYNC_CLAIM_TIMEOUT: float = 300.0  # seconds before a user whose sync did not finish is due again
+    SYNC_REGISTER_INTERVAL: float = 3600.0  # seconds a worker skips re-registering a user with an unchanged token
 
     # Sentry - Optional
     SENTRY_DSN: Optional[str] = None
@@ -55,6 +159,13 @@ class Settings(BaseSettings):
         """Check if environment is production."""
         return self.ENVIRONMENT.lower() == "production"
 
+    @property
+    def server_timing_enabled(self) -> bool:
+        """Check if responses carry a Server-Timing header."""
+        if self.SERVER_TIMING_ENABLED is None:
+            return not self.is_production
+        return self.SERVER_TIMING_ENABLED
+
     def get_spotify_redirect_uri(self) -> str:
         """Get the Spotify redirect URI based on environment."""
         if self.SPOTIFY_REDIRECT_URI:
@@ -83,12 +194,17 @@ class Settings(BaseSettings):
         validate_default=False  # Don't validate default values
     )
 
+    def log_summary(self) -> None:
+        """Log the effective configuration.
+
+        Called from application startup rather than at import, so importing
+        settings stays cheap and silent.
+        """
+        logger.info(f"Environment: {self.ENVIRONMENT}")
+        logger.info(f"HTTPS enabled: {self.USE_HTTPS}")
+        logger.info(f"Allowed hosts: {self.ALLOWED_HOSTS}")
+        logger.info(f"Spotify credentials configured: {self.validate_spotify_credentials()}")
+        logger.info(f"Spotify redirect URI: {self.get_spotify_redirect_uri()}")
+
 # Create settings instance
 settings = Settings(_env_file=None)
-
-# Log initial configuration
-logger.info(f"Environment: {settings.ENVIRONMENT}")
-logger.info(f"HTTPS enabled: {settings.USE_HTTPS}")
-logger.info(f"Allowed hosts: {settings.ALLOWED_HOSTS}")
-logger.info(f"Spotify credentials configured: {settings.validate_spotify_credentials()}")
-logger.info(f"Spotify redirect URI: {settings.get_spotify_redirect_uri()}")
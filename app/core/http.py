@@ -0,0 +1,109 @@
+"""Shared HTTP client session for upstream APIs.
+
+Opening an ``aiohttp.ClientSession`` per request means a new connection
+pool, DNS lookup and TLS handshake for every Spotify call. The app opens
+one pooled session at startup instead, and closes it after in-flight
+calls have drained at shutdown.
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+_session: Optional[aiohttp.ClientSession] = None
+
+
+class InflightRequests:
+    """Count upstream calls in progress so shutdown can wait for them."""
+
+    def __init__(self):
+        self.count = 0
+        self._idle: Optional[asyncio.Event] = None
+
+    def _event(self) -> asyncio.Event:
+        if self._idle is None:
+            self._idle = asyncio.Event()
+            self._idle.set()
+        return self._idle
+
+    def begin(self) -> None:
+        """Mark a call as started."""
+        self.count += 1
+        self._event().clear()
+
+    def end(self) -> None:
+        """Mark a call as finished."""
+        self.count -= 1
+        if self.count <= 0:
+            self.count = 0
+            self._event().set()
+
+    async def wait_idle(self, timeout: float) -> bool:
+        """Wait until no calls are in progress.
+
+        Returns:
+            bool: True if idle, False if ``timeout`` seconds passed first
+        """
+        if self.count == 0:
+            return True
+        try:
+            await asyncio.wait_for(self._event().wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+INFLIGHT = InflightRequests()
+
+
+def open_http_session(limit: int = 100, limit_per_host: int = 0) -> aiohttp.ClientSession:
+    """Open the shared session; must be called from the running event loop.
+
+    Args:
+        limit: Maximum number of pooled connections
+        limit_per_host: Maximum connections per host, unlimited when 0
+    """
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(limit=limit, limit_per_host=limit_per_host, ttl_dns_cache=300)
+        _session = aiohttp.ClientSession(connector=connector)
+        logger.info(f"Opened shared HTTP session (pool size {limit})")
+    return _session
+
+
+def get_http_session() -> Optional[aiohttp.ClientSession]:
+    """Return the shared session if it is open."""
+    return _session if _session is not None and not _session.closed else None
+
+
+async def close_http_session() -> None:
+    """Close the shared session and its connections."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logger.info("Closed shared HTTP session")
+    _session = None
+
+
+@asynccontextmanager
+async def upstream_session() -> AsyncIterator[aiohttp.ClientSession]:
+    """Yield a session for one upstream call, tracked in ``INFLIGHT``.
+
+    Uses the shared session when it is open, so scripts and tests that do
+    not run the app lifespan still work with a short-lived session.
+    """
+    INFLIGHT.begin()
+    try:
+        session = get_http_session()
+        if session is not None:
+            yield session
+        else:
+            async with aiohttp.ClientSession() as session:
+                yield session
+    finally:
+        INFLIGHT.end()
@@ -0,0 +1,120 @@
+"""Worker warm-up and graceful shutdown.
+
+Every worker starts with empty in-process caches. ``warm_up`` runs in the
+application lifespan before the worker accepts traffic; ``drain`` runs
+when it shuts down and waits for in-flight Spotify calls and background
+tasks before connections are closed.
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+from typing import Any, Callable, Coroutine, List, Optional, Set, Tuple
+
+from app.core.http import INFLIGHT, close_http_session, open_http_session
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundTasks:
+    """Tasks that outlive the request that started them.
+
+    Holding a reference keeps tasks from being garbage collected midway,
+    and lets shutdown wait for them.
+    """
+
+    def __init__(self):
+        self._tasks: Set[asyncio.Task] = set()
+        self.accepting = True
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def spawn(self, coro: Coroutine, name: Optional[str] = None) -> Optional[asyncio.Task]:
+        """Run a coroutine in the background.
+
+        Returns:
+            Optional[asyncio.Task]: The task, or None if shutdown has begun
+        """
+        if not self.accepting:
+            coro.close()
+            logger.warning(f"Dropped background task {name} during shutdown")
+            return None
+        task = asyncio.create_task(coro, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+        return task
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Background task {task.get_name()} failed: {task.exception()}")
+
+    async def drain(self, timeout: float) -> int:
+        """Stop accepting tasks and wait for running ones.
+
+        Returns:
+            int: Number of tasks cancelled because they did not finish in time
+        """
+        self.accepting = False
+        if not self._tasks:
+            return 0
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        return len(pending)
+
+
+background_tasks = BackgroundTasks()
+
+
+async def warm_up(steps: List[Tuple[str, Callable[[], Any]]]) -> None:
+    """Run warm-up steps in order, logging how long each takes.
+
+    A failing step is logged and skipped: a cold worker is better than no
+    worker.
+
+    Args:
+        steps: ``(name, callable)`` pairs; callables may be sync or async
+    """
+    started = time.perf_counter()
+    for name, step in steps:
+        step_started = time.perf_counter()
+        try:
+            result = step()
+            if inspect.isawaitable(result):
+                result = await result
+        except Exception as e:
+            logger.error(f"Warm-up step {name} failed: {str(e)}", exc_info=True)
+            continue
+        detail = f" ({result})" if result is not None else ""
+        logger.info(f"Warm-up {name}{detail}: {(time.perf_counter() - step_started) * 1000:.0f}ms")
+    logger.info(f"Warm-up finished in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+
+def open_pools(pool_size: int) -> str:
+    """Open the shared HTTP session; a warm-up step."""
+    open_http_session(limit=pool_size)
+    return f"{pool_size} connections"
+
+
+async def drain(timeout: float) -> None:
+    """Wait for in-flight work, then close connection pools.
+
+    Args:
+        timeout: Maximum seconds to wait, shared by calls and tasks
+    """
+    deadline = time.monotonic() + timeout
+    if len(background_tasks):
+        logger.info(f"Waiting for {len(background_tasks)} background tasks")
+    cancelled = await background_tasks.drain(timeout)
+    if cancelled:
+        logger.warning(f"Cancelled {cancelled} background tasks at shutdown")
+    if INFLIGHT.count:
+        logger.info(f"Waiting for {INFLIGHT.count} in-flight Spotify calls")
+    if not await INFLIGHT.wait_idle(max(0.0, deadline - time.monotonic())):
+        logger.warning(f"Shutting down with {INFLIGHT.count} Spotify calls still in flight")
+    await close_http_session()
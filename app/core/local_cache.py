@@ -0,0 +1,149 @@
+"""In-process LRU cache bounded by size in bytes, with TTL and negative entries."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app.core.metrics import LOCAL_CACHE_EVICTIONS, LOCAL_CACHE_REQUESTS
+
+# Returned by ``LocalCache.get`` for keys that are not cached
+MISS = object()
+
+# Bookkeeping overhead charged per entry on top of the value size
+ENTRY_OVERHEAD = 100
+
+
+class LocalCache:
+    """Thread-safe LRU cache with per-entry TTL and a byte budget.
+
+    Sizes are supplied by the caller, usually the length of the serialized
+    value it was loaded from, so no time is spent measuring objects. When
+    the budget is exceeded, least recently used entries are evicted.
+
+    ``None`` is cached as a negative entry, recording that a key does not
+    exist upstream; negative entries use a shorter TTL by default.
+    Cached objects are shared between callers and must not be mutated.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl: float,
+        negative_ttl: Optional[float] = None,
+        name: str = "local"
+    ):
+        """Initialize the cache.
+
+        Args:
+            max_bytes: Total size budget of all entries
+            ttl: Default lifetime of entries in seconds
+            negative_ttl: Default lifetime of negative entries, ``ttl`` when None
+            name: Label for the cache's metrics
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.name = name
+        # Key to (expires_at, value, size)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._hit_counter = LOCAL_CACHE_REQUESTS.labels(name, "hit")
+        self._negative_counter = LOCAL_CACHE_REQUESTS.labels(name, "negative_hit")
+        self._miss_counter = LOCAL_CACHE_REQUESTS.labels(name, "miss")
+        self._eviction_counter = LOCAL_CACHE_EVICTIONS.labels(name)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not MISS
+
+    def get(self, key: Hashable) -> Any:
+        """Return a cached value, None for a negative entry, or ``MISS``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                self._miss_counter.inc()
+                return MISS
+            self._entries.move_to_end(key)
+            if entry[1] is None:
+                self.negative_hits += 1
+                self._negative_counter.inc()
+            else:
+                self.hits += 1
+                self._hit_counter.inc()
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, size: int = 0, ttl: Optional[float] = None) -> None:
+        """Cache a value.
+
+        Args:
+            key: Cache key
+            value: Value to cache; None records a negative entry
+            size: Size of the value in bytes
+            ttl: Lifetime in seconds, the cache default when None
+        """
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        size += ENTRY_OVERHEAD
+        if size > self.max_bytes or ttl <= 0:
+            self.delete(key)
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+                self._eviction_counter.inc()
+
+    def set_negative(self, key: Hashable, ttl: Optional[float] = None) -> None:
+        """Record that ``key`` does not exist upstream."""
+        self.set(key, None, ttl=ttl)
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def delete(self, key: Hashable) -> bool:
+        """Drop an entry, returning whether it was cached."""
+        with self._lock:
+            existed = key in self._entries
+            self._remove(key)
+            return existed
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters and current usage."""
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,324 @@
+"""Low-overhead Prometheus-style metrics.
+
+Metrics are plain in-process counters and fixed-bucket histograms, cheap
+enough to record on hot paths. Label lookups are cached, so the usual
+pattern is to resolve a child once and call ``inc``/``observe`` on it::
+
+    SPOTIFY_REQUEST_SECONDS.labels("me", "200").observe(elapsed)
+
+Values are per process; with several workers each one exposes its own.
+"""
+
+import math
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment the counter."""
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        """Set the gauge."""
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # One slot per bucket plus +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float, _bisect=bisect_left) -> None:
+        """Record an observation."""
+        self.counts[_bisect(self.bounds, value)] += 1
+        self.sum += value
+
+    def time(self) -> "_Timer":
+        """Time a block and record its duration in seconds."""
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class _Metric:
+    """Base class for labelled metrics."""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._unlabelled = self._new_child()
+            self._children[()] = self._unlabelled
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """Return the child for a set of label values, creating it if needed."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children.setdefault(tuple(str(v) for v in values), self._new_child())
+            self._children[values] = child
+        return child
+
+    def _samples(self) -> Iterable[Tuple[Tuple[str, ...], object]]:
+        seen = set()
+        for values, child in list(self._children.items()):
+            if id(child) not in seen:
+                seen.add(id(child))
+                yield tuple(str(v) for v in values), child
+
+    def render(self) -> List[str]:
+        """Render the metric in Prometheus text format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for values, child in self._samples():
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    type_name = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment an unlabelled counter."""
+        self._unlabelled.value += amount
+
+    def _render_child(self, values, child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        """Set an unlabelled gauge."""
+        self._unlabelled.value = value
+
+    def _render_child(self, values, child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class Histogram(_Metric):
+    """Histogram with fixed upper bounds."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float) -> None:
+        """Record an observation on an unlabelled histogram."""
+        self._unlabelled.observe(value)
+
+    def time(self) -> _Timer:
+        """Time a block on an unlabelled histogram."""
+        return _Timer(self._unlabelled)
+
+    def _render_child(self, values, child) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.bounds, math.inf), child.counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Register a metric, returning the existing one if the name is taken."""
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        """Create and register a counter."""
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        """Create and register a gauge."""
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ) -> Histogram:
+        """Create and register a histogram."""
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        """Return a registered metric by name."""
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render every metric in Prometheus text format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+SPOTIFY_REQUEST_SECONDS = REGISTRY.histogram(
+    "mindbeat_spotify_request_seconds",
+    "Latency of Spotify API requests",
+    ("endpoint", "status")
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "mindbeat_cache_requests_total",
+    "Cache lookups by result",
+    ("result",)
+)
+LOCAL_CACHE_REQUESTS = REGISTRY.counter(
+    "mindbeat_local_cache_requests_total",
+    "In-process cache lookups by cache and result",
+    ("cache", "result")
+)
+LOCAL_CACHE_EVICTIONS = REGISTRY.counter(
+    "mindbeat_local_cache_evictions_total",
+    "In-process cache entries evicted to stay within the size budget",
+    ("cache",)
+)
+ANALYSIS_SECONDS = REGISTRY.histogram(
+    "mindbeat_analysis_seconds",
+    "Time spent in MoodAnalyzer.analyze_tracks by batch size",
+    ("batch_size",)
+)
+TEMPLATE_RENDER_SECONDS = REGISTRY.histogram(
+    "mindbeat_template_render_seconds",
+    "Template render time",
+    ("template",)
+)
+
+CIRCUIT_BREAKER_TRANSITIONS = REGISTRY.counter(
+    "mindbeat_circuit_breaker_transitions_total",
+    "Circuit breaker state changes by breaker and new state",
+    ("breaker", "state")
+)
+CIRCUIT_BREAKER_REJECTIONS = REGISTRY.counter(
+    "mindbeat_circuit_breaker_rejections_total",
+    "Upstream calls failed fast by an open circuit breaker",
+    ("breaker",)
+)
+DASHBOARD_DEGRADED = REGISTRY.counter(
+    "mindbeat_dashboard_degraded_total",
+    "Dashboards served from the last cached analysis while Spotify was unavailable",
+    ("result",)
+)
+CONCURRENCY_LIMIT = REGISTRY.gauge(
+    "mindbeat_concurrency_limit",
+    "Current adaptive concurrency limit by limiter",
+    ("limiter",)
+)
+REQUESTS_SHED = REGISTRY.counter(
+    "mindbeat_requests_shed_total",
+    "Requests rejected with 503 because their limiter was saturated",
+    ("limiter",)
+)
+
+def batch_size_label(size: int) -> str:
+    """Bucket a batch size into a low-cardinality label value."""
+    if size <= 10:
+        return "1-10"
+    if size <= 100:
+        return "11-100"
+    if size <= 1000:
+        return "101-1000"
+    if size <= 10000:
+        return "1001-10000"
+    return "10001+"
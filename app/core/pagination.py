@@ -0,0 +1,130 @@
+"""Cursor pagination and sparse fieldset helpers."""
+
+import base64
+import binascii
+import json
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class Page(NamedTuple):
+    """A page of items with the cursor for the next page."""
+
+    items: List
+    next_cursor: Optional[str]
+    total: int
+
+
+def encode_cursor(offset: int, snapshot: Optional[str] = None) -> str:
+    """Encode a list offset as an opaque cursor.
+
+    Args:
+        offset: Index of the first item of the next page
+        snapshot: ID of the stored result the pages are slices of, for
+            results that would differ if computed again
+
+    Returns:
+        str: URL-safe cursor
+    """
+    state = {"o": offset} if snapshot is None else {"o": offset, "s": snapshot}
+    raw = json.dumps(state, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_state(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(state, dict):
+        raise ValueError("Invalid cursor")
+    return state
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """Decode a cursor produced by :func:`encode_cursor`.
+
+    Args:
+        cursor: Cursor from a previous page, or None for the first page
+
+    Returns:
+        int: Offset of the first item of the page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not cursor:
+        return 0
+    offset = _decode_state(cursor).get("o")
+    if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0:
+        raise ValueError("Invalid cursor")
+    return offset
+
+
+def cursor_snapshot(cursor: Optional[str]) -> Optional[str]:
+    """Return the snapshot ID a cursor was issued for.
+
+    Args:
+        cursor: Cursor from a previous page, or None for the first page
+
+    Returns:
+        Optional[str]: Snapshot ID, None for the first page or cursors
+            issued without one
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not cursor:
+        return None
+    decode_cursor(cursor)
+    snapshot = _decode_state(cursor).get("s")
+    if snapshot is not None and not isinstance(snapshot, str):
+        raise ValueError("Invalid cursor")
+    return snapshot
+
+
+def paginate(items: Sequence[T], cursor: Optional[str], page_size: int, snapshot: Optional[str] = None) -> Page:
+    """Slice a sequence into a page.
+
+    Args:
+        items: Full, stably ordered sequence
+        cursor: Cursor from a previous page, or None for the first page
+        page_size: Maximum number of items per page
+        snapshot: ID carried in the next cursor, see :func:`encode_cursor`
+
+    Returns:
+        Page: Items of the page and the cursor of the next one
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    start = decode_cursor(cursor)
+    end = start + page_size
+    next_cursor = encode_cursor(end, snapshot) if end < len(items) else None
+    return Page(list(items[start:end]), next_cursor, len(items))
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[Tuple[str, ...]]:
+    """Parse a comma-separated sparse fieldset.
+
+    Args:
+        fields: Requested fields, e.g. ``mood_score,valence``
+        allowed: Field names that may be selected, in output order
+
+    Returns:
+        Optional[Tuple[str, ...]]: Selected fields in ``allowed`` order,
+        or None when all fields should be returned
+
+    Raises:
+        ValueError: If an unknown field is requested
+    """
+    if not fields:
+        return None
+    allowed = tuple(allowed)
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(f for f in allowed if f in requested) or None
@@ -0,0 +1,526 @@
+"""Redis client factory and in-memory stand-in."""
+
+import fnmatch
+import logging
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from redis import Redis
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class InMemoryRedis:
+    """In-process stand-in for the subset of the Redis API MindBeat uses.
+
+    Behaves like ``Redis(decode_responses=True)``: values are stored and
+    returned as strings. Used for development, tests and single-process
+    deployments without a Redis server. Data is not shared between workers.
+    """
+
+    def __init__(self):
+        """Initialize an empty database."""
+        self._data: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        self._subscribers: Dict[str, List["_PubSub"]] = {}
+
+    def _alive(self, key: str) -> bool:
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+            return False
+        return key in self._data
+
+    def ping(self) -> bool:
+        """Check the connection."""
+        return True
+
+    def get(self, name: str) -> Optional[str]:
+        """Get the value of a key."""
+        with self._lock:
+            return self._data.get(name) if self._alive(name) else None
+
+    def mget(self, keys: List[str], *args: str) -> List[Optional[str]]:
+        """Get the values of several keys."""
+        if isinstance(keys, str):
+            keys = [keys]
+        return [self.get(key) for key in [*keys, *args]]
+
+    def set(
+        self,
+        name: str,
+        value: Any,
+        ex: Optional[int] = None,
+        px: Optional[int] = None,
+        nx: bool = False,
+        xx: bool = False
+    ) -> Optional[bool]:
+        """Set a key, optionally with expiry and NX/XX conditions."""
+        with self._lock:
+            exists = self._alive(name)
+            if (nx and exists) or (xx and not exists):
+                return None
+            self._data[name] = str(value) if not isinstance(value, str) else value
+            self._expires.pop(name, None)
+            if ex is not None:
+                self._expires[name] = time.time() + ex
+            elif px is not None:
+                self._expires[name] = time.time() + px / 1000
+            return True
+
+    def setex(self, name: str, time_seconds: int, value: Any) -> bool:
+        """Set a key with an expiry in seconds."""
+        return bool(self.set(name, value, ex=time_seconds))
+
+    def delete(self, *names: str) -> int:
+        """Delete keys, returning how many existed."""
+        with self._lock:
+            deleted = 0
+            for name in names:
+                if self._alive(name):
+                    deleted += 1
+                self._data.pop(name, None)
+                self._expires.pop(name, None)
+            return deleted
+
+    unlink = delete
+
+    def exists(self, *names: str) -> int:
+        """Count how many of the keys exist."""
+        with self._lock:
+            return sum(1 for name in names if self._alive(name))
+
+    def expire(self, name: str, time_seconds: int) -> bool:
+        """Set the expiry of a key in seconds."""
+        with self._lock:
+            if not self._alive(name):
+                return False
+            self._expires[name] = time.time() + time_seconds
+            return True
+
+    def ttl(self, name: str) -> int:
+        """Return the remaining time to live of a key in seconds."""
+        with self._lock:
+            if not self._alive(name):
+                return -2
+            expires_at = self._expires.get(name)
+            return -1 if expires_at is None else max(0, int(expires_at - time.time()))
+
+    def incr(self, name: str, amount: int = 1) -> int:
+        """Increment an integer value."""
+        with self._lock:
+            value = int(self._data[name]) + amount if self._alive(name) else amount
+            self._data[name] = str(value)
+            return value
+
+    def scan(
+        self,
+        cursor: int = 0,
+        match: Optional[str] = None,
+        count: Optional[int] = None
+    ) -> Tuple[int, List[str]]:
+        """Incrementally iterate keys matching a glob pattern."""
+        with self._lock:
+            keys = sorted(self._data)
+        count = count or 10
+        batch = keys[cursor:cursor + count]
+        next_cursor = cursor + count if cursor + count < len(keys) else 0
+        with self._lock:
+            batch = [
+                key for key in batch
+                if self._alive(key) and (match is None or fnmatch.fnmatchcase(key, match))
+            ]
+        return next_cursor, batch
+
+    def scan_iter(self, match: Optional[str] = None, count: Optional[int] = None) -> Iterator[str]:
+        """Iterate over keys matching a glob pattern."""
+        cursor = 0
+        while True:
+            cursor, keys = self.scan(cursor, match=match, count=count)
+            yield from keys
+            if cursor == 0:
+                break
+
+    def flushdb(self) -> bool:
+        """Delete every key."""
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
+            return True
+
+    def _zset(self, name: str, create: bool = False) -> Optional[Dict[str, float]]:
+        if not self._alive(name):
+            if not create:
+                return None
+            self._data[name] = {}
+        return self._data[name]
+
+    @staticmethod
+    def _rank_range(length: int, start: int, end: int) -> range:
+        # Redis rank ranges are inclusive and allow negative indexes
+        start = max(0, start + length if start < 0 else start)
+        end = min(length - 1, end + length if end < 0 else end)
+        return range(start, end + 1)
+
+    def _ranked(self, zset: Dict[str, float]) -> List[Tuple[str, float]]:
+        return sorted(zset.items(), key=lambda item: (item[1], item[0]))
+
+    def zincrby(self, name: str, amount: float, value: str) -> float:
+        """Increment the score of a sorted set member."""
+        with self._lock:
+            zset = self._zset(name, create=True)
+            zset[value] = zset.get(value, 0.0) + amount
+            return zset[value]
+
+    def zcard(self, name: str) -> int:
+        """Return the number of members in a sorted set."""
+        with self._lock:
+            zset = self._zset(name)
+            return len(zset) if zset else 0
+
+    def zrevrange(
+        self,
+        name: str,
+        start: int,
+        end: int,
+        withscores: bool = False
+    ) -> List[Union[str, Tuple[str, float]]]:
+        """Return sorted set members by rank, highest score first."""
+        with self._lock:
+            zset = self._zset(name)
+            if not zset:
+                return []
+            ranked = self._ranked(zset)[::-1]
+            selected = [ranked[i] for i in self._rank_range(len(ranked), start, end)]
+        return selected if withscores else [member for member, _ in selected]
+
+    def zremrangebyrank(self, name: str, start: int, end: int) -> int:
+        """Remove sorted set members by rank, lowest score first."""
+        with self._lock:
+            zset = self._zset(name)
+            if not zset:
+                return 0
+            ranked = self._ranked(zset)
+            removed = [ranked[i][0] for i in self._rank_range(len(ranked), start, end)]
+            for member in removed:
+                del zset[member]
+            return len(removed)
+
+    def zadd(self, name: str, mapping: Dict[str, float], nx: bool = False, xx: bool = False) -> int:
+        """Add sorted set members, returning how many were new.
+
+        With ``nx`` existing members are left alone, with ``xx`` only
+        existing members are updated.
+        """
+        with self._lock:
+            zset = self._zset(name, create=True)
+            added = 0
+            for member, score in mapping.items():
+                if member not in zset:
+                    if xx:
+                        continue
+                    added += 1
+                elif nx:
+                    continue
+                zset[member] = float(score)
+            return added
+
+    def zscore(self, name: str, value: str) -> Optional[float]:
+        """Return the score of a sorted set member, None if it is missing."""
+        with self._lock:
+            zset = self._zset(name)
+            return zset.get(value) if zset else None
+
+    def zrem(self, name: str, *values: str) -> int:
+        """Remove sorted set members, returning how many were present."""
+        with self._lock:
+            zset = self._zset(name)
+            if not zset:
+                return 0
+            return sum(1 for value in values if zset.pop(value, None) is not None)
+
+    def zrangebyscore(
+        self,
+        name: str,
+        min: Union[float, str],
+        max: Union[float, str],
+        start: Optional[int] = None,
+        num: Optional[int] = None,
+        withscores: bool = False
+    ) -> List[Union[str, Tuple[str, float]]]:
+        """Return sorted set members with scores in a range, lowest first."""
+        def bound(value: Union[float, str]) -> Tuple[float, bool]:
+            # Redis accepts "-inf", "+inf" and "(" for exclusive bounds
+            if isinstance(value, str) and value.startswith("("):
+                return float(value[1:]), True
+            return float(value), False
+
+        (low, low_open), (high, high_open) = bound(min), bound(max)
+        with self._lock:
+            zset = self._zset(name)
+            if not zset:
+                return []
+            selected = [
+                (member, score) for member, score in self._ranked(zset)
+                if (score > low if low_open else score >= low) and (score < high if high_open else score <= high)
+            ]
+        if start is not None:
+            selected = selected[start:start + num if num is not None and num >= 0 else None]
+        return selected if withscores else [member for member, _ in selected]
+
+    def zcount(self, name: str, min: Union[float, str], max: Union[float, str]) -> int:
+        """Return the number of sorted set members with scores in a range."""
+        return len(self.zrangebyscore(name, min, max))
+
+    def _hash(self, name: str) -> Dict[str, str]:
+        if not self._alive(name):
+            self._data[name] = {}
+        return self._data[name]
+
+    def hset(self, name: str, key: Optional[str] = None, value: Any = None, mapping: Optional[Dict[str, Any]] = None) -> int:
+        """Set hash fields, returning how many were new."""
+        with self._lock:
+            fields = self._hash(name)
+            updates = dict(mapping or {})
+            if key is not None:
+                updates[key] = value
+            added = sum(1 for field in updates if field not in fields)
+            fields.update((field, str(value)) for field, value in updates.items())
+            return added
+
+    def hincrby(self, name: str, key: str, amount: int = 1) -> int:
+        """Increment an integer hash field."""
+        with self._lock:
+            fields = self._hash(name)
+            value = int(fields.get(key, 0)) + amount
+            fields[key] = str(value)
+            return value
+
+    def hincrbyfloat(self, name: str, key: str, amount: float = 1.0) -> float:
+        """Increment a float hash field."""
+        with self._lock:
+            fields = self._hash(name)
+            value = float(fields.get(key, 0)) + amount
+            fields[key] = repr(value)
+            return value
+
+    def hgetall(self, name: str) -> Dict[str, str]:
+        """Return every field of a hash."""
+        with self._lock:
+            return dict(self._data[name]) if self._alive(name) else {}
+
+    def sadd(self, name: str, *values: str) -> int:
+        """Add members to a set, returning how many were new."""
+        with self._lock:
+            if not self._alive(name):
+                self._data[name] = set()
+            members = self._data[name]
+            added = len(set(values) - members)
+            members.update(values)
+            return added
+
+    def pfadd(self, name: str, *values: str) -> int:
+        """Add members to a HyperLogLog, kept as an exact set; 1 if it changed."""
+        return int(self.sadd(name, *values) > 0)
+
+    def pfcount(self, *names: str) -> int:
+        """Return the number of distinct members of the union of HyperLogLogs."""
+        with self._lock:
+            members: set = set()
+            for name in names:
+                if self._alive(name):
+                    members.update(self._data[name])
+            return len(members)
+
+    def srem(self, name: str, *values: str) -> int:
+        """Remove members from a set, returning how many were present."""
+        with self._lock:
+            if not self._alive(name):
+                return 0
+            members = self._data[name]
+            removed = len(members & set(values))
+            members.difference_update(values)
+            if not members:
+                self.delete(name)
+            return removed
+
+    def smembers(self, name: str) -> set:
+        """Return the members of a set."""
+        with self._lock:
+            return set(self._data[name]) if self._alive(name) else set()
+
+    def srandmember(self, name: str) -> Optional[str]:
+        """Return an arbitrary member of a set."""
+        with self._lock:
+            if not self._alive(name):
+                return None
+            return next(iter(self._data[name]))
+
+    def publish(self, channel: str, message: Any) -> int:
+        """Send a message to a channel, returning how many subscribers got it."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for pubsub in subscribers:
+            pubsub._deliver(channel, message if isinstance(message, str) else str(message))
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages: bool = False) -> "_PubSub":
+        """Return a subscriber for channels of this database."""
+        return _PubSub(self, ignore_subscribe_messages)
+
+    def pipeline(self, transaction: bool = True) -> "_Pipeline":
+        """Return a pipeline that runs queued commands together."""
+        return _Pipeline(self)
+
+    def transaction(self, func: Callable[["_Pipeline"], Any], *watches: str, value_from_callable: bool = False) -> Any:
+        """Run ``func`` on a pipeline and execute it, like ``redis.Redis.transaction``.
+
+        Holding the lock throughout makes the read-modify-write atomic, so
+        the retries on a changed watched key that Redis needs never happen.
+        """
+        with self._lock:
+            pipe = _Pipeline(self, immediate=True)
+            value = func(pipe)
+            result = pipe.execute()
+        return value if value_from_callable else result
+
+
+class _Pipeline:
+    """Queue of commands for ``InMemoryRedis``, run atomically by ``execute``.
+
+    In a :meth:`InMemoryRedis.transaction`, commands run immediately until
+    ``multi`` is called, as after ``WATCH`` in Redis.
+    """
+
+    def __init__(self, client: InMemoryRedis, immediate: bool = False):
+        self._client = client
+        self._immediate = immediate
+        self._commands: List[Tuple[str, tuple, dict]] = []
+
+    def multi(self) -> None:
+        """Queue the following commands until ``execute``."""
+        self._immediate = False
+
+    def __getattr__(self, name: str):
+        method = getattr(self._client, name)
+        if self._immediate:
+            return method
+
+        def queue(*args: Any, **kwargs: Any) -> "_Pipeline":
+            self._commands.append((method.__name__, args, kwargs))
+            return self
+        return queue
+
+    def execute(self) -> List[Any]:
+        """Run the queued commands and return their results."""
+        commands, self._commands = self._commands, []
+        with self._client._lock:
+            return [getattr(self._client, name)(*args, **kwargs) for name, args, kwargs in commands]
+
+    def __enter__(self) -> "_Pipeline":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._commands = []
+
+
+class _PubSub:
+    """Channel subscriber for ``InMemoryRedis``, mirroring ``redis.client.PubSub``."""
+
+    def __init__(self, client: InMemoryRedis, ignore_subscribe_messages: bool = False):
+        self._client = client
+        self._ignore_subscribe_messages = ignore_subscribe_messages
+        self._messages: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self.channels: List[str] = []
+
+    def _deliver(self, channel: str, data: str) -> None:
+        self._messages.put({"type": "message", "pattern": None, "channel": channel, "data": data})
+
+    def subscribe(self, *channels: str) -> None:
+        """Subscribe to channels."""
+        with self._client._lock:
+            for channel in channels:
+                if channel in self.channels:
+                    continue
+                self.channels.append(channel)
+                self._client._subscribers.setdefault(channel, []).append(self)
+                if not self._ignore_subscribe_messages:
+                    self._messages.put({
+                        "type": "subscribe", "pattern": None, "channel": channel, "data": len(self.channels)
+                    })
+
+    def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0) -> Optional[Dict[str, Any]]:
+        """Return the next message, waiting up to ``timeout`` seconds."""
+        try:
+            message = self._messages.get(timeout=timeout) if timeout else self._messages.get_nowait()
+        except queue.Empty:
+            return None
+        if ignore_subscribe_messages and message["type"] != "message":
+            return None
+        return message
+
+    def close(self) -> None:
+        """Unsubscribe from every channel."""
+        with self._client._lock:
+            for channel in self.channels:
+                subscribers = self._client._subscribers.get(channel, [])
+                if self in subscribers:
+                    subscribers.remove(self)
+            self.channels = []
+
+
+def create_redis_client() -> Union["Redis", InMemoryRedis]:
+    """Create a Redis client from settings.
+
+    ``REDIS_BACKEND`` selects ``redis`` or ``memory``. When it is unset, a
+    real Redis client is used in production or when ``REDIS_URL`` or
+    ``REDIS_HOST`` is configured, and the in-memory stand-in otherwise.
+
+    Returns:
+        Union[Redis, InMemoryRedis]: Client with ``decode_responses`` semantics
+
+    Raises:
+        RuntimeError: If the in-memory stand-in is selected in production,
+            where its state would be per worker and lost on restart
+    """
+    backend = settings.REDIS_BACKEND
+    if not backend:
+        configured = settings.REDIS_URL or "REDIS_HOST" in settings.model_fields_set
+        backend = "redis" if configured or settings.is_production else "memory"
+    if backend == "memory" and settings.is_production:
+        raise RuntimeError("REDIS_BACKEND=memory is not shared between workers and cannot be used in production")
+    if backend == "memory":
+        logger.info("Using in-memory Redis stand-in")
+        return InMemoryRedis()
+    # Imported here so deployments using the in-memory backend never load it
+    from redis import Redis
+
+    if settings.REDIS_URL:
+        return Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=settings.REDIS_DB,
+        password=settings.REDIS_PASSWORD,
+        decode_responses=True
+    )
+
+
+def get_redis_client() -> Union["Redis", InMemoryRedis]:
+    """Return the process-wide Redis client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = create_redis_client()
+    return _client
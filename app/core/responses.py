@@ -0,0 +1,160 @@
+"""Fast JSON responses for mood analysis payloads.
+
+FastAPI's default response path dumps the returned model, validates it again
+against ``response_model`` and serializes it through the JSON encoder. The
+analysis models are already validated when they are built, so the helpers
+here render them straight to bytes instead.
+"""
+
+import json
+from datetime import date, datetime
+from operator import attrgetter
+from typing import Any, Dict, List, Optional, Sequence
+
+from starlette.responses import JSONResponse, Response
+
+from app.core.pagination import Page
+from app.schemas.mood import MoodAnalysis, TrackMood
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
+
+LAYOUT_ROWS = "rows"
+LAYOUT_COLUMNAR = "columnar"
+
+TRACK_FIELDS = tuple(TrackMood.model_fields)
+
+
+def _default(obj: Any) -> Any:
+    """Encode values the stdlib JSON encoder does not understand."""
+    if hasattr(obj, "tolist"):
+        # NumPy arrays and scalars
+        return obj.tolist()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize content to compact JSON bytes.
+
+    Uses orjson when it is installed, which also serializes NumPy arrays
+    natively. Falls back to the stdlib encoder otherwise.
+
+    Args:
+        content: JSON-compatible content, may contain NumPy arrays
+
+    Returns:
+        bytes: UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with :func:`dumps`."""
+
+    def render(self, content: Any) -> bytes:
+        """Render content to bytes."""
+        return dumps(content)
+
+
+def track_columns(
+    tracks: List[TrackMood],
+    fields: Optional[Sequence[str]] = None
+) -> Dict[str, List[Any]]:
+    """Convert track moods into parallel arrays, one per field.
+
+    Args:
+        tracks: Analyzed tracks
+        fields: Fields to include, all fields when None
+
+    Returns:
+        Dict[str, List[Any]]: Field name to list of values
+    """
+    return {
+        field: list(map(attrgetter(field), tracks))
+        for field in (fields or TRACK_FIELDS)
+    }
+
+
+def track_rows(
+    tracks: List[TrackMood],
+    fields: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
+    """Convert track moods into one object per track.
+
+    Args:
+        tracks: Analyzed tracks
+        fields: Fields to include, all fields when None
+
+    Returns:
+        List[Dict[str, Any]]: One dict per track
+    """
+    getters = [(field, attrgetter(field)) for field in (fields or TRACK_FIELDS)]
+    return [{field: get(track) for field, get in getters} for track in tracks]
+
+
+def analysis_content(
+    analysis: MoodAnalysis,
+    layout: str = LAYOUT_ROWS,
+    fields: Optional[Sequence[str]] = None,
+    page: Optional[Page] = None
+) -> Dict[str, Any]:
+    """Build the JSON content for a mood analysis without re-validating it.
+
+    Args:
+        analysis: Already validated analysis
+        layout: ``rows`` for one object per track, ``columnar`` for parallel arrays
+        fields: Sparse fieldset for tracks, all fields when None
+        page: Page of ``analysis.tracks`` to include instead of every track
+
+    Returns:
+        Dict[str, Any]: JSON-compatible content
+    """
+    if page is None and fields is None and layout == LAYOUT_ROWS:
+        return analysis.model_dump()
+
+    content = analysis.model_dump(exclude={"tracks"})
+    tracks = analysis.tracks if page is None else page.items
+    if layout == LAYOUT_COLUMNAR:
+        content["tracks"] = track_columns(tracks, fields)
+    else:
+        content["tracks"] = track_rows(tracks, fields)
+    if page is not None:
+        content["next_cursor"] = page.next_cursor
+        content["total_tracks"] = page.total
+    return content
+
+
+def render_analysis(
+    analysis: MoodAnalysis,
+    layout: str = LAYOUT_ROWS,
+    fields: Optional[Sequence[str]] = None,
+    page: Optional[Page] = None
+) -> Response:
+    """Render a mood analysis as a fast JSON response.
+
+    Args:
+        analysis: Already validated analysis
+        layout: Response layout, see :func:`analysis_content`
+        fields: Sparse fieldset for tracks
+        page: Page of tracks to include
+
+    Returns:
+        Response: Rendered JSON response
+    """
+    return FastJSONResponse(analysis_content(analysis, layout, fields, page))
@@ -0,0 +1,235 @@
+"""Server-side sessions keyed by an opaque cookie."""
+
+import json
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+class Session(dict):
+    """Session data that remembers whether it was modified."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.modified = False
+        self.regenerate = False
+
+    def regenerate_id(self) -> None:
+        """Save the session under a new ID, e.g. at login against session fixation."""
+        self.modified = True
+        self.regenerate = True
+
+    def __setitem__(self, key, value):
+        self.modified = True
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.modified = True
+        super().__delitem__(key)
+
+    def clear(self):
+        self.modified = True
+        super().clear()
+
+    def pop(self, *args):
+        self.modified = True
+        return super().pop(*args)
+
+    def popitem(self):
+        self.modified = True
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self.modified = True
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self.modified = True
+        super().update(*args, **kwargs)
+
+
+class SessionStore:
+    """Session storage in Redis with a local LRU for hot sessions.
+
+    The local copy of a session's data is only trusted for ``local_ttl``
+    seconds so changes made by other workers are picked up quickly. The
+    key itself is checked in Redis on every load, so a session deleted by
+    any worker, e.g. at logout, ends everywhere at once.
+    """
+
+    def __init__(
+        self,
+        redis: Any,
+        ttl: int,
+        prefix: str = "session:",
+        local_cache_size: int = 10000,
+        local_ttl: float = 10
+    ):
+        """Initialize the store.
+
+        Args:
+            redis: Redis client (or the in-memory stand-in)
+            ttl: Session lifetime in seconds
+            prefix: Key prefix for sessions in Redis
+            local_cache_size: Maximum number of sessions kept in process
+            local_ttl: Seconds a local copy of the data is used before re-reading Redis
+        """
+        self.redis = redis
+        self.ttl = ttl
+        self.prefix = prefix
+        self.local_cache_size = local_cache_size
+        self.local_ttl = local_ttl
+        self._local: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    @staticmethod
+    def new_session_id() -> str:
+        """Generate a new opaque session ID."""
+        return secrets.token_urlsafe(32)
+
+    def _remember(self, session_id: str, data: Dict[str, Any]) -> None:
+        self._local[session_id] = (time.monotonic() + self.local_ttl, data)
+        self._local.move_to_end(session_id)
+        while len(self._local) > self.local_cache_size:
+            self._local.popitem(last=False)
+
+    def load(self, session_id: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Load a session.
+
+        Args:
+            session_id: Session ID from the cookie
+
+        Returns:
+            Tuple[Optional[Dict[str, Any]], bool]: Session data, or None if
+            it does not exist or is unreadable, and whether it was read from
+            Redis (in which case its expiry was refreshed)
+        """
+        entry = self._local.get(session_id)
+        fresh = entry is not None and entry[0] > time.monotonic()
+        try:
+            if fresh:
+                exists = self.redis.exists(self.prefix + session_id)
+            else:
+                raw = self.redis.get(self.prefix + session_id)
+        except Exception as e:
+            logger.error(f"Error loading session: {str(e)}")
+            return None, False
+        if fresh and exists:
+            self._local.move_to_end(session_id)
+            return dict(entry[1]), False
+        if fresh or raw is None:
+            self._local.pop(session_id, None)
+            return None, False
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            logger.warning("Ignoring unreadable session data")
+            self._local.pop(session_id, None)
+            return None, False
+        try:
+            self.redis.expire(self.prefix + session_id, self.ttl)
+        except Exception as e:
+            logger.warning(f"Error refreshing session expiry: {str(e)}")
+        self._remember(session_id, data)
+        return dict(data), True
+
+    def save(self, session_id: str, data: Dict[str, Any]) -> None:
+        """Write a session to Redis and the local cache."""
+        self.redis.setex(self.prefix + session_id, self.ttl, json.dumps(data))
+        self._remember(session_id, dict(data))
+
+    def delete(self, session_id: str) -> None:
+        """Delete a session."""
+        self._local.pop(session_id, None)
+        try:
+            self.redis.delete(self.prefix + session_id)
+        except Exception as e:
+            logger.error(f"Error deleting session: {str(e)}")
+
+
+class ServerSessionMiddleware:
+    """Session middleware keeping session data server-side.
+
+    A drop-in replacement for Starlette's ``SessionMiddleware``: handlers
+    still use ``request.session``, but the cookie only carries an opaque
+    session ID. Sessions are written back only when they change.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: SessionStore,
+        session_cookie: str = "session",
+        max_age: int = 14 * 24 * 60 * 60,
+        same_site: str = "lax",
+        https_only: bool = False
+    ):
+        """Initialize the middleware.
+
+        Args:
+            app: ASGI application
+            store: Session store
+            session_cookie: Cookie name
+            max_age: Cookie lifetime in seconds
+            same_site: SameSite cookie attribute
+            https_only: Only send the cookie over HTTPS
+        """
+        self.app = app
+        self.store = store
+        self.session_cookie = session_cookie
+        self.max_age = max_age
+        self.security_flags = f"httponly; samesite={same_site}"
+        if https_only:
+            self.security_flags += "; secure"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        session_id = HTTPConnection(scope).cookies.get(self.session_cookie)
+        data, refreshed = self.store.load(session_id) if session_id else (None, False)
+        if data is None:
+            session_id = None
+        scope["session"] = session = Session(data or {})
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal session_id
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if session.modified and session:
+                    is_new = session_id is None or session.regenerate
+                    if is_new:
+                        if session_id is not None:
+                            self.store.delete(session_id)
+                        session_id = self.store.new_session_id()
+                    try:
+                        self.store.save(session_id, dict(session))
+                    except Exception as e:
+                        logger.error(f"Error saving session: {str(e)}", exc_info=True)
+                    if is_new:
+                        headers.append("Set-Cookie", self._cookie(session_id, self.max_age))
+                elif session.modified and session_id is not None:
+                    self.store.delete(session_id)
+                    headers.append("Set-Cookie", self._cookie("null", 0))
+                elif refreshed:
+                    # Keep the cookie lifetime in step with the store's TTL
+                    headers.append("Set-Cookie", self._cookie(session_id, self.max_age))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _cookie(self, value: str, max_age: int) -> str:
+        expires = "expires=Thu, 01 Jan 1970 00:00:00 GMT; " if max_age == 0 else ""
+        return (
+            f"{self.session_cookie}={value}; path=/; {expires}"
+            f"Max-Age={max_age}; {self.security_flags}"
+        )
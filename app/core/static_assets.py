@@ -0,0 +1,226 @@
+"""Fingerprinted static assets with precompressed variants."""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import PlainTextResponse, Response
+from starlette.types import Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age={max_age}, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+@dataclass
+class Asset:
+    """A static file and its encoded variants."""
+
+    path: str
+    hashed_path: str
+    content_type: str
+    digest: str
+    # Content-Encoding ("identity", "gzip", "br") to body
+    variants: Dict[str, bytes] = field(default_factory=dict)
+
+    def etag(self, encoding: str = "identity") -> str:
+        """Return the strong ETag of one variant; each encoding has its own."""
+        if encoding == "identity":
+            return f'"{self.digest}"'
+        return f'"{self.digest}-{encoding}"'
+
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into encoding to q-value."""
+    accepted = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag.
+
+    The header is a comma-separated list of ETags or ``*``, compared weakly
+    as RFC 9110 requires, so ``W/"abc"`` matches ``"abc"``.
+    """
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate and candidate == etag:
+            return True
+    return False
+
+
+def negotiate_encoding(header: str, available: List[str]) -> str:
+    """Pick the best content encoding the client accepts.
+
+    Args:
+        header: Accept-Encoding request header
+        available: Encodings available, in order of preference
+
+    Returns:
+        str: Chosen encoding, ``identity`` when none match
+    """
+    accepted = _parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = "identity", 0.0
+    for encoding in available:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class StaticAssets:
+    """ASGI app serving fingerprinted static files.
+
+    At startup every file under ``directory`` is hashed and gzip/brotli
+    variants are compressed once. Templates link to the hashed name through
+    :meth:`url`, which is served with an immutable Cache-Control header, so
+    browsers never revalidate it. The original names keep working but must
+    be revalidated.
+    """
+
+    def __init__(self, directory: str, prefix: str = "/static", max_age: int = 31536000):
+        """Initialize the asset store.
+
+        Args:
+            directory: Directory containing static files
+            prefix: URL prefix the app is mounted at
+            max_age: Cache lifetime of fingerprinted files in seconds
+        """
+        self.directory = directory
+        self.prefix = prefix.rstrip("/")
+        self.max_age = max_age
+        self._by_path: Dict[str, Asset] = {}
+        self._by_hashed_path: Dict[str, Asset] = {}
+
+    def build(self) -> int:
+        """Fingerprint and compress every file in the directory.
+
+        Returns:
+            int: Number of assets built
+        """
+        by_path, by_hashed_path = {}, {}
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                if filename.startswith("."):
+                    continue
+                full_path = os.path.join(root, filename)
+                path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+                with open(full_path, "rb") as f:
+                    asset = self._build_asset(path, f.read())
+                by_path[path] = asset
+                by_hashed_path[asset.hashed_path] = asset
+        self._by_path, self._by_hashed_path = by_path, by_hashed_path
+        logger.info(f"Built {len(by_path)} static assets")
+        return len(by_path)
+
+    @staticmethod
+    def _build_asset(path: str, content: bytes) -> Asset:
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        stem, ext = os.path.splitext(path)
+        # Starlette appends the charset for text/* types
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        asset = Asset(
+            path=path,
+            hashed_path=f"{stem}.{digest}{ext}",
+            content_type=content_type,
+            digest=digest,
+            variants={"identity": content}
+        )
+        if brotli is not None:
+            compressed = brotli.compress(content, quality=11)
+            if len(compressed) < len(content):
+                asset.variants["br"] = compressed
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) < len(content):
+            asset.variants["gzip"] = compressed
+        return asset
+
+    def url(self, path: str) -> str:
+        """Return the URL of a static file, fingerprinted when known.
+
+        Args:
+            path: Path relative to the static directory
+
+        Returns:
+            str: URL to link to from templates
+        """
+        asset = self._by_path.get(path)
+        return f"{self.prefix}/{asset.hashed_path if asset else path}"
+
+    def _lookup(self, path: str) -> Tuple[Optional[Asset], bool]:
+        asset = self._by_hashed_path.get(path)
+        if asset is not None:
+            return asset, True
+        return self._by_path.get(path), False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Serve a static file."""
+        assert scope["type"] == "http"
+        if scope["method"] not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405)
+            await response(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if path.startswith(self.prefix + "/"):
+            path = path[len(self.prefix):]
+        asset, fingerprinted = self._lookup(path.lstrip("/"))
+        if asset is None:
+            response = PlainTextResponse("Not Found", status_code=404)
+            await response(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = negotiate_encoding(
+            request_headers.get("accept-encoding", ""),
+            [e for e in ("br", "gzip") if e in asset.variants]
+        )
+        headers = {
+            "Cache-Control": (
+                IMMUTABLE_CACHE_CONTROL.format(max_age=self.max_age)
+                if fingerprinted else REVALIDATE_CACHE_CONTROL
+            ),
+            "ETag": asset.etag(encoding),
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(request_headers.get("if-none-match", ""), headers["ETag"]):
+            response = Response(status_code=304, headers=headers)
+            await response(scope, receive, send)
+            return
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        body = asset.variants[encoding]
+        if scope["method"] == "HEAD":
+            headers["Content-Length"] = str(len(body))
+            body = b""
+        response = Response(body, headers=headers, media_type=asset.content_type)
+        await response(scope, receive, send)
@@ -0,0 +1,209 @@
+"""Template rendering with bytecode caching, fragment caching and streaming."""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterator, Optional, Tuple
+
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from starlette.responses import StreamingResponse
+from starlette.templating import Jinja2Templates
+
+from app.core.metrics import TEMPLATE_RENDER_SECONDS
+from app.core.tracing import record_span
+
+logger = logging.getLogger(__name__)
+
+# Chunks yielded by ``Template.generate`` are tiny (one per template
+# statement); they are joined into blocks of roughly this size before
+# being written to the socket.
+STREAM_CHUNK_SIZE = 8192
+
+
+class FragmentCache:
+    """LRU cache with TTL for rendered template fragments."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached fragments
+            ttl: Time to live of a fragment in seconds
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, str]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Get a fragment, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: str) -> None:
+        """Store a fragment, evicting the least recently used one if full."""
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every fragment."""
+        self._entries.clear()
+
+
+class FragmentCacheExtension(Extension):
+    """Jinja extension adding a ``{% cache %}`` block.
+
+    The block body is rendered once per distinct key and reused until it
+    expires::
+
+        {% cache "recommendations", current_mood.primary_mood %}
+            ...
+        {% endcache %}
+    """
+
+    tags = {"cache"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key_parts = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            key_parts.append(parser.parse_expression())
+        body = parser.parse_statements(["name:endcache"], drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method("_cache_support", [nodes.List(key_parts)]),
+            [],
+            [],
+            body
+        ).set_lineno(lineno)
+
+    def _cache_support(self, key_parts, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        key = tuple(str(part) for part in key_parts)
+        fragment = cache.get(key)
+        if fragment is None:
+            fragment = caller()
+            cache.set(key, fragment)
+        return fragment
+
+
+class TemplateRenderer(Jinja2Templates):
+    """Jinja2 templates with precompilation, fragment caching and streaming.
+
+    Compiled templates are persisted with a bytecode cache so that new
+    workers load them instead of recompiling, and auto reload can be turned
+    off so templates are not stat'ed on every render.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        bytecode_cache_dir: Optional[str] = None,
+        auto_reload: bool = True,
+        fragment_cache_size: int = 1024,
+        fragment_cache_ttl: float = 300,
+        **env_options: Any
+    ):
+        """Initialize the renderer.
+
+        Args:
+            directory: Template directory
+            bytecode_cache_dir: Directory for compiled templates, a temporary
+                directory when None
+            auto_reload: Check templates for changes on every render
+            fragment_cache_size: Maximum number of cached fragments
+            fragment_cache_ttl: Time to live of a cached fragment in seconds
+            env_options: Extra Jinja environment options
+        """
+        env_options.setdefault("bytecode_cache", FileSystemBytecodeCache(bytecode_cache_dir))
+        env_options.setdefault("auto_reload", auto_reload)
+        env_options["extensions"] = [*env_options.get("extensions", []), FragmentCacheExtension]
+        super().__init__(directory=directory, **env_options)
+        self.env.fragment_cache = FragmentCache(fragment_cache_size, fragment_cache_ttl)
+
+    def precompile(self) -> int:
+        """Compile every template into the environment's cache.
+
+        Returns:
+            int: Number of templates compiled
+        """
+        names = self.env.list_templates(extensions=["html"])
+        for name in names:
+            self.env.get_template(name)
+        logger.info(f"Precompiled {len(names)} templates")
+        return len(names)
+
+    def TemplateResponse(self, name: str, context: Dict[str, Any], *args: Any, **kwargs: Any):
+        """Render a template to a response, recording the render time."""
+        start = time.perf_counter()
+        response = super().TemplateResponse(name, context, *args, **kwargs)
+        elapsed = time.perf_counter() - start
+        TEMPLATE_RENDER_SECONDS.labels(name).observe(elapsed)
+        record_span("template", elapsed)
+        return response
+
+    def StreamingTemplateResponse(
+        self,
+        name: str,
+        context: Dict[str, Any],
+        status_code: int = 200
+    ) -> StreamingResponse:
+        """Render a template as a streamed response.
+
+        The status code and headers are sent before rendering starts, so
+        errors raised while rendering cannot be turned into an error page.
+
+        Args:
+            name: Template name
+            context: Template context, must include ``request``
+            status_code: Response status code
+
+        Returns:
+            StreamingResponse: Response streaming the rendered template
+        """
+        if "request" not in context:
+            raise ValueError('context must include a "request" key')
+        template = self.get_template(name)
+        return StreamingResponse(
+            self._iter_chunks(name, template.generate(context)),
+            status_code=status_code,
+            media_type="text/html"
+        )
+
+    @staticmethod
+    async def _iter_chunks(name: str, parts: Iterator[str]):
+        buffer = []
+        size = 0
+        elapsed = 0.0
+        start = time.perf_counter()
+        for part in parts:
+            buffer.append(part)
+            size += len(part)
+            if size >= STREAM_CHUNK_SIZE:
+                chunk = "".join(buffer).encode("utf-8")
+                elapsed += time.perf_counter() - start
+                yield chunk
+                start = time.perf_counter()
+                buffer = []
+                size = 0
+        chunk = "".join(buffer).encode("utf-8")
+        elapsed += time.perf_counter() - start
+        # Only time spent rendering counts, not time waiting on the client
+        TEMPLATE_RENDER_SECONDS.labels(name).observe(elapsed)
+        record_span("template", elapsed)
+        if chunk:
+            yield chunk
@@ -0,0 +1,269 @@
+"""Per-request span timing and slow-request profiling.
+
+Layers report how long they spent on a request with :func:`record_span`
+or :class:`span`; the time is accumulated per span name on the request's
+:class:`RequestTrace`, held in a context variable. ``ServerTimingMiddleware``
+exposes the totals in a ``Server-Timing`` header and, when a
+:class:`SlowRequestProfiler` is attached, writes a stack profile of every
+request slower than the threshold.
+"""
+
+import collections
+import functools
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+_current_trace: ContextVar[Optional["RequestTrace"]] = ContextVar("mindbeat_trace", default=None)
+
+
+class RequestTrace:
+    """Span totals for one request."""
+
+    __slots__ = ("method", "path", "start", "spans", "thread_id", "samples")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.start = time.perf_counter()
+        # Span name to [total seconds, count]
+        self.spans: Dict[str, list] = {}
+        self.thread_id = threading.get_ident()
+        self.samples: Optional[collections.Counter] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        """Add time spent in a span."""
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def elapsed(self) -> float:
+        """Seconds since the request started."""
+        return time.perf_counter() - self.start
+
+    def server_timing(self) -> str:
+        """Format the spans as a Server-Timing header value."""
+        metrics = [
+            f"{name};dur={seconds * 1000:.1f};desc=\"{count} calls\""
+            for name, (seconds, count) in self.spans.items()
+        ]
+        metrics.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """Return the trace of the current request, if any."""
+    return _current_trace.get()
+
+
+def record_span(name: str, seconds: float) -> None:
+    """Report time spent in a span to the current request, if any."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+class span:
+    """Context manager timing a block as a span of the current request.
+
+    Works in both sync and async code; concurrent spans of the same name
+    are summed, so they can add up to more than the wall time.
+    """
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        record_span(self.name, time.perf_counter() - self.start)
+
+
+def traced(name: str) -> Callable:
+    """Decorate a function so each call is recorded as a span."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class SlowRequestProfiler:
+    """Sampling profiler that keeps stacks of slow requests.
+
+    While requests are in flight a background thread samples the stack of
+    the thread serving them every ``interval`` seconds. When a request
+    takes longer than ``threshold`` seconds, its samples are written to
+    ``output_dir`` in folded-stack format (one ``frame;frame;... count``
+    line per stack), ready for flamegraph.pl or speedscope.
+
+    Requests served concurrently on the same event loop share a thread, so
+    their profiles include each other's samples.
+    """
+
+    def __init__(self, threshold: float, output_dir: str, interval: float = 0.005):
+        """Initialize the profiler.
+
+        Args:
+            threshold: Request duration in seconds above which a profile is written
+            output_dir: Directory for profile files
+            interval: Sampling interval in seconds
+        """
+        self.threshold = threshold
+        self.output_dir = output_dir
+        self.interval = interval
+        self._active: Dict[int, RequestTrace] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def begin(self, trace: RequestTrace) -> None:
+        """Start collecting samples for a request."""
+        trace.samples = collections.Counter()
+        with self._lock:
+            self._active[id(trace)] = trace
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+            self._thread.start()
+        self._wake.set()
+
+    def end(self, trace: RequestTrace) -> Optional[str]:
+        """Stop sampling a request and write its profile if it was slow.
+
+        Returns:
+            Optional[str]: Path of the written profile, if any
+        """
+        with self._lock:
+            self._active.pop(id(trace), None)
+            if not self._active:
+                self._wake.clear()
+        duration = trace.elapsed()
+        if duration < self.threshold or not trace.samples:
+            return None
+        try:
+            return self._write(trace, duration)
+        except OSError as e:
+            logger.error(f"Error writing request profile: {str(e)}")
+            return None
+
+    def _write(self, trace: RequestTrace, duration: float) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", trace.path).strip("_") or "root"
+        filename = f"{time.strftime('%Y%m%dT%H%M%S')}_{trace.method}_{slug}_{int(duration * 1000)}ms.folded"
+        path = os.path.join(self.output_dir, filename)
+        with open(path, "w") as f:
+            for stack, count in trace.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.values())
+            if not active:
+                continue
+            frames = sys._current_frames()
+            stacks: Dict[int, str] = {}
+            for trace in active:
+                stack = stacks.get(trace.thread_id)
+                if stack is None:
+                    frame = frames.get(trace.thread_id)
+                    if frame is None:
+                        continue
+                    stack = stacks[trace.thread_id] = self._fold(frame)
+                trace.samples[stack] += 1
+
+    @staticmethod
+    def _fold(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            module = frame.f_globals.get("__name__", "?")
+            names.append(f"{module}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+
+class ServerTimingMiddleware:
+    """Attach a trace to every request and report it in ``Server-Timing``.
+
+    With ``expose_header`` off, traces only feed the slow-request log and
+    profiler, so internal timings are not sent to clients. The header is
+    sent with the response start, so spans recorded while a streamed body
+    is being produced only show up in the slow-request log and profile.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        profiler: Optional[SlowRequestProfiler] = None,
+        slow_request_threshold: Optional[float] = None,
+        expose_header: bool = True
+    ):
+        """Initialize the middleware.
+
+        Args:
+            app: ASGI application
+            profiler: Profiler for slow requests, disabled when None
+            slow_request_threshold: Log the span breakdown of requests slower
+                than this many seconds
+            expose_header: Send the ``Server-Timing`` header
+        """
+        self.app = app
+        self.profiler = profiler
+        self.slow_request_threshold = slow_request_threshold
+        self.expose_header = expose_header
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace(scope["method"], scope["path"])
+        token = _current_trace.set(trace)
+        if self.profiler is not None:
+            self.profiler.begin(trace)
+
+        async def send_wrapper(message: Message) -> None:
+            if self.expose_header and message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", trace.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
+            self._finish(trace)
+
+    def _finish(self, trace: RequestTrace) -> None:
+        profile_path = self.profiler.end(trace) if self.profiler is not None else None
+        duration = trace.elapsed()
+        if self.slow_request_threshold is not None and duration >= self.slow_request_threshold:
+            logger.warning(
+                f"Slow request {trace.method} {trace.path}: {duration * 1000:.1f}ms",
+                extra={
+                    "spans_ms": {name: round(s * 1000, 1) for name, (s, _) in trace.spans.items()},
+                    "profile": profile_path,
+                }
+            )
@@ -1,23 +1,89 @@
 """Main application module."""
 
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.sessions import SessionMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.api import auth, frontend
+from app.api.v1 import api_router
+from app.core.cache import CacheSweeper, get_cache
+from app.core.compression import CompressionMiddleware
+from app.core.concurrency import ConcurrencyLimitMiddleware
 from app.core.config import settings
+from app.core.lifecycle import drain, open_pools, warm_up
 from app.core.logging_config import configure_logging
+from app.core.metrics import REGISTRY
+from app.core.redis_client import InMemoryRedis, get_redis_client
+from app.core.sessions import ServerSessionMiddleware, SessionStore
+from app.core.tracing import ServerTimingMiddleware, SlowRequestProfiler
+from app.services.features import get_feature_store
+from app.services.mood_analyzer import MoodAnalyzer
+from app.services.sync import get_sync_scheduler
 
 # Configure logging based on environment
 configure_logging(settings.ENVIRONMENT)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the worker up before serving and drain it on shutdown."""
+    logger.info(
+        "Starting MindBeat application",
+        extra={
+            "environment": settings.ENVIRONMENT,
+            "version": settings.VERSION,
+            "https_enabled": settings.USE_HTTPS,
+            "allowed_hosts": settings.ALLOWED_HOSTS
+        }
+    )
+    settings.log_summary()
+    await warm_up([
+        ("static assets", frontend.static_assets.build),
+        ("templates", frontend.templates.precompile),
+        ("mood analyzer", MoodAnalyzer().warm_up),
+        ("connection pools", lambda: open_pools(settings.HTTP_POOL_SIZE)),
+        ("cache invalidation", get_cache().start_listener),
+        ("feature cache", lambda: get_feature_store().warm(settings.WARMUP_FEATURE_CACHE_KEYS)),
+    ])
+    cache = get_cache()
+    sweeper = CacheSweeper(cache.redis, cache.sweep_key, batch_size=settings.CACHE_SWEEP_BATCH_SIZE)
+    sweeping = asyncio.create_task(sweeper.run(settings.CACHE_SWEEP_INTERVAL), name="cache-sweeper")
+    features = get_feature_store()
+    flushing = asyncio.create_task(
+        features.run_hot_flusher(settings.FEATURE_HOT_FLUSH_INTERVAL, settings.FEATURE_HOT_TRIM_INTERVAL),
+        name="hot-track-flusher"
+    )
+    scheduler = get_sync_scheduler()
+    syncing = None
+    if settings.SYNC_MODE == "in-process":
+        if isinstance(scheduler.redis, InMemoryRedis):
+            logger.warning("The in-memory Redis stand-in is per process: each worker syncs with its own rate limit")
+        syncing = asyncio.create_task(scheduler.run(), name="sync-scheduler")
+    yield
+    logger.info("Shutting down MindBeat application")
+    sweeper.stop()
+    scheduler.stop()
+    await sweeping
+    if syncing is not None:
+        try:
+            await asyncio.wait_for(syncing, settings.SHUTDOWN_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Sync scheduler did not stop in time")
+    await drain(settings.SHUTDOWN_DRAIN_TIMEOUT)
+    # After the drain, so lookups of the last requests are flushed too
+    features.stop()
+    await flushing
+    get_cache().stop_listener()
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    description="Analyze your music listening habits and mood patterns"
+    description="Analyze your music listening habits and mood patterns",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -29,32 +95,60 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Add response compression middleware
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_levels=settings.COMPRESSION_GZIP_LEVELS,
+    brotli_levels=settings.COMPRESSION_BROTLI_LEVELS
+)
+
 # Add session middleware
 app.add_middleware(
-    SessionMiddleware,
-    secret_key=settings.SECRET_KEY,
+    ServerSessionMiddleware,
+    store=SessionStore(
+        get_redis_client(),
+        ttl=settings.SESSION_MAX_AGE,
+        local_cache_size=settings.SESSION_LOCAL_CACHE_SIZE,
+        local_ttl=settings.SESSION_LOCAL_CACHE_TTL
+    ),
     session_cookie=settings.SESSION_COOKIE_NAME,
     max_age=settings.SESSION_MAX_AGE,
     same_site="lax",
     https_only=settings.USE_HTTPS
 )
 
+# Add request tracing middleware, around everything but load shedding, so
+# it times the whole request but not requests that are shed
+app.add_middleware(
+    ServerTimingMiddleware,
+    profiler=SlowRequestProfiler(
+        threshold=settings.SLOW_REQUEST_THRESHOLD_MS / 1000,
+        output_dir=settings.PROFILE_OUTPUT_DIR,
+        interval=settings.PROFILE_SAMPLE_INTERVAL_MS / 1000
+    ) if settings.PROFILE_SLOW_REQUESTS else None,
+    slow_request_threshold=settings.SLOW_REQUEST_THRESHOLD_MS / 1000,
+    expose_header=settings.server_timing_enabled
+)
+
+# Add load shedding, outermost so rejected requests cost next to nothing
+if settings.CONCURRENCY_LIMIT_ENABLED:
+    app.add_middleware(
+        ConcurrencyLimitMiddleware,
+        limits=settings.CONCURRENCY_LIMITS,
+        routes=settings.CONCURRENCY_ROUTES,
+        priority_paths=settings.CONCURRENCY_PRIORITY_PATHS,
+        initial_limit=settings.CONCURRENCY_INITIAL_LIMIT,
+        min_limit=settings.CONCURRENCY_MIN_LIMIT,
+        latency_target=settings.CONCURRENCY_LATENCY_TARGET,
+        retry_after=settings.CONCURRENCY_RETRY_AFTER
+    )
+
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(frontend.router, tags=["frontend"])
-
-@app.on_event("startup")
-async def startup_event():
-    """Run startup tasks."""
-    logger.info(
-        "Starting MindBeat application",
-        extra={
-            "environment": settings.ENVIRONMENT,
-            "version": settings.VERSION,
-            "https_enabled": settings.USE_HTTPS,
-            "allowed_hosts": settings.ALLOWED_HOSTS
-        }
-    )
+app.include_router(api_router, prefix=settings.API_V1_STR)
+app.mount("/static", frontend.static_assets, name="static")
 
 @app.get("/health")
 async def health_check():
@@ -64,3 +158,11 @@ async def health_check():
         "version": settings.VERSION,
         "environment": settings.ENVIRONMENT
     }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics endpoint."""
+    return PlainTextResponse(
+        REGISTRY.render(),
+        media_type="text/plain; version=0.0.4"
+    )
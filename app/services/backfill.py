@@ -0,0 +1,379 @@
+"""Backfill play history from Spotify extended streaming history exports.
+
+Users can request their full listening history from Spotify as JSON files
+(``Streaming_History_Audio_*.json``), each a single array of records like::
+
+    {"ts": "2021-03-01T12:34:56Z", "username": "...", "ms_played": 215000,
+     "spotify_track_uri": "spotify:track:...", ...}
+
+Files are parsed incrementally, so memory does not grow with file size.
+Track plays are inserted into :class:`~app.services.history.PlayHistoryStore`
+in batches, where plays already stored are ignored, and the features of
+their tracks are resolved through :class:`~app.services.features.FeatureStore`.
+Progress is checkpointed in Redis after every batch, so an interrupted
+import resumes where it stopped, and files are imported in parallel
+processes. A batch's new plays are saved with the checkpoint before they
+are inserted, so a resumed import still adds plays inserted just before
+an interruption to mood statistics and taste.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from app.core.http import close_http_session, open_http_session
+from app.core.redis_client import InMemoryRedis, get_redis_client
+from app.services.embeddings import TasteCentroids, get_taste_centroids
+from app.services.features import FeatureStore, get_feature_store
+from app.services.history import Play, PlayHistoryStore, get_play_history, parse_played_at
+from app.services.mood_analyzer import MoodAnalyzer
+from app.services.mood_stats import MoodStatsStore, get_mood_stats
+from app.services.spotify import SpotifyService
+
+logger = logging.getLogger(__name__)
+
+TRACK_URI_PREFIX = "spotify:track:"
+
+_WHITESPACE = re.compile(r"\s*")
+
+# (username, country the play was made in, play)
+HistoryRecord = Tuple[Optional[str], Optional[str], Play]
+
+# [user ID, played_at, track ID, country] of a new play in a pending batch
+PendingPlay = List[Any]
+
+
+def iter_json_array(f: TextIO, chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    """Yield the elements of a JSON array one at a time.
+
+    Only the element being decoded and one read chunk are held in memory.
+
+    Args:
+        f: Text file containing a single JSON array
+        chunk_size: Characters read at a time
+
+    Raises:
+        ValueError: If the file is not a well-formed JSON array
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+    state = "start"  # then "first", "item" after a comma, "separator" after an element
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+        if pos == len(buffer):
+            if eof:
+                raise ValueError("Unexpected end of file in JSON array")
+            buffer, pos = f.read(chunk_size), 0
+            eof = not buffer
+            continue
+        char = buffer[pos]
+        if state == "start":
+            if char != "[":
+                raise ValueError("Expected a JSON array")
+            pos += 1
+            state = "first"
+        elif char == "]" and state in ("first", "separator"):
+            return
+        elif state == "separator":
+            if char != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON array, found {char!r}")
+            pos += 1
+            state = "item"
+        else:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = None
+            # An element ending at the buffer's end may be cut short, e.g. a number
+            if end is None or (end == len(buffer) and not eof):
+                more = f.read(chunk_size)
+                buffer, pos, eof = buffer[pos:] + more, 0, not more
+                continue
+            yield value
+            pos = end
+            state = "separator"
+
+
+def parse_record(record: Dict[str, Any], min_ms_played: int = 0) -> Optional[HistoryRecord]:
+    """Convert an extended streaming history record to a play.
+
+    Args:
+        record: Record from a streaming history file
+        min_ms_played: Shorter plays, e.g. skips, are ignored
+
+    Returns:
+        Optional[HistoryRecord]: The record's username, connection
+            country and play, or None for episodes, videos, short plays and
+            malformed records
+    """
+    uri = record.get("spotify_track_uri")
+    if not isinstance(uri, str) or not uri.startswith(TRACK_URI_PREFIX):
+        return None
+    if (record.get("ms_played") or 0) < min_ms_played:
+        return None
+    try:
+        played_at = parse_played_at(record["ts"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return record.get("username"), record.get("conn_country"), (played_at, uri[len(TRACK_URI_PREFIX):])
+
+
+@dataclass
+class FileResult:
+    """Outcome of importing one file."""
+
+    path: str
+    records: int = 0
+    plays: int = 0
+    new_plays: int = 0
+    skipped: int = 0
+    resumed_from: int = 0
+    tracks: int = 0
+    tracks_without_features: int = 0
+    error: Optional[str] = None
+
+    @property
+    def duplicates(self) -> int:
+        return self.plays - self.new_plays
+
+
+class BackfillCheckpoints:
+    """Per-file import progress, kept in Redis."""
+
+    def __init__(self, redis: Any, prefix: str = "backfill:"):
+        self.redis = redis
+        self.prefix = prefix
+
+    @staticmethod
+    def file_key(path: Path) -> str:
+        """Identify a file by name, size and modification time."""
+        stat = path.stat()
+        return hashlib.sha256(f"{path.name}:{stat.st_size}:{int(stat.st_mtime)}".encode()).hexdigest()[:24]
+
+    def get(self, key: str) -> Dict[str, Any]:
+        """Return ``{"records": processed records, "done": finished}``.
+
+        A batch being inserted is also under ``"pending"``, as
+        ``{"records": records at its end, "plays": its new plays}``.
+        """
+        value = self.redis.get(self.prefix + key)
+        return json.loads(value) if value else {"records": 0, "done": False}
+
+    def save(self, key: str, records: int, done: bool = False, pending: Optional[Dict[str, Any]] = None) -> None:
+        checkpoint: Dict[str, Any] = {"records": records, "done": done}
+        if pending is not None:
+            checkpoint["pending"] = pending
+        self.redis.set(self.prefix + key, json.dumps(checkpoint))
+
+
+class HistoryImporter:
+    """Import streaming history files into the play history."""
+
+    def __init__(
+        self,
+        history: PlayHistoryStore,
+        checkpoints: BackfillCheckpoints,
+        user_id: Optional[str] = None,
+        access_token: Optional[str] = None,
+        batch_size: int = 5000,
+        min_ms_played: int = 30000,
+        features: Optional[FeatureStore] = None,
+        mood_stats: Optional[MoodStatsStore] = None,
+        taste: Optional[TasteCentroids] = None
+    ):
+        """Initialize the importer.
+
+        Args:
+            history: Store plays are added to
+            checkpoints: Progress store for resuming
+            user_id: User the plays belong to; the records' ``username`` when None
+            access_token: Spotify token used to fetch uncached features; only
+                cached features are resolved when None
+            batch_size: Records per insert and checkpoint
+            min_ms_played: Plays shorter than this are ignored; Spotify
+                counts a stream after 30 seconds
+            features: Feature cache, the process-wide store when None
+            mood_stats: Statistics new plays are added to, the
+                process-wide store when None
+            taste: Taste centroids new plays are added to, the
+                process-wide store when None
+        """
+        self.history = history
+        self.checkpoints = checkpoints
+        self.user_id = user_id
+        self.access_token = access_token
+        self.batch_size = batch_size
+        self.min_ms_played = min_ms_played
+        self.features = features or get_feature_store()
+        self.mood_stats = mood_stats or get_mood_stats()
+        self.taste = taste or get_taste_centroids()
+        self.analyzer = MoodAnalyzer()
+
+    async def _insert(
+        self,
+        batch: List[HistoryRecord],
+        result: FileResult,
+        seen: Dict[str, bool],
+        key: str,
+        start: int,
+        end: int,
+        pending: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Store one batch of plays and add the new ones to mood statistics and taste.
+
+        The plays not recorded yet are saved in the checkpoint before the
+        insert. When the batch was pending at an interruption, the new plays
+        saved then are scored instead, since the insert may have recorded
+        them already. Features are resolved for tracks not seen yet;
+        ``seen`` maps the file's tracks to whether they have features.
+
+        Args:
+            batch: Records of the batch
+            result: Result of the file, updated with the batch's counts
+            seen: Tracks of the file so far and whether they have features
+            key: Checkpoint key of the file
+            start: Records processed before the batch
+            end: Records processed after the batch
+            pending: Pending batch of the file's checkpoint, if any
+        """
+        by_user: Dict[str, List[Play]] = {}
+        regions: Dict[Tuple[str, Play], Optional[str]] = {}
+        for username, region, play in batch:
+            user_id = self.user_id or username
+            if user_id:
+                by_user.setdefault(user_id, []).append(play)
+                regions[user_id, play] = region
+            else:
+                result.skipped += 1
+        if pending is not None and pending["records"] == end:
+            new_plays: List[PendingPlay] = pending["plays"]
+        else:
+            new_plays = [
+                [user_id, played_at, track_id, regions[user_id, (played_at, track_id)]]
+                for user_id, plays in by_user.items()
+                for played_at, track_id in self.history.unrecorded(user_id, plays)
+            ]
+            self.checkpoints.save(key, start, pending={"records": end, "plays": new_plays})
+        for user_id, plays in by_user.items():
+            result.plays += len(plays)
+            result.new_plays += len(self.history.add_new_plays(user_id, plays))
+
+        track_ids = list(dict.fromkeys(track_id for _, _, (_, track_id) in batch if track_id not in seen))
+        if track_ids:
+            if self.access_token:
+                resolved = await self.features.get_features(SpotifyService(self.access_token), track_ids)
+            else:
+                resolved = self.features.get_cached(track_ids)
+            for track_id in track_ids:
+                seen[track_id] = track_id in resolved
+            result.tracks = len(seen)
+            result.tracks_without_features = sum(not found for found in seen.values())
+
+        # Only new plays, so a re-imported file is not counted twice
+        scored_ids = list(dict.fromkeys(track_id for _, _, track_id, _ in new_plays if seen.get(track_id)))
+        if scored_ids:
+            features = self.features.get_cached(scored_ids)
+            by_user_region: Dict[Tuple[str, Optional[str]], List[Play]] = {}
+            for user_id, played_at, track_id, region in new_plays:
+                by_user_region.setdefault((user_id, region), []).append((played_at, track_id))
+            for (user_id, region), plays in by_user_region.items():
+                self.taste.record_plays(user_id, plays, features)
+                self.mood_stats.record_plays(user_id, plays, features, self.analyzer, region)
+
+    async def import_file(self, path: Path) -> FileResult:
+        """Import one file, resuming from its checkpoint."""
+        result = FileResult(str(path))
+        key = self.checkpoints.file_key(path)
+        checkpoint = self.checkpoints.get(key)
+        if checkpoint["done"]:
+            logger.info(f"Skipping {path}, already imported")
+            result.resumed_from = result.records = checkpoint["records"]
+            return result
+        result.resumed_from = checkpoint["records"]
+        pending = checkpoint.get("pending")
+
+        batch: List[HistoryRecord] = []
+        batch_start = result.resumed_from
+        seen: Dict[str, bool] = {}
+        with open(path, encoding="utf-8") as f:
+            for index, record in enumerate(iter_json_array(f)):
+                result.records = index + 1
+                if index < result.resumed_from:
+                    continue
+                play = parse_record(record, self.min_ms_played) if isinstance(record, dict) else None
+                if play is None:
+                    result.skipped += 1
+                else:
+                    batch.append(play)
+                if result.records % self.batch_size == 0:
+                    await self._insert(batch, result, seen, key, batch_start, result.records, pending)
+                    self.checkpoints.save(key, result.records)
+                    batch, batch_start, pending = [], result.records, None
+        await self._insert(batch, result, seen, key, batch_start, result.records, pending)
+        self.checkpoints.save(key, result.records, done=True)
+        logger.info(
+            f"Imported {path}: {result.new_plays} new plays, {result.duplicates} already stored, "
+            f"{result.skipped} records skipped"
+        )
+        return result
+
+
+def _import_file(path: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Import one file; runs in a worker process."""
+    async def run() -> FileResult:
+        open_http_session()
+        try:
+            importer = HistoryImporter(
+                get_play_history(), BackfillCheckpoints(get_redis_client()), **options
+            )
+            return await importer.import_file(Path(path))
+        finally:
+            await close_http_session()
+
+    try:
+        return asdict(asyncio.run(run()))
+    except Exception as e:
+        logger.error(f"Failed to import {path}: {str(e)}", exc_info=True)
+        return asdict(FileResult(path, error=str(e)))
+
+
+def find_history_files(paths: Iterable[str]) -> List[Path]:
+    """Expand directories into the streaming history files they contain."""
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(path.glob("Streaming_History_Audio*.json")) or sorted(path.glob("*.json")))
+        else:
+            files.append(path)
+    return files
+
+
+def run_backfill(paths: Iterable[str], workers: int = 1, **options: Any) -> List[FileResult]:
+    """Import streaming history files, in parallel processes.
+
+    Args:
+        paths: Files, or directories of ``Streaming_History_Audio*.json`` files
+        workers: Number of processes; files are imported in this process when 1
+        **options: Arguments for :class:`HistoryImporter`
+
+    Returns:
+        List[FileResult]: One result per file
+    """
+    files = [str(path) for path in find_history_files(paths)]
+    if workers > 1 and isinstance(get_redis_client(), InMemoryRedis):
+        # Worker processes would each write to their own in-memory store
+        logger.warning("The in-memory Redis stand-in is per process; importing files sequentially")
+        workers = 1
+    if workers <= 1 or len(files) <= 1:
+        return [FileResult(**_import_file(path, options)) for path in files]
+    with ProcessPoolExecutor(max_workers=min(workers, len(files))) as pool:
+        return [FileResult(**result) for result in pool.map(_import_file, files, [options] * len(files))]
+
@@ -0,0 +1,317 @@
+"""Track embeddings, similarity queries and per-user taste centroids.
+
+Each track is embedded as a unit vector of its audio features: valence,
+energy, danceability and instrumentalness as they are, tempo scaled from
+``TEMPO_RANGE`` to [0, 1], and mode one-hot. Features are centered on 0.5
+before normalizing, so tracks with opposite features point in opposite
+directions and cosine similarity, a dot product of unit vectors, spans
+[-1, 1]. The two mode columns are weighted so mode counts as one feature.
+
+:class:`EmbeddingIndex` keeps embeddings in one contiguous float32 matrix
+with an ID-to-row map, and answers batches of queries with matrix
+products over blocks of rows, so memory stays bounded however large the
+index. :class:`TasteCentroids` keeps each user's running sum of play
+embeddings in a Redis hash, updated with ``HINCRBYFLOAT`` as plays arrive.
+This module imports NumPy; the web app only imports it on first use.
+"""
+
+import logging
+import math
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.redis_client import get_redis_client
+from app.services.features import get_feature_store
+from app.services.history import Play
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_COLUMNS = ("valence", "energy", "danceability", "instrumentalness", "tempo", "major", "minor")
+EMBEDDING_DIM = len(EMBEDDING_COLUMNS)
+EMBEDDING_DTYPE = np.float32
+
+# Beats per minute mapped to [0, 1]; faster and slower tempos are clipped
+TEMPO_RANGE = (50.0, 200.0)
+
+# One-hot mode spreads one feature over two columns
+MODE_WEIGHT = math.sqrt(0.5)
+
+# Scores computed per block by ``EmbeddingIndex.similar``
+BLOCK_SCORES = 1 << 20
+
+
+def embed_columns(columns: Mapping[str, Any]) -> np.ndarray:
+    """Embed many tracks at once.
+
+    Args:
+        columns: Arrays of valence, energy, danceability, instrumentalness,
+            tempo and mode, one element per track, e.g. catalog columns
+
+    Returns:
+        np.ndarray: ``(tracks, EMBEDDING_DIM)`` float32 unit vectors; rows of
+            tracks with missing (NaN) features are zero
+    """
+    valence = np.asarray(columns["valence"], dtype=EMBEDDING_DTYPE)
+    vectors = np.empty((len(valence), EMBEDDING_DIM), dtype=EMBEDDING_DTYPE)
+    vectors[:, 0] = valence
+    vectors[:, 1] = columns["energy"]
+    vectors[:, 2] = columns["danceability"]
+    vectors[:, 3] = columns["instrumentalness"]
+    low, high = TEMPO_RANGE
+    tempo = (np.asarray(columns["tempo"], dtype=EMBEDDING_DTYPE) - low) / (high - low)
+    vectors[:, 4] = np.clip(tempo, 0.0, 1.0)
+    mode = np.asarray(columns["mode"], dtype=EMBEDDING_DTYPE)
+    vectors[:, 5] = mode == 1
+    vectors[:, 6] = mode == 0
+    vectors[np.isnan(mode), 5:] = np.nan
+    vectors -= 0.5
+    vectors[:, 5:] *= MODE_WEIGHT
+
+    vectors[np.isnan(vectors).any(axis=1)] = 0.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def embed_features(features: Iterable[Mapping[str, Any]]) -> np.ndarray:
+    """Embed tracks given as Spotify audio feature dicts, one row each."""
+    features = list(features)
+    columns = {
+        name: np.array([f.get(name, np.nan) for f in features], dtype=EMBEDDING_DTYPE)
+        for name in ("valence", "energy", "danceability", "instrumentalness", "tempo", "mode")
+    }
+    return embed_columns(columns)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale vectors to unit length; zero vectors stay zero."""
+    vectors = np.array(vectors, dtype=EMBEDDING_DTYPE, ndmin=2)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+class EmbeddingIndex:
+    """Track embeddings in one contiguous float32 matrix with an ID-to-row map."""
+
+    def __init__(self, capacity: int = 1024):
+        """Create an empty index.
+
+        Args:
+            capacity: Rows allocated up front; the matrix doubles when full
+        """
+        self._matrix = np.zeros((max(1, capacity), EMBEDDING_DIM), dtype=EMBEDDING_DTYPE)
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, track_id: str) -> bool:
+        return track_id in self.rows
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Embeddings by row, a view of the filled part of the matrix."""
+        return self._matrix[:len(self.ids)]
+
+    @classmethod
+    def from_catalog(cls, catalog: Any) -> "EmbeddingIndex":
+        """Build an index of every track in a :class:`FeatureCatalog`."""
+        index = cls(capacity=len(catalog))
+        index.add_vectors([track_id.decode() for track_id in catalog.ids], embed_columns(catalog.columns))
+        return index
+
+    def add_vectors(self, track_ids: Sequence[str], vectors: np.ndarray) -> None:
+        """Add or replace the embeddings of tracks."""
+        new = [track_id for track_id in dict.fromkeys(track_ids) if track_id not in self.rows]
+        needed = len(self.ids) + len(new)
+        if needed > len(self._matrix):
+            grown = np.zeros((max(needed, 2 * len(self._matrix)), EMBEDDING_DIM), dtype=EMBEDDING_DTYPE)
+            grown[:len(self.ids)] = self.matrix
+            self._matrix = grown
+        for track_id in new:
+            self.rows[track_id] = len(self.ids)
+            self.ids.append(track_id)
+        self._matrix[[self.rows[track_id] for track_id in track_ids]] = vectors
+
+    def add_features(self, items: Iterable[Tuple[str, Mapping[str, Any]]]) -> int:
+        """Embed and add tracks given as ``(track_id, features)`` pairs.
+
+        Returns:
+            int: Number of tracks added or replaced
+        """
+        items = list(items)
+        if items:
+            self.add_vectors([track_id for track_id, _ in items], embed_features(f for _, f in items))
+        return len(items)
+
+    def vectors(self, track_ids: Sequence[str]) -> np.ndarray:
+        """Return the embeddings of tracks, zero rows for unknown ones."""
+        rows = np.array([self.rows.get(track_id, -1) for track_id in track_ids], dtype=np.int64)
+        vectors = np.zeros((len(rows), EMBEDDING_DIM), dtype=EMBEDDING_DTYPE)
+        known = rows >= 0
+        vectors[known] = self._matrix[rows[known]]
+        return vectors
+
+    def similar(
+        self,
+        queries: np.ndarray,
+        k: int = 10,
+        exclude: Iterable[str] = (),
+        block_rows: Optional[int] = None
+    ) -> List[List[Tuple[str, float]]]:
+        """Find the tracks most similar to each of a batch of queries.
+
+        Scores are cosine similarities, computed a block of rows at a time
+        as one matrix product for every query, keeping each query's best
+        ``k`` so far.
+
+        Args:
+            queries: ``(queries, EMBEDDING_DIM)`` vectors, or one vector;
+                normalized here
+            k: Tracks per query
+            exclude: Tracks never returned, e.g. the ones queried with
+            block_rows: Index rows scored at a time; by default enough for
+                about a million scores per block, which stay in cache
+
+        Returns:
+            List[List[Tuple[str, float]]]: Per query, ``(track_id, score)``
+                best first
+        """
+        queries = normalize(queries)
+        n_queries = len(queries)
+        best_scores = np.full((n_queries, 0), -np.inf, dtype=EMBEDDING_DTYPE)
+        best_rows = np.empty((n_queries, 0), dtype=np.int64)
+        excluded = np.array(sorted(self.rows[t] for t in set(exclude) if t in self.rows), dtype=np.int64)
+        matrix = self.matrix
+        if block_rows is None:
+            block_rows = max(1024, BLOCK_SCORES // max(n_queries, 1))
+        for start in range(0, len(matrix), block_rows):
+            block = matrix[start:start + block_rows]
+            scores = queries @ block.T
+            if len(excluded):
+                local = excluded[(excluded >= start) & (excluded < start + len(block))] - start
+                scores[:, local] = -np.inf
+            if scores.shape[1] > k:
+                top = np.argpartition(scores, -k, axis=1)[:, -k:]
+                scores = np.take_along_axis(scores, top, axis=1)
+                rows = top + start
+            else:
+                rows = np.broadcast_to(np.arange(start, start + len(block)), scores.shape)
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            best_rows = np.concatenate([best_rows, rows], axis=1)
+            if best_scores.shape[1] > k:
+                top = np.argpartition(best_scores, -k, axis=1)[:, -k:]
+                best_scores = np.take_along_axis(best_scores, top, axis=1)
+                best_rows = np.take_along_axis(best_rows, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        results = []
+        for scores, rows in zip(np.take_along_axis(best_scores, order, axis=1), np.take_along_axis(best_rows, order, axis=1)):
+            results.append([
+                (self.ids[row], float(score)) for score, row in zip(scores, rows) if score != -np.inf
+            ])
+        return results
+
+    def similar_to_tracks(self, track_ids: Sequence[str], k: int = 10) -> List[Tuple[str, float]]:
+        """Find tracks similar to a set of tracks as a whole, excluding them.
+
+        The query is the mean of the tracks' embeddings, e.g. of what a user
+        is listening to.
+        """
+        query = self.vectors(track_ids).sum(axis=0)
+        if not query.any():
+            return []
+        return self.similar(query, k, exclude=track_ids)[0]
+
+
+class TasteCentroids:
+    """Each user's taste centroid, the mean embedding of their plays, in Redis.
+
+    A user's hash holds the number of embedded plays and the sum of their
+    embeddings. Plays are added with atomic increments, so the centroid is
+    updated incrementally by any number of workers without locks.
+    """
+
+    def __init__(self, redis: Any, prefix: str = "taste:"):
+        """Initialize the store.
+
+        Args:
+            redis: Redis client with ``decode_responses`` semantics
+            prefix: Key prefix
+        """
+        self.redis = redis
+        self.prefix = prefix
+
+    def _key(self, user_id: str) -> str:
+        return f"{self.prefix}user:{user_id}"
+
+    def add(self, user_id: str, vectors: np.ndarray) -> int:
+        """Add play embeddings to a user's centroid, ignoring zero rows.
+
+        Returns:
+            int: Number of plays added
+        """
+        vectors = np.asarray(vectors, dtype=EMBEDDING_DTYPE).reshape(-1, EMBEDDING_DIM)
+        vectors = vectors[vectors.any(axis=1)]
+        if not len(vectors):
+            return 0
+        total = vectors.sum(axis=0, dtype=np.float64)
+        key = self._key(user_id)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hincrby(key, "n", len(vectors))
+        for column, value in zip(EMBEDDING_COLUMNS, total):
+            pipe.hincrbyfloat(key, column, float(value))
+        pipe.execute()
+        return len(vectors)
+
+    def record_plays(self, user_id: str, plays: Iterable[Play], features: Mapping[str, Mapping[str, Any]]) -> int:
+        """Add new plays to a user's centroid; repeats count once per play.
+
+        Args:
+            user_id: Spotify user ID
+            plays: ``(played_at_ms, track_id)`` of plays not recorded before
+            features: Audio features by track ID; plays without are skipped
+
+        Returns:
+            int: Number of plays added
+        """
+        found = [features[track_id] for _, track_id in plays if track_id in features]
+        return self.add(user_id, embed_features(found)) if found else 0
+
+    def get(self, user_id: str) -> Optional[np.ndarray]:
+        """Return a user's taste centroid as a unit vector, or None without plays."""
+        fields = self.redis.hgetall(self._key(user_id))
+        if not int(fields.get("n", 0)):
+            return None
+        centroid = np.array([float(fields.get(column, 0.0)) for column in EMBEDDING_COLUMNS], dtype=EMBEDDING_DTYPE)
+        centroid = normalize(centroid)[0]
+        return centroid if centroid.any() else None
+
+    def plays(self, user_id: str) -> int:
+        """Return the number of plays in a user's centroid."""
+        return int(self.redis.hgetall(self._key(user_id)).get("n", 0))
+
+
+_index: Optional[EmbeddingIndex] = None
+_centroids: Optional[TasteCentroids] = None
+
+
+def get_embedding_index() -> EmbeddingIndex:
+    """Return the process-wide index of the feature catalog's tracks, built on first use."""
+    global _index
+    if _index is None:
+        catalog = get_feature_store().catalog
+        _index = EmbeddingIndex.from_catalog(catalog) if catalog is not None else EmbeddingIndex()
+        logger.info(f"Built embedding index of {len(_index)} tracks")
+    return _index
+
+
+def get_taste_centroids() -> TasteCentroids:
+    """Return the process-wide taste centroids, creating them on first use."""
+    global _centroids
+    if _centroids is None:
+        _centroids = TasteCentroids(get_redis_client())
+    return _centroids
@@ -0,0 +1,212 @@
+"""Columnar export of listening history with audio features and mood scores.
+
+Plays are read from :class:`~app.services.history.PlayHistoryStore` one
+chunk at a time, joined with cached audio features, scored, and written as
+one Parquet row group or Arrow IPC record batch per chunk. Memory use is
+bounded by the chunk size, not the length of the history, and the same
+code writes files for the CLI and byte chunks for streaming downloads.
+
+Features come from the feature cache and catalog only; plays of tracks
+with no cached features are exported with null features and mood score.
+"""
+
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, List, Optional, Union
+
+from app.services.feature_catalog import FEATURE_COLUMNS
+from app.services.features import FeatureStore
+from app.services.history import Play, PlayHistoryStore
+from app.services.mood_analyzer import MoodAnalyzer
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+# Format name to media type
+EXPORT_FORMATS = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+EXPORT_EXTENSIONS = {"parquet": "parquet", "arrow": "arrows"}
+
+
+def export_schema() -> "pa.Schema":
+    """Return the schema of exported files."""
+    import pyarrow as pa
+
+    return pa.schema([
+        ("user_id", pa.string()),
+        ("played_at", pa.timestamp("ms", tz="UTC")),
+        ("track_id", pa.string()),
+        *((name, pa.float32()) for name in FEATURE_COLUMNS if name != "mode"),
+        ("mode", pa.int8()),
+        ("mood_score", pa.float32()),
+    ])
+
+
+class _ChunkSink:
+    """Write-only file that hands out what was written since the last drain."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data: Any) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class PlayExporter:
+    """Write play history with features and mood scores in a columnar format."""
+
+    def __init__(
+        self,
+        history: PlayHistoryStore,
+        features: FeatureStore,
+        analyzer: Optional[MoodAnalyzer] = None,
+        chunk_size: int = 10000
+    ):
+        """Initialize the exporter.
+
+        Args:
+            history: Play history to export
+            features: Feature cache used to join features onto plays
+            analyzer: Analyzer used for mood scores
+            chunk_size: Plays per record batch or row group
+        """
+        self.history = history
+        self.features = features
+        self.analyzer = analyzer or MoodAnalyzer()
+        self.chunk_size = chunk_size
+
+    def _batch(self, user_id: str, plays: List[Play]) -> "pa.RecordBatch":
+        """Join one chunk of plays with features and scores."""
+        import numpy as np
+        import pyarrow as pa
+
+        track_ids = [track_id for _, track_id in plays]
+        unique_ids = list(dict.fromkeys(track_ids))
+        cached = self.features.get_cached(unique_ids)
+        # Features of each distinct track, then spread to plays by position
+        per_track = np.full((len(unique_ids), len(FEATURE_COLUMNS)), np.nan, dtype=np.float32)
+        for row, track_id in enumerate(unique_ids):
+            features = cached.get(track_id)
+            if features:
+                for column, name in enumerate(FEATURE_COLUMNS):
+                    if features.get(name) is not None:
+                        per_track[row, column] = features[name]
+        position = {track_id: i for i, track_id in enumerate(unique_ids)}
+        rows = per_track[np.fromiter((position[t] for t in track_ids), dtype=np.int64, count=len(track_ids))]
+        columns = {name: rows[:, i] for i, name in enumerate(FEATURE_COLUMNS)}
+        scores = self.analyzer.score_columns(columns)
+
+        schema = export_schema()
+        arrays = [
+            pa.array([user_id] * len(plays), pa.string()),
+            pa.array(np.fromiter((played_at for played_at, _ in plays), dtype=np.int64), pa.timestamp("ms", tz="UTC")),
+            pa.array(track_ids, pa.string()),
+        ]
+        for name in FEATURE_COLUMNS:
+            values = columns[name]
+            missing = np.isnan(values)
+            if name == "mode":
+                arrays.append(pa.array(np.nan_to_num(values).astype(np.int8), pa.int8(), mask=missing))
+            else:
+                arrays.append(pa.array(values, pa.float32(), mask=missing))
+        arrays.append(pa.array(scores, pa.float32(), mask=np.isnan(scores)))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    def iter_batches(self, user_ids: Iterable[str]) -> Iterator["pa.RecordBatch"]:
+        """Yield record batches of the users' plays, user by user in time order."""
+        for user_id in user_ids:
+            for plays in self.history.iter_plays(user_id, self.chunk_size):
+                yield self._batch(user_id, plays)
+
+    def _open_writer(self, sink: Any, fmt: str) -> Any:
+        import pyarrow as pa
+
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            return pq.ParquetWriter(sink, export_schema(), compression="zstd")
+        if fmt == "arrow":
+            options = pa.ipc.IpcWriteOptions(compression="zstd")
+            return pa.ipc.new_stream(sink, export_schema(), options=options)
+        raise ValueError(f"Unknown export format {fmt!r}, expected one of {', '.join(EXPORT_FORMATS)}")
+
+    def write(self, path: Union[str, Path], user_ids: Iterable[str], fmt: str = "parquet") -> int:
+        """Export plays to a file.
+
+        Args:
+            path: Output file
+            user_ids: Users whose plays to export
+            fmt: ``parquet`` or ``arrow`` (IPC stream)
+
+        Returns:
+            int: Number of plays written
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        writer = self._open_writer(str(path), fmt)
+        rows = 0
+        try:
+            for batch in self.iter_batches(user_ids):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        finally:
+            writer.close()
+        logger.info(f"Exported {rows} plays to {path}")
+        return rows
+
+    def iter_bytes(self, user_ids: Iterable[str], fmt: str = "parquet") -> Iterator[bytes]:
+        """Export plays as a stream of byte chunks, about one per batch.
+
+        Args:
+            user_ids: Users whose plays to export
+            fmt: ``parquet`` or ``arrow`` (IPC stream)
+
+        Raises:
+            ValueError: If the format is unknown; raised before any chunk
+                is produced, so callers can reject the request
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format {fmt!r}, expected one of {', '.join(EXPORT_FORMATS)}")
+        return self._stream(user_ids, fmt)
+
+    def _stream(self, user_ids: Iterable[str], fmt: str) -> Iterator[bytes]:
+        import pyarrow as pa
+
+        sink = _ChunkSink()
+        writer = self._open_writer(pa.PythonFile(sink, mode="w"), fmt)
+        rows = 0
+        try:
+            for batch in self.iter_batches(user_ids):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+                data = sink.drain()
+                if data:
+                    yield data
+        finally:
+            writer.close()
+        data = sink.drain()
+        if data:
+            yield data
+        logger.info(f"Streamed export of {rows} plays")
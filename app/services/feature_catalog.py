@@ -0,0 +1,253 @@
+"""Memory-mapped on-disk catalog of track audio features.
+
+Batch jobs score far more plays than fit in the Redis feature cache, and
+a cold worker should not have to ask Spotify for features that were
+fetched before. The catalog keeps them in a single read-only file:
+
+    header   64 bytes: magic, version, column count, track count
+    ids      track count fixed-width 22-byte ASCII IDs, sorted
+    columns  one little-endian float32 array per feature, in
+             ``FEATURE_COLUMNS`` order, each aligned to 8 bytes
+
+Readers memory-map the file and expose the IDs and columns as NumPy views,
+so nothing is parsed or copied when it is opened, and lookups are binary
+searches over the ID array. This module imports NumPy; the web app only
+imports it on first use.
+"""
+
+import logging
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MBFC"
+VERSION = 1
+HEADER_SIZE = 64
+_HEADER = struct.Struct("<4sHHQ")
+
+# Spotify track IDs are 22 base62 characters
+ID_SIZE = 22
+ID_DTYPE = np.dtype(f"S{ID_SIZE}")
+COLUMN_DTYPE = np.dtype("<f4")
+
+# Stored features, the fields of ``AudioFeatures``
+FEATURE_COLUMNS = ("valence", "energy", "danceability", "instrumentalness", "tempo", "mode")
+
+
+class CatalogError(Exception):
+    """Raised when a catalog file is missing, malformed or of another version."""
+
+
+def _is_catalog_id(track_id: Any) -> bool:
+    """Check that an ID fits a catalog row, i.e. is 1 to 22 ASCII characters."""
+    return isinstance(track_id, str) and 0 < len(track_id) <= ID_SIZE and track_id.isascii()
+
+
+def _align(offset: int, alignment: int = 8) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def _layout(count: int) -> Tuple[int, List[int], int]:
+    """Return the offset of the IDs, of each column, and the file size."""
+    offset = _align(HEADER_SIZE + count * ID_SIZE)
+    columns = []
+    for _ in FEATURE_COLUMNS:
+        columns.append(offset)
+        offset = _align(offset + count * COLUMN_DTYPE.itemsize)
+    return HEADER_SIZE, columns, offset
+
+
+class FeatureCatalog:
+    """Read-only, memory-mapped view of a catalog file.
+
+    The mapping stays valid while the catalog is open, even if the file is
+    replaced by a rebuild; reopen it to see the new data.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """Open and map a catalog.
+
+        Args:
+            path: Catalog file written by :class:`FeatureCatalogBuilder`
+
+        Raises:
+            CatalogError: If the file is missing or not a valid catalog
+        """
+        self.path = Path(path)
+        try:
+            self._map = np.memmap(self.path, dtype=np.uint8, mode="r")
+        except (OSError, ValueError) as e:
+            raise CatalogError(f"Cannot open feature catalog {self.path}: {str(e)}") from e
+        if len(self._map) < HEADER_SIZE:
+            raise CatalogError(f"{self.path} is not a feature catalog")
+        magic, version, n_columns, count = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise CatalogError(f"{self.path} is not a feature catalog")
+        if version != VERSION or n_columns != len(FEATURE_COLUMNS):
+            raise CatalogError(f"{self.path} has unsupported catalog version {version}")
+        ids_offset, column_offsets, size = _layout(count)
+        if len(self._map) < size:
+            raise CatalogError(f"{self.path} is truncated")
+
+        self.count = count
+        self.ids = self._map[ids_offset:ids_offset + count * ID_SIZE].view(ID_DTYPE)
+        self.columns: Dict[str, np.ndarray] = {
+            name: self._map[offset:offset + count * COLUMN_DTYPE.itemsize].view(COLUMN_DTYPE)
+            for name, offset in zip(FEATURE_COLUMNS, column_offsets)
+        }
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, track_id: str) -> bool:
+        return self.index_of(track_id) >= 0
+
+    def __enter__(self) -> "FeatureCatalog":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Drop the catalog's views; the file is unmapped once no view remains."""
+        self.ids = np.empty(0, dtype=ID_DTYPE)
+        self.columns = {}
+        self.count = 0
+        self._map = None
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a zero-copy view of one feature for every track, in ID order."""
+        return self.columns[name]
+
+    def indices(self, track_ids: Union[Sequence[str], np.ndarray]) -> np.ndarray:
+        """Find the rows of many tracks at once.
+
+        Args:
+            track_ids: Track IDs, as strings or an ``S22`` array
+
+        Returns:
+            np.ndarray: Row index of each track, -1 where it is not cataloged,
+                including IDs no catalog could hold, e.g. longer or non-ASCII ones
+        """
+        # Converting to S22 would truncate long IDs and fail on non-ASCII ones
+        if isinstance(track_ids, np.ndarray) and track_ids.dtype.kind == "S":
+            valid = np.char.str_len(track_ids) <= ID_SIZE
+            keys = np.where(valid, track_ids, b"").astype(ID_DTYPE)
+        else:
+            valid = np.fromiter((_is_catalog_id(t) for t in track_ids), dtype=bool, count=len(track_ids))
+            keys = np.array([t if ok else "" for t, ok in zip(track_ids, valid)], dtype=ID_DTYPE)
+        if not self.count:
+            return np.full(keys.shape, -1, dtype=np.int64)
+        rows = np.searchsorted(self.ids, keys)
+        clipped = np.minimum(rows, self.count - 1)
+        return np.where(valid & (self.ids[clipped] == keys), clipped, -1).astype(np.int64)
+
+    def index_of(self, track_id: str) -> int:
+        """Return the row of a track, or -1 if it is not cataloged."""
+        return int(self.indices([track_id])[0])
+
+    def get(self, track_id: str) -> Optional[Dict[str, Any]]:
+        """Return the features of one track in Spotify's shape, or None."""
+        row = self.index_of(track_id)
+        if row < 0:
+            return None
+        features: Dict[str, Any] = {"id": track_id}
+        for name, values in self.columns.items():
+            features[name] = float(values[row])
+        features["mode"] = int(features["mode"])
+        return features
+
+    def iter_features(self) -> Iterator[Tuple[str, Dict[str, float]]]:
+        """Iterate over every track and its features, in ID order."""
+        for row in range(self.count):
+            yield self.ids[row].decode(), {name: float(values[row]) for name, values in self.columns.items()}
+
+
+class FeatureCatalogBuilder:
+    """Collect features and write them as a catalog file.
+
+    Tracks added later replace earlier ones with the same ID, so a builder
+    seeded from an existing catalog appends to it.
+    """
+
+    def __init__(self):
+        self._features: Dict[str, Tuple[float, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._features)
+
+    def add(self, track_id: str, features: Dict[str, Any]) -> bool:
+        """Add one track.
+
+        Args:
+            track_id: Spotify track ID
+            features: Audio features with at least the ``FEATURE_COLUMNS`` fields
+
+        Returns:
+            bool: False if the track was skipped for a bad ID or missing features
+        """
+        if not _is_catalog_id(track_id):
+            return False
+        try:
+            self._features[track_id] = tuple(float(features[name]) for name in FEATURE_COLUMNS)
+        except (KeyError, TypeError, ValueError):
+            return False
+        return True
+
+    def add_many(self, items: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """Add tracks, returning how many were accepted."""
+        return sum(self.add(track_id, features) for track_id, features in items)
+
+    def add_catalog(self, catalog: FeatureCatalog) -> int:
+        """Add every track of an existing catalog."""
+        return self.add_many(catalog.iter_features())
+
+    def write(self, path: Union[str, Path]) -> int:
+        """Write the catalog atomically.
+
+        The file is written next to ``path`` and renamed over it, so open
+        readers keep their mapping of the previous version.
+
+        Returns:
+            int: Number of tracks written
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        track_ids = sorted(self._features)
+        count = len(track_ids)
+        ids_offset, column_offsets, size = _layout(count)
+        values = np.array([self._features[track_id] for track_id in track_ids], dtype=COLUMN_DTYPE)
+        values = values.reshape(count, len(FEATURE_COLUMNS))
+
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_HEADER.pack(MAGIC, VERSION, len(FEATURE_COLUMNS), count).ljust(HEADER_SIZE, b"\0"))
+                f.write(np.array(track_ids, dtype=ID_DTYPE).tobytes())
+                for i, offset in enumerate(column_offsets):
+                    f.write(b"\0" * (offset - f.tell()))
+                    f.write(np.ascontiguousarray(values[:, i]).tobytes())
+                f.write(b"\0" * (size - f.tell()))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        logger.info(f"Wrote feature catalog {path} with {count} tracks")
+        return count
+
+
+def open_catalog(path: Union[str, Path]) -> Optional[FeatureCatalog]:
+    """Open a catalog if the file exists, logging and returning None otherwise."""
+    if not Path(path).exists():
+        return None
+    try:
+        return FeatureCatalog(path)
+    except CatalogError as e:
+        logger.error(str(e))
+        return None
@@ -0,0 +1,258 @@
+"""Audio feature cache shared across workers."""
+
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.local_cache import MISS, LocalCache
+from app.core.redis_client import get_redis_client
+from app.services.spotify import SpotifyService
+
+if TYPE_CHECKING:
+    from app.services.feature_catalog import FeatureCatalog
+
+logger = logging.getLogger(__name__)
+
+# Spotify's limit on IDs per audio-features request
+AUDIO_FEATURES_BATCH_SIZE = 100
+
+
+class FeatureStore:
+    """Audio features cached in process and in Redis.
+
+    Audio features of a track never change, so they are cached for a long
+    time. Tracks Spotify has no features for are remembered locally for a
+    short while as negative entries. Lookups are counted in process and
+    flushed in the background by :meth:`run_hot_flusher` into a Redis
+    sorted set of hot tracks, which new workers read at startup to pre-fill
+    their local cache. An on-disk feature catalog, when given, answers for
+    tracks missing from both tiers before Spotify is asked.
+    """
+
+    def __init__(
+        self,
+        redis: Any,
+        ttl: int,
+        local: Optional[LocalCache] = None,
+        max_hot_tracks: int = 100000,
+        prefix: str = "features:",
+        catalog: Optional["FeatureCatalog"] = None
+    ):
+        """Initialize the store.
+
+        Args:
+            redis: Redis client with ``decode_responses`` semantics
+            ttl: Lifetime of Redis entries in seconds
+            local: In-process tier, a 32 MB cache when None
+            max_hot_tracks: Maximum size of the hot-track sorted set
+            prefix: Key prefix for entries
+            catalog: Memory-mapped catalog consulted after Redis
+        """
+        self.redis = redis
+        self.ttl = ttl
+        self.local = local or LocalCache(32 * 1024 * 1024, ttl=ttl, negative_ttl=300, name="features")
+        self.max_hot_tracks = max_hot_tracks
+        self.prefix = prefix
+        self.hot_key = f"{prefix}hot"
+        self.catalog = catalog
+        # Lookups per track not yet flushed to the hot-track ranking
+        self._hits: Counter = Counter()
+        self._last_trim = time.monotonic()
+        self._stopping = asyncio.Event()
+
+    def _load(self, track_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Read tracks from Redis into the local cache."""
+        found = {}
+        values = self.redis.mget([self.prefix + track_id for track_id in track_ids])
+        for track_id, value in zip(track_ids, values):
+            if value is not None:
+                found[track_id] = json.loads(value)
+                self.local.set(track_id, found[track_id], size=len(value))
+        return found
+
+    def _lookup(self, track_ids: List[str]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """Return cached features, and the tracks with nothing cached."""
+        found = {}
+        missing = []
+        for track_id in track_ids:
+            features = self.local.get(track_id)
+            if features is MISS:
+                missing.append(track_id)
+            elif features is not None:
+                found[track_id] = features
+        if missing:
+            try:
+                found.update(self._load(missing))
+            except Exception as e:
+                logger.error(f"Error reading feature cache: {str(e)}")
+        if self.catalog is not None:
+            for track_id in missing:
+                if track_id not in found:
+                    features = self.catalog.get(track_id)
+                    if features is not None:
+                        found[track_id] = features
+                        self.local.set(track_id, features, size=len(json.dumps(features)))
+        return found, [track_id for track_id in missing if track_id not in found]
+
+    def get_cached(self, track_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return the cached features of the given tracks, by track ID."""
+        return self._lookup(track_ids)[0]
+
+    async def get_features(self, spotify: SpotifyService, track_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return audio features of tracks, fetching uncached ones from Spotify.
+
+        Missing tracks are requested in concurrent batches of up to 100 IDs.
+
+        Args:
+            spotify: Service used for cache misses
+            track_ids: Spotify track IDs
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Features by track ID; tracks Spotify
+                has no features for are left out
+        """
+        track_ids = list(dict.fromkeys(track_ids))
+        self._hits.update(track_ids)
+        found, missing = self._lookup(track_ids)
+        batches = [
+            missing[i:i + AUDIO_FEATURES_BATCH_SIZE]
+            for i in range(0, len(missing), AUDIO_FEATURES_BATCH_SIZE)
+        ]
+        fetched: Dict[str, Dict[str, Any]] = {}
+        for features_list in await asyncio.gather(*(spotify.get_audio_features(batch) for batch in batches)):
+            for features in features_list:
+                if features and features.get("id"):
+                    fetched[features["id"]] = features
+
+        encoded = {track_id: json.dumps(features) for track_id, features in fetched.items()}
+        if encoded:
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                for track_id, value in encoded.items():
+                    pipe.setex(self.prefix + track_id, self.ttl, value)
+                pipe.execute()
+            except Exception as e:
+                logger.error(f"Error writing feature cache: {str(e)}")
+        for track_id in missing:
+            if track_id in fetched:
+                self.local.set(track_id, fetched[track_id], size=len(encoded[track_id]))
+            else:
+                self.local.set_negative(track_id)
+        found.update(fetched)
+        return found
+
+    def flush_hot(self, trim: bool = False) -> int:
+        """Add the lookups counted since the last flush to the hot-track ranking.
+
+        Args:
+            trim: Also drop tracks ranked below ``max_hot_tracks``
+
+        Returns:
+            int: Number of tracks flushed
+        """
+        hits, self._hits = self._hits, Counter()
+        if not hits and not trim:
+            return 0
+        pipe = self.redis.pipeline(transaction=False)
+        for track_id, count in hits.items():
+            pipe.zincrby(self.hot_key, count, track_id)
+        if trim:
+            pipe.zremrangebyrank(self.hot_key, 0, -self.max_hot_tracks - 1)
+        pipe.execute()
+        return len(hits)
+
+    async def run_hot_flusher(self, interval: float, trim_interval: float) -> None:
+        """Flush lookups every ``interval`` seconds until ``stop`` is called.
+
+        Args:
+            interval: Seconds between flushes
+            trim_interval: Seconds between trims of the ranking
+        """
+        self._stopping.clear()
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            trim = time.monotonic() - self._last_trim >= trim_interval
+            try:
+                self.flush_hot(trim)
+                if trim:
+                    self._last_trim = time.monotonic()
+            except Exception as e:
+                logger.error(f"Error flushing hot tracks: {str(e)}")
+
+    def stop(self) -> None:
+        """Ask ``run_hot_flusher`` to flush once more and return."""
+        self._stopping.set()
+
+    def iter_cached(self, batch_size: int = 500) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Iterate over every track in the Redis tier and its features.
+
+        Args:
+            batch_size: Number of keys scanned and read per round trip
+        """
+        batch: List[str] = []
+        for key in self.redis.scan_iter(match=f"{self.prefix}*", count=batch_size):
+            if key != self.hot_key:
+                batch.append(key)
+            if len(batch) >= batch_size:
+                yield from self._read_batch(batch)
+                batch = []
+        if batch:
+            yield from self._read_batch(batch)
+
+    def _read_batch(self, keys: List[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for key, value in zip(keys, self.redis.mget(keys)):
+            if value is not None:
+                yield key[len(self.prefix):], json.loads(value)
+
+    def warm(self, limit: int, batch_size: int = 500) -> int:
+        """Pre-fill the local cache with the hottest tracks.
+
+        Args:
+            limit: Maximum number of tracks to load
+            batch_size: Number of keys read per MGET
+
+        Returns:
+            int: Number of tracks loaded
+        """
+        if limit <= 0:
+            return 0
+        hot = self.redis.zrevrange(self.hot_key, 0, limit - 1)
+        loaded = 0
+        # Coldest first, so the hottest tracks end up most recently used
+        for i in range(len(hot), 0, -batch_size):
+            loaded += len(self._load(hot[max(0, i - batch_size):i][::-1]))
+        return loaded
+
+
+_store: Optional[FeatureStore] = None
+
+
+def get_feature_store() -> FeatureStore:
+    """Return the process-wide feature store, creating it on first use."""
+    global _store
+    if _store is None:
+        catalog = None
+        if settings.FEATURE_CATALOG_PATH:
+            # Imported here so NumPy only loads when a catalog is configured
+            from app.services.feature_catalog import open_catalog
+            catalog = open_catalog(settings.FEATURE_CATALOG_PATH)
+        _store = FeatureStore(
+            get_redis_client(),
+            ttl=settings.FEATURE_CACHE_TTL,
+            local=LocalCache(
+                settings.FEATURE_LOCAL_CACHE_BYTES,
+                ttl=settings.FEATURE_CACHE_TTL,
+                negative_ttl=settings.LOCAL_CACHE_NEGATIVE_TTL,
+                name="features"
+            ),
+            max_hot_tracks=settings.FEATURE_HOT_TRACKS,
+            catalog=catalog
+        )
+    return _store
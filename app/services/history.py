@@ -0,0 +1,176 @@
+"""Listening history stored in Redis.
+
+Spotify only returns a user's last 50 plays, so plays seen on the dashboard
+are recorded here and kept. Each user's plays are a sorted set scored by
+play time in milliseconds, with ``<played_at_ms>:<track_id>`` members, so
+recording the same play twice is a no-op.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# (played_at in milliseconds since the epoch, track ID)
+Play = Tuple[int, str]
+
+
+def parse_played_at(value: str) -> int:
+    """Convert an ISO 8601 play time, as Spotify returns it, to epoch milliseconds.
+
+    Times are truncated to whole seconds. Extended streaming history only
+    has second precision while recently-played items have milliseconds, so
+    a play seen by both a sync and an import gets the same member and is
+    stored once.
+    """
+    played_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if played_at.tzinfo is None:
+        played_at = played_at.replace(tzinfo=timezone.utc)
+    return int(played_at.timestamp()) * 1000
+
+
+class PlayHistoryStore:
+    """Per-user play history in Redis sorted sets."""
+
+    def __init__(self, redis: Any, prefix: str = "plays:"):
+        """Initialize the store.
+
+        Args:
+            redis: Redis client with ``decode_responses`` semantics
+            prefix: Key prefix for history keys
+        """
+        self.redis = redis
+        self.prefix = prefix
+        self.users_key = f"{prefix}users"
+
+    def _key(self, user_id: str) -> str:
+        return f"{self.prefix}user:{user_id}"
+
+    def add_plays(self, user_id: str, plays: Iterable[Play]) -> int:
+        """Record plays, ignoring ones already stored.
+
+        Args:
+            user_id: Spotify user ID
+            plays: ``(played_at_ms, track_id)`` pairs
+
+        Returns:
+            int: Number of plays that were new
+        """
+        mapping = {f"{played_at}:{track_id}": played_at for played_at, track_id in plays}
+        if not mapping:
+            return 0
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zadd(self._key(user_id), mapping, nx=True)
+        pipe.sadd(self.users_key, user_id)
+        return pipe.execute()[0]
+
+    def add_new_plays(self, user_id: str, plays: Iterable[Play]) -> List[Play]:
+        """Record plays like :meth:`add_plays`, returning the ones that were new."""
+        plays = list(dict.fromkeys(plays))
+        if not plays:
+            return []
+        key = self._key(user_id)
+        pipe = self.redis.pipeline(transaction=False)
+        for played_at, track_id in plays:
+            pipe.zadd(key, {f"{played_at}:{track_id}": played_at}, nx=True)
+        pipe.sadd(self.users_key, user_id)
+        added = pipe.execute()
+        return [play for play, new in zip(plays, added) if new]
+
+    def unrecorded(self, user_id: str, plays: Iterable[Play]) -> List[Play]:
+        """Return the plays not recorded yet, without recording them."""
+        plays = list(dict.fromkeys(plays))
+        if not plays:
+            return []
+        key = self._key(user_id)
+        pipe = self.redis.pipeline(transaction=False)
+        for played_at, track_id in plays:
+            pipe.zscore(key, f"{played_at}:{track_id}")
+        return [play for play, score in zip(plays, pipe.execute()) if score is None]
+
+    def record_recently_played(self, user_id: str, items: List[Dict[str, Any]]) -> List[Play]:
+        """Record Spotify recently-played items, returning the plays that were new."""
+        plays = []
+        for item in items:
+            track_id = (item.get("track") or {}).get("id")
+            if track_id and item.get("played_at"):
+                plays.append((parse_played_at(item["played_at"]), track_id))
+        return self.add_new_plays(user_id, plays)
+
+    def users(self) -> List[str]:
+        """Return the IDs of users with recorded plays, sorted."""
+        return sorted(self.redis.smembers(self.users_key))
+
+    def count(self, user_id: str, before: Optional[int] = None) -> int:
+        """Return the number of plays recorded for a user.
+
+        Args:
+            user_id: Spotify user ID
+            before: Only count plays earlier than this, in epoch milliseconds
+        """
+        if before is None:
+            return self.redis.zcard(self._key(user_id))
+        return self.redis.zcount(self._key(user_id), "-inf", f"({before}")
+
+    def iter_plays(
+        self,
+        user_id: str,
+        chunk_size: int = 10000,
+        start: Optional[int] = None,
+        end: Optional[int] = None
+    ) -> Iterator[List[Play]]:
+        """Iterate over a user's plays in time order, a chunk at a time.
+
+        Each chunk is one range query, so memory use is bounded by
+        ``chunk_size`` however long the history is.
+
+        Args:
+            user_id: Spotify user ID
+            chunk_size: Maximum plays per chunk
+            start: Earliest play time in epoch milliseconds, inclusive
+            end: Latest play time in epoch milliseconds, inclusive
+
+        Yields:
+            List[Play]: ``(played_at_ms, track_id)`` pairs
+        """
+        low = "-inf" if start is None else start
+        high = "+inf" if end is None else end
+        # Members seen at the score the last chunk ended on; plays sharing a
+        # millisecond straddle chunks, so the next query starts at that score
+        seen_at_low: set = set()
+        while True:
+            rows = self.redis.zrangebyscore(
+                self._key(user_id), low, high, start=0, num=chunk_size + len(seen_at_low), withscores=True
+            )
+            chunk = []
+            for member, score in rows:
+                if member in seen_at_low:
+                    continue
+                played_at, _, track_id = member.partition(":")
+                chunk.append((int(played_at), track_id))
+                if len(chunk) == chunk_size:
+                    break
+            if not chunk:
+                return
+            yield chunk
+            if len(chunk) < chunk_size:
+                return
+            last = chunk[-1][0]
+            if last != low:
+                seen_at_low = set()
+            seen_at_low.update(f"{played_at}:{track_id}" for played_at, track_id in chunk if played_at == last)
+            low = last
+
+
+_store: Optional[PlayHistoryStore] = None
+
+
+def get_play_history() -> PlayHistoryStore:
+    """Return the process-wide play history store, creating it on first use."""
+    global _store
+    if _store is None:
+        _store = PlayHistoryStore(get_redis_client())
+    return _store
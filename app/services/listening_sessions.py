@@ -0,0 +1,262 @@
+"""Listening sessions and the mood arc within each.
+
+A session is a run of plays with no more than ``gap`` between consecutive
+plays. Within a session, mood shifts are found with a two-sided CUSUM over
+the plays' mood scores: each score's deviation from the current segment's
+mean, less a tolerated ``drift``, is summed upwards and downwards, and a
+sum passing ``threshold`` starts a new segment where that sum began
+growing. Sessions and segments come from one pass over columnar arrays of
+play times and scores.
+
+Summaries of finished sessions are cached per user in Redis. A session is
+finished once a later play starts after the gap, so new plays only change
+the last, open session: refreshing re-reads and re-segments the plays from
+its start. Plays recorded before it afterwards, e.g. by a history import,
+change the count of earlier plays, which triggers a full rebuild.
+"""
+
+import json
+import logging
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
+
+from app.core.config import settings
+from app.core.redis_client import get_redis_client
+from app.services.features import FeatureStore, get_feature_store
+from app.services.history import Play, PlayHistoryStore, get_play_history
+from app.services.mood_analyzer import MoodAnalyzer
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _summary(played_at: List[int], count_prefix: List[int], sum_prefix: List[float], start: int, end: int) -> Dict[str, Any]:
+    """Summarize plays ``start:end`` from prefix sums of scored plays and scores."""
+    scored = count_prefix[end] - count_prefix[start]
+    return {
+        "start": played_at[start],
+        "end": played_at[end - 1],
+        "plays": end - start,
+        "scored": scored,
+        "mood": (sum_prefix[end] - sum_prefix[start]) / scored if scored else None,
+    }
+
+
+def segment_plays(
+    played_at: "np.ndarray",
+    scores: "np.ndarray",
+    gap_ms: int,
+    threshold: float = 0.6,
+    drift: float = 0.05
+) -> List[Dict[str, Any]]:
+    """Split time-ordered plays into sessions, and sessions at mood shifts.
+
+    Args:
+        played_at: Play times in epoch milliseconds, ascending
+        scores: Mood score of each play, NaN for plays without features
+        gap_ms: Longest pause, in milliseconds, within a session
+        threshold: CUSUM sum that marks a mood shift
+        drift: Deviation from the segment mean per play ignored as noise
+
+    Returns:
+        List[Dict[str, Any]]: Sessions, oldest first, with their ``start``
+            and ``end`` play times, ``plays``, ``scored`` plays, average
+            ``mood`` (None if no play was scored) and ``segments``, the
+            same summary for each stretch of steady mood
+    """
+    import numpy as np
+
+    played_at = np.asarray(played_at, dtype=np.int64)
+    scores = np.asarray(scores, dtype=np.float64)
+    if not len(played_at):
+        return []
+    scored = ~np.isnan(scores)
+    # Any range's scored plays and mean in O(1)
+    count_prefix = np.concatenate(([0], np.cumsum(scored))).tolist()
+    sum_prefix = np.concatenate(([0.0], np.cumsum(np.where(scored, scores, 0.0)))).tolist()
+    session_starts = np.flatnonzero(np.diff(played_at) > gap_ms) + 1
+    starts_session = np.zeros(len(played_at), dtype=bool)
+    starts_session[0] = True
+    starts_session[session_starts] = True
+
+    # Start index of each segment, per session
+    boundaries: List[List[int]] = []
+    reference = high = low = 0.0
+    count = high_from = low_from = 0
+    for i, (new_session, score) in enumerate(zip(starts_session.tolist(), scores.tolist())):
+        if new_session:
+            boundaries.append([i])
+            count = 0
+        if score != score:
+            continue
+        if not count:
+            reference, count = score, 1
+            high = low = 0.0
+            continue
+        deviation = score - reference
+        if high == 0.0:
+            high_from = i
+        if low == 0.0:
+            low_from = i
+        high = max(0.0, high + deviation - drift)
+        low = max(0.0, low - deviation - drift)
+        if high > threshold or low > threshold:
+            # The shift began where the sum that detected it started growing
+            change = high_from if high > threshold else low_from
+            boundaries[-1].append(change)
+            count = count_prefix[i + 1] - count_prefix[change]
+            reference = (sum_prefix[i + 1] - sum_prefix[change]) / count
+            high = low = 0.0
+        else:
+            count += 1
+            reference += deviation / count
+
+    played_at = played_at.tolist()
+    ends = session_starts.tolist() + [len(played_at)]
+    sessions = []
+    for starts, end in zip(boundaries, ends):
+        session = _summary(played_at, count_prefix, sum_prefix, starts[0], end)
+        session["segments"] = [
+            _summary(played_at, count_prefix, sum_prefix, start, stop)
+            for start, stop in zip(starts, starts[1:] + [end])
+        ]
+        sessions.append(session)
+    return sessions
+
+
+class ListeningSessionStore:
+    """Per-user listening sessions, with finished ones cached in Redis."""
+
+    def __init__(
+        self,
+        redis: Any,
+        history: Optional[PlayHistoryStore] = None,
+        features: Optional[FeatureStore] = None,
+        prefix: str = "sessions:",
+        gap: float = 30 * 60,
+        threshold: float = 0.6,
+        drift: float = 0.05,
+        max_sessions: int = 500
+    ):
+        """Initialize the store.
+
+        Args:
+            redis: Redis client with ``decode_responses`` semantics
+            history: Play history, the process-wide store when None
+            features: Feature cache plays are scored from, the
+                process-wide store when None
+            prefix: Key prefix for cached sessions
+            gap: Longest pause, in seconds, within a session
+            threshold: CUSUM sum that marks a mood shift
+            drift: Deviation per play ignored as noise
+            max_sessions: Finished sessions kept per user, newest first
+        """
+        self.redis = redis
+        self.history = history or get_play_history()
+        self.features = features or get_feature_store()
+        self.prefix = prefix
+        self.gap_ms = int(gap * 1000)
+        self.threshold = threshold
+        self.drift = drift
+        self.max_sessions = max_sessions
+        self.analyzer = MoodAnalyzer()
+        self._catalog_scores: Optional["np.ndarray"] = None
+
+    def _key(self, user_id: str) -> str:
+        return f"{self.prefix}user:{user_id}"
+
+    def score_plays(self, track_ids: Sequence[str]) -> "np.ndarray":
+        """Return the mood score of each play, NaN where features are unknown.
+
+        Tracks in the feature catalog are scored with one vectorized lookup;
+        the rest from cached features.
+        """
+        import numpy as np
+
+        scores = np.full(len(track_ids), np.nan)
+        missing = np.ones(len(track_ids), dtype=bool)
+        catalog = self.features.catalog
+        if catalog is not None and len(track_ids):
+            if self._catalog_scores is None:
+                self._catalog_scores = self.analyzer.score_catalog(catalog)
+            rows = catalog.indices(track_ids)
+            missing = rows < 0
+            scores[~missing] = self._catalog_scores[rows[~missing]]
+        uncataloged = [track_ids[i] for i in np.flatnonzero(missing)]
+        if uncataloged:
+            features = self.features.get_cached(list(dict.fromkeys(uncataloged)))
+            by_track = {track_id: self.analyzer.score_track(f) for track_id, f in features.items()}
+            scores[missing] = [by_track.get(track_id) for track_id in uncataloged]
+        return scores
+
+    def segment(self, plays: Sequence[Play]) -> List[Dict[str, Any]]:
+        """Segment time-ordered plays with this store's settings."""
+        import numpy as np
+
+        played_at = np.fromiter((played_at for played_at, _ in plays), dtype=np.int64, count=len(plays))
+        scores = self.score_plays([track_id for _, track_id in plays])
+        return segment_plays(played_at, scores, self.gap_ms, self.threshold, self.drift)
+
+    def _load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return a user's cached state, or None if missing or outdated by older plays."""
+        raw = self.redis.get(self._key(user_id))
+        if raw is None:
+            return None
+        state = json.loads(raw)
+        if state["resume_from"] is not None and self.history.count(user_id, before=state["resume_from"]) != state["plays_before"]:
+            logger.info(f"Plays recorded before the open session, rebuilding sessions of {user_id}")
+            return None
+        return state
+
+    def get(self, user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return a user's listening sessions, newest first.
+
+        Only plays of the open session are read and segmented, and none if
+        no play was recorded since the last call.
+
+        Args:
+            user_id: Spotify user ID
+            limit: Maximum number of sessions
+
+        Returns:
+            List[Dict[str, Any]]: Sessions as returned by :func:`segment_plays`
+        """
+        total = self.history.count(user_id)
+        state = self._load(user_id)
+        if state is None or state["plays"] != total:
+            resume_from = state["resume_from"] if state else None
+            closed = state["closed"] if state else []
+            plays_before = state["plays_before"] if state else 0
+            plays = [play for chunk in self.history.iter_plays(user_id, start=resume_from) for play in chunk]
+            sessions = self.segment(plays)
+            open_session = sessions.pop() if sessions else None
+            closed = (closed + sessions)[-self.max_sessions:]
+            plays_before += sum(session["plays"] for session in sessions)
+            state = {
+                "closed": closed,
+                "open": open_session,
+                "resume_from": open_session["start"] if open_session else None,
+                "plays_before": plays_before,
+                "plays": plays_before + (open_session["plays"] if open_session else 0),
+            }
+            self.redis.set(self._key(user_id), json.dumps(state))
+        sessions = ([state["open"]] if state["open"] else []) + state["closed"][::-1]
+        return sessions[:limit] if limit is not None else sessions
+
+
+_store: Optional[ListeningSessionStore] = None
+
+
+def get_listening_sessions() -> ListeningSessionStore:
+    """Return the process-wide listening session store, creating it on first use."""
+    global _store
+    if _store is None:
+        _store = ListeningSessionStore(
+            get_redis_client(),
+            gap=settings.LISTENING_SESSION_GAP_MINUTES * 60,
+            threshold=settings.LISTENING_SESSION_CHANGE_THRESHOLD,
+            drift=settings.LISTENING_SESSION_CHANGE_DRIFT,
+            max_sessions=settings.LISTENING_SESSION_MAX_CACHED
+        )
+    return _store
@@ -0,0 +1,270 @@
+"""Platform-wide mood aggregates by cohort and time bucket.
+
+Each cohort (every user, or the users of one region) has one Redis hash
+per hour and per UTC day holding mergeable partial aggregates of the plays
+in it: play count, sums of mood, squared mood and energy, and a histogram
+of mood scores. Plays are added with ``HINCRBY``/``HINCRBYFLOAT``, which
+are atomic, so any number of workers roll plays up without locks, and
+wider windows are answered by merging bucket hashes rather than scanning
+histories.
+
+Each bucket also counts its distinct users in a HyperLogLog. Buckets,
+windows and regions with plays from fewer than ``min_users`` users are
+suppressed, so a small region never reveals one person's listening.
+"""
+
+import logging
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.redis_client import get_redis_client
+from app.services.mood_stats import DAY_SECONDS, QuantileSketch, Sample
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_COHORT = "global"
+
+# Bucket formats by resolution
+RESOLUTIONS = {"hour": "%Y-%m-%dT%H", "day": "%Y-%m-%d"}
+_STEPS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+
+def region_cohort(region: str) -> str:
+    """Return the cohort of users in a region, an ISO 3166-1 alpha-2 code."""
+    return f"region:{region.upper()}"
+
+
+class MoodAggregate:
+    """Mergeable partial aggregate of mood scores."""
+
+    def __init__(self, bins: int = 20):
+        self.count = 0
+        self.mood_sum = 0.0
+        self.mood_squares = 0.0
+        self.energy_sum = 0.0
+        self.sketch = QuantileSketch(bins)
+
+    def update(self, mood: float, energy: float) -> None:
+        """Add one play."""
+        self.count += 1
+        self.mood_sum += mood
+        self.mood_squares += mood * mood
+        self.energy_sum += energy
+        self.sketch.update(mood)
+
+    def merge(self, other: "MoodAggregate") -> "MoodAggregate":
+        """Add another aggregate's plays to this one, in place."""
+        self.count += other.count
+        self.mood_sum += other.mood_sum
+        self.mood_squares += other.mood_squares
+        self.energy_sum += other.energy_sum
+        self.sketch.merge(other.sketch)
+        return self
+
+    def increments(self) -> Dict[str, float]:
+        """Return the hash field increments that add this aggregate."""
+        fields: Dict[str, float] = {
+            "n": self.count,
+            "mood": self.mood_sum,
+            "mood_sq": self.mood_squares,
+            "energy": self.energy_sum,
+        }
+        for index, count in enumerate(self.sketch.counts):
+            if count:
+                fields[f"bin:{index}"] = count
+        return fields
+
+    @classmethod
+    def from_hash(cls, fields: Dict[str, str], bins: int = 20) -> "MoodAggregate":
+        """Restore an aggregate from its Redis hash."""
+        aggregate = cls(bins)
+        aggregate.count = int(fields.get("n", 0))
+        aggregate.mood_sum = float(fields.get("mood", 0))
+        aggregate.mood_squares = float(fields.get("mood_sq", 0))
+        aggregate.energy_sum = float(fields.get("energy", 0))
+        for name, value in fields.items():
+            if name.startswith("bin:"):
+                index = int(name[4:])
+                if index < bins:
+                    aggregate.sketch.counts[index] += int(value)
+                    aggregate.sketch.count += int(value)
+        return aggregate
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the aggregate in the terms of ``MoodAnalysis``."""
+        if not self.count:
+            return {"plays": 0, "overall_mood": None, "average_energy": None, "mood_volatility": None}
+        mean = self.mood_sum / self.count
+        return {
+            "plays": self.count,
+            "overall_mood": mean,
+            "average_energy": self.energy_sum / self.count,
+            "mood_volatility": math.sqrt(max(0.0, self.mood_squares / self.count - mean * mean)),
+            "mood_percentiles": {f"p{p}": self.sketch.quantile(p / 100) for p in (10, 50, 90)},
+        }
+
+
+class MoodAggregates:
+    """Cohort and global mood aggregates in Redis."""
+
+    def __init__(
+        self,
+        redis: Any,
+        prefix: str = "moodagg:",
+        bins: int = 20,
+        hour_ttl: int = 35 * DAY_SECONDS,
+        day_ttl: int = 400 * DAY_SECONDS,
+        min_users: int = 10
+    ):
+        """Initialize the aggregates.
+
+        Args:
+            redis: Redis client with ``decode_responses`` semantics
+            prefix: Key prefix
+            bins: Histogram bins for percentiles
+            hour_ttl: Lifetime of hourly buckets in seconds
+            day_ttl: Lifetime of daily buckets in seconds
+            min_users: Fewest distinct users an aggregate is shown for
+        """
+        self.redis = redis
+        self.prefix = prefix
+        self.bins = bins
+        self.ttls = {"hour": hour_ttl, "day": day_ttl}
+        self.regions_key = f"{prefix}regions"
+        self.min_users = min_users
+
+    def _key(self, cohort: str, resolution: str, bucket: str) -> str:
+        return f"{self.prefix}{cohort}:{resolution}:{bucket}"
+
+    def record(self, samples: Iterable[Sample], region: Optional[str] = None, user_id: Optional[str] = None) -> None:
+        """Roll plays up into the global cohort and the region's cohort.
+
+        Args:
+            samples: ``(played_at_ms, mood_score, energy)`` of new plays
+            region: Country of the user, e.g. ``US``; only global when None
+            user_id: User the plays are from, counted towards ``min_users``;
+                plays without one are never shown on their own
+        """
+        cohorts = [GLOBAL_COHORT] + ([region_cohort(region)] if region else [])
+        partials: Dict[str, MoodAggregate] = {}
+        ttls: Dict[str, int] = {}
+        for played_at, mood, energy in samples:
+            time = datetime.fromtimestamp(played_at / 1000, timezone.utc)
+            for resolution, fmt in RESOLUTIONS.items():
+                bucket = time.strftime(fmt)
+                for cohort in cohorts:
+                    key = self._key(cohort, resolution, bucket)
+                    if key not in partials:
+                        partials[key] = MoodAggregate(self.bins)
+                        ttls[key] = self.ttls[resolution]
+                    partials[key].update(mood, energy)
+        if not partials:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for key, partial in partials.items():
+            for name, amount in partial.increments().items():
+                if isinstance(amount, int):
+                    pipe.hincrby(key, name, amount)
+                else:
+                    pipe.hincrbyfloat(key, name, amount)
+            pipe.expire(key, ttls[key])
+            if user_id:
+                pipe.pfadd(f"{key}:users", user_id)
+                pipe.expire(f"{key}:users", ttls[key])
+        if region:
+            pipe.sadd(self.regions_key, region.upper())
+        pipe.execute()
+
+    def _buckets(self, resolution: str, start: datetime, end: datetime) -> List[str]:
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution {resolution!r}, expected one of {', '.join(RESOLUTIONS)}")
+        fmt, step = RESOLUTIONS[resolution], _STEPS[resolution]
+        current = datetime.strptime(start.astimezone(timezone.utc).strftime(fmt), fmt).replace(tzinfo=timezone.utc)
+        buckets = []
+        while current <= end:
+            buckets.append(current.strftime(fmt))
+            current += step
+        return buckets
+
+    def _read(self, cohort: str, resolution: str, buckets: List[str]) -> Tuple[List[MoodAggregate], List[int], int]:
+        """Read buckets with their distinct users, and the distinct users of all of them."""
+        keys = [self._key(cohort, resolution, bucket) for bucket in buckets]
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.hgetall(key)
+            pipe.pfcount(f"{key}:users")
+        pipe.pfcount(*[f"{key}:users" for key in keys])
+        results = pipe.execute()
+        aggregates = [MoodAggregate.from_hash(fields, self.bins) for fields in results[0:-1:2]]
+        return aggregates, results[1:-1:2], results[-1]
+
+    def _summary(self, aggregate: MoodAggregate, users: int) -> Dict[str, Any]:
+        """Summarize an aggregate, or only mark it suppressed if too few users are in it."""
+        if aggregate.count and users < self.min_users:
+            return {"suppressed": True}
+        return {**aggregate.summary(), "users": users}
+
+    def series(self, cohort: str, resolution: str, start: datetime, end: datetime) -> Dict[str, Any]:
+        """Return a cohort's aggregates per bucket and for the whole window.
+
+        Args:
+            cohort: ``global`` or ``region:<CC>``
+            resolution: ``hour`` or ``day``
+            start: First bucket's time, inclusive
+            end: Last bucket's time, inclusive
+
+        Returns:
+            Dict[str, Any]: ``total`` and ``buckets``, each bucket with its
+                label; aggregates of fewer than ``min_users`` users only
+                have ``suppressed``
+
+        Raises:
+            ValueError: If the resolution is unknown
+        """
+        buckets = self._buckets(resolution, start, end)
+        aggregates, users, total_users = self._read(cohort, resolution, buckets)
+        total = MoodAggregate(self.bins)
+        for aggregate in aggregates:
+            total.merge(aggregate)
+        return {
+            "cohort": cohort,
+            "resolution": resolution,
+            "total": self._summary(total, total_users),
+            "buckets": [
+                {"bucket": bucket, **self._summary(aggregate, count)}
+                for bucket, aggregate, count in zip(buckets, aggregates, users)
+            ],
+        }
+
+    def regions(self) -> List[str]:
+        """Return the regions with recorded plays."""
+        return sorted(self.redis.smembers(self.regions_key))
+
+    def by_region(self, start: datetime, end: datetime) -> Dict[str, Dict[str, Any]]:
+        """Return each region's aggregate over whole days from ``start`` to ``end``.
+
+        Regions with plays from fewer than ``min_users`` users are left out.
+        """
+        buckets = self._buckets("day", start, end)
+        table = {}
+        for region in self.regions():
+            total = MoodAggregate(self.bins)
+            aggregates, _, users = self._read(region_cohort(region), "day", buckets)
+            for aggregate in aggregates:
+                total.merge(aggregate)
+            if total.count and users >= self.min_users:
+                table[region] = self._summary(total, users)
+        return table
+
+
+_aggregates: Optional[MoodAggregates] = None
+
+
+def get_mood_aggregates() -> MoodAggregates:
+    """Return the process-wide aggregates, creating them on first use."""
+    global _aggregates
+    if _aggregates is None:
+        _aggregates = MoodAggregates(get_redis_client(), min_users=settings.MOOD_AGGREGATES_MIN_USERS)
+    return _aggregates
@@ -1,14 +1,20 @@
 """Service for analyzing mood based on audio features."""
 
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any, Mapping, Optional, Sequence
 import logging
 import statistics
-import numpy as np
+import time
 
+from app.core.metrics import ANALYSIS_SECONDS, batch_size_label
+from app.core.tracing import record_span, traced
 from app.schemas.mood import MoodAnalysis, TrackMood, AudioFeatures
 from app.services.spotify import SpotifyService
 
+if TYPE_CHECKING:
+    import numpy as np
+    from app.services.feature_catalog import FeatureCatalog
+
 logger = logging.getLogger(__name__)
 
 class MoodAnalyzer:
@@ -31,6 +37,16 @@ class MoodAnalyzer:
         Returns:
             MoodAnalysis object with overall mood and track-specific analysis
         """
+        start = time.perf_counter()
+        try:
+            return self._analyze_tracks(tracks_data)
+        finally:
+            elapsed = time.perf_counter() - start
+            ANALYSIS_SECONDS.labels(batch_size_label(len(tracks_data or ()))).observe(elapsed)
+            record_span("analysis", elapsed)
+
+    def _analyze_tracks(self, tracks_data: List[Dict[str, Any]]) -> MoodAnalysis:
+        """Compute the analysis for :meth:`analyze_tracks`."""
         try:
             if not tracks_data:
                 logger.warning("No tracks provided for analysis")
@@ -73,8 +89,8 @@ class MoodAnalyzer:
             mood_scores = [t.mood_score for t in track_moods]
             energy_scores = [t.energy for t in track_moods]
             
-            overall_mood = float(np.mean(mood_scores))
-            average_energy = float(np.mean(energy_scores))
+            overall_mood = statistics.fmean(mood_scores)
+            average_energy = statistics.fmean(energy_scores)
             
             # Generate mood trend (last 7 days)
             # For now, we'll just use the most recent tracks
@@ -101,6 +117,22 @@ class MoodAnalyzer:
                 mood_trend=[0.5] * 7
             )
     
+    def warm_up(self) -> None:
+        """Prepare scoring before the first request.
+
+        Runs a one-track analysis so validators and code paths used for
+        scoring are initialized before traffic arrives.
+        """
+        features = AudioFeatures(
+            valence=0.5,
+            energy=0.5,
+            danceability=0.5,
+            instrumentalness=0.0,
+            tempo=120.0,
+            mode=1
+        )
+        self._analyze_tracks([{"id": "warm-up", "features": features}])
+
     async def analyze_debug_data(self) -> MoodAnalysis:
         """Generate sample mood analysis data for testing.
         
@@ -169,6 +201,88 @@ class MoodAnalyzer:
         # Ensure score is between 0 and 1
         return max(0.0, min(1.0, mood_score))
     
+    def score_track(self, features: Optional[Dict[str, Any]]) -> Optional[float]:
+        """Compute the mood score of one track from Spotify's features payload.
+
+        Returns:
+            Optional[float]: Mood score, None if features are missing
+        """
+        try:
+            return self._compute_mood_score(AudioFeatures.model_construct(
+                valence=float(features["valence"]),
+                energy=float(features["energy"]),
+                danceability=float(features["danceability"]),
+                mode=int(features["mode"])
+            ))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def score_columns(self, columns: Mapping[str, "np.ndarray"]) -> "np.ndarray":
+        """Compute mood scores for many tracks at once.
+
+        Vectorized form of :meth:`_compute_mood_score`.
+
+        Args:
+            columns: Arrays of valence, energy, danceability and mode, one
+                element per track
+
+        Returns:
+            np.ndarray: Mood score per track, NaN where features are NaN
+        """
+        import numpy as np
+
+        scores = (
+            columns["valence"] * np.float32(0.5)
+            + columns["energy"] * np.float32(0.25)
+            + columns["danceability"] * np.float32(0.15)
+            + np.where(columns["mode"] == 1, np.float32(0.1), np.float32(0.0))
+        )
+        return np.clip(scores, 0.0, 1.0, out=scores)
+
+    def score_catalog(self, catalog: "FeatureCatalog") -> "np.ndarray":
+        """Compute the mood score of every cataloged track, by catalog row."""
+        return self.score_columns(catalog.columns)
+
+    def analyze_plays(
+        self,
+        catalog: "FeatureCatalog",
+        track_ids: Sequence[str],
+        row_scores: Optional["np.ndarray"] = None
+    ) -> Dict[str, Any]:
+        """Summarize the mood of many plays using a feature catalog.
+
+        Plays are resolved to catalog rows with one vectorized binary
+        search, and scores are gathered from the catalog columns, so no
+        features are deserialized per play.
+
+        Args:
+            catalog: Feature catalog
+            track_ids: Track ID of each play; repeats count once per play
+            row_scores: Result of :meth:`score_catalog`, to reuse across calls
+
+        Returns:
+            Dict[str, Any]: Number of plays and of plays found in the
+                catalog, and their average mood, energy and valence
+        """
+        import numpy as np
+
+        start = time.perf_counter()
+        rows = catalog.indices(track_ids)
+        rows = rows[rows >= 0]
+        if row_scores is None:
+            row_scores = self.score_catalog(catalog)
+        summary = {"plays": len(track_ids), "scored": int(len(rows))}
+        if len(rows):
+            summary["overall_mood"] = float(np.mean(row_scores[rows], dtype=np.float64))
+            summary["average_energy"] = float(np.mean(catalog.column("energy")[rows], dtype=np.float64))
+            summary["average_valence"] = float(np.mean(catalog.column("valence")[rows], dtype=np.float64))
+        else:
+            summary.update(overall_mood=0.5, average_energy=0.5, average_valence=0.5)
+        elapsed = time.perf_counter() - start
+        ANALYSIS_SECONDS.labels(batch_size_label(len(track_ids))).observe(elapsed)
+        record_span("analysis", elapsed)
+        return summary
+
     def _calculate_mood_trend(self, tracks: List[TrackMood]) -> List[float]:
         """Calculate daily mood trend from track moods.
         
@@ -185,6 +299,7 @@ class MoodAnalyzer:
             scores.append(scores[-1] if scores else 0.5)
         return scores
 
+    @traced("analysis")
     def analyze_current_mood(self, tracks: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Analyze the current mood based on recent tracks."""
         try:
@@ -207,6 +322,7 @@ class MoodAnalyzer:
                 "description": "Unable to analyze mood at this time"
             }
 
+    @traced("analysis")
     def analyze_mood_trend(self, tracks: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Analyze mood trend from tracks."""
         try:
@@ -229,6 +345,7 @@ class MoodAnalyzer:
                 "values": [50] * 7  # Neutral values
             }
 
+    @traced("analysis")
     def get_recommendations(self, current_mood: Dict[str, Any]) -> str:
         """Get recommendations based on current mood."""
         try:
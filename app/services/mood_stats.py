@@ -0,0 +1,466 @@
+"""Streaming statistics of mood scores.
+
+Statistics are updated one play at a time and never need the plays again:
+
+- :class:`RunningStats` keeps count, mean and variance with Welford's
+  algorithm, plus min and max.
+- :class:`DecayedMean` is an exponentially weighted moving average over
+  time, e.g. the mood of the last seven days, that tolerates plays arriving
+  out of order.
+- :class:`QuantileSketch` estimates percentiles from a fixed histogram.
+
+All three merge exactly, so statistics computed on different workers, for
+different days or for different users combine into the statistics of the
+union. :class:`MoodStatsStore` keeps them per user and per day in Redis,
+so a user's volatility or seven-day average is read in O(1).
+"""
+
+import json
+import logging
+import math
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.redis_client import get_redis_client
+from app.services.history import Play
+
+if TYPE_CHECKING:
+    from app.services.mood_aggregates import MoodAggregates
+    from app.services.mood_analyzer import MoodAnalyzer
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 24 * 60 * 60
+
+# (played_at in epoch milliseconds, mood score, energy)
+Sample = Tuple[int, float, float]
+
+
+class RunningStats:
+    """Count, mean, variance, min and max of a stream of values."""
+
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0,
+                 minimum: float = math.inf, maximum: float = -math.inf):
+        self.count = count
+        self.mean = mean
+        # Sum of squared differences from the mean
+        self.m2 = m2
+        self.min = minimum
+        self.max = maximum
+
+    def update(self, value: float) -> None:
+        """Add one value."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if value < self.min else self.min
+        self.max = value if value > self.max else self.max
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        """Combine another stream's statistics into these, in place."""
+        if not other.count:
+            return self
+        if not self.count:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self) -> float:
+        """Population variance, 0 for fewer than two values."""
+        return self.m2 / self.count if self.count > 1 else 0.0
+
+    @property
+    def stdev(self) -> float:
+        """Population standard deviation."""
+        return math.sqrt(self.variance)
+
+    def to_dict(self) -> Dict[str, Any]:
+        if not self.count:
+            return {"n": 0}
+        return {"n": self.count, "mean": self.mean, "m2": self.m2, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RunningStats":
+        if not data.get("n"):
+            return cls()
+        return cls(data["n"], data["mean"], data["m2"], data["min"], data["max"])
+
+
+class DecayedMean:
+    """Exponentially weighted moving average of timestamped values.
+
+    A value observed ``dt`` seconds before the latest one has weight
+    ``exp(-dt / time_constant)``, whichever order they arrive in.
+    """
+
+    __slots__ = ("time_constant", "total", "weight", "timestamp")
+
+    def __init__(self, time_constant: float, total: float = 0.0, weight: float = 0.0,
+                 timestamp: Optional[float] = None):
+        """Initialize the average.
+
+        Args:
+            time_constant: Seconds over which weights fall by a factor of e
+            total: Decayed sum of values
+            weight: Decayed number of values
+            timestamp: Time of the latest value in seconds, which the sums refer to
+        """
+        self.time_constant = time_constant
+        self.total = total
+        self.weight = weight
+        self.timestamp = timestamp
+
+    def _decay(self, seconds: float) -> float:
+        return math.exp(-seconds / self.time_constant)
+
+    def _advance(self, timestamp: float) -> None:
+        if self.timestamp is not None and timestamp > self.timestamp:
+            decay = self._decay(timestamp - self.timestamp)
+            self.total *= decay
+            self.weight *= decay
+        if self.timestamp is None or timestamp > self.timestamp:
+            self.timestamp = timestamp
+
+    def update(self, value: float, timestamp: float) -> None:
+        """Add a value observed at ``timestamp`` seconds."""
+        self._advance(timestamp)
+        weight = self._decay(self.timestamp - timestamp)
+        self.total += weight * value
+        self.weight += weight
+
+    def merge(self, other: "DecayedMean") -> "DecayedMean":
+        """Combine another average with the same time constant into this one."""
+        if other.timestamp is None:
+            return self
+        self._advance(other.timestamp)
+        decay = self._decay(self.timestamp - other.timestamp)
+        self.total += other.total * decay
+        self.weight += other.weight * decay
+        return self
+
+    @property
+    def value(self) -> Optional[float]:
+        """The average as of the latest value, None before any value."""
+        return self.total / self.weight if self.weight > 0 else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"total": self.total, "weight": self.weight, "ts": self.timestamp}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], time_constant: float) -> "DecayedMean":
+        return cls(time_constant, data.get("total", 0.0), data.get("weight", 0.0), data.get("ts"))
+
+
+class QuantileSketch:
+    """Percentile estimates from a fixed-width histogram over a bounded range.
+
+    Mood scores lie in [0, 1], so equal-width bins bound the error of any
+    percentile by the bin width, use constant memory, and merge exactly by
+    adding counts.
+    """
+
+    __slots__ = ("bins", "low", "high", "counts", "count")
+
+    def __init__(self, bins: int = 100, low: float = 0.0, high: float = 1.0,
+                 counts: Optional[List[int]] = None):
+        self.bins = bins
+        self.low = low
+        self.high = high
+        self.counts = counts if counts is not None else [0] * bins
+        self.count = sum(self.counts)
+
+    def _bin(self, value: float) -> int:
+        index = int((value - self.low) / (self.high - self.low) * self.bins)
+        return min(self.bins - 1, max(0, index))
+
+    def update(self, value: float) -> None:
+        """Add a value; values outside the range count towards the edge bins."""
+        self.counts[self._bin(value)] += 1
+        self.count += 1
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Add another sketch's counts to this one.
+
+        Raises:
+            ValueError: If the sketches have different bins
+        """
+        if (other.bins, other.low, other.high) != (self.bins, self.low, self.high):
+            raise ValueError("Cannot merge quantile sketches with different bins")
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.count += other.count
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the ``q`` quantile (0 to 1), interpolating within a bin."""
+        if not self.count:
+            return None
+        target = min(1.0, max(0.0, q)) * self.count
+        width = (self.high - self.low) / self.bins
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= target:
+                return self.low + width * (index + (target - seen) / count)
+            seen += count
+        return self.high
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Sparse, since a user's scores usually cover a few bins
+        return {
+            "bins": self.bins, "low": self.low, "high": self.high,
+            "counts": {str(index): count for index, count in enumerate(self.counts) if count},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        counts = [0] * data["bins"]
+        for index, count in data["counts"].items():
+            counts[int(index)] = count
+        return cls(data["bins"], data["low"], data["high"], counts)
+
+
+class MoodStats:
+    """Mergeable mood statistics of a set of plays."""
+
+    def __init__(
+        self,
+        time_constant: float = 7 * DAY_SECONDS,
+        mood: Optional[RunningStats] = None,
+        energy: Optional[RunningStats] = None,
+        trend: Optional[DecayedMean] = None,
+        quantiles: Optional[QuantileSketch] = None
+    ):
+        """Initialize empty or restored statistics.
+
+        Args:
+            time_constant: Time constant of the moving average in seconds
+            mood: Mood score statistics
+            energy: Energy statistics
+            trend: Moving average of mood scores
+            quantiles: Sketch of mood scores
+        """
+        self.mood = mood or RunningStats()
+        self.energy = energy or RunningStats()
+        self.trend = trend or DecayedMean(time_constant)
+        self.quantiles = quantiles or QuantileSketch()
+
+    @property
+    def count(self) -> int:
+        return self.mood.count
+
+    def update(self, played_at_ms: int, mood: float, energy: float) -> None:
+        """Add one play."""
+        self.mood.update(mood)
+        self.energy.update(energy)
+        self.trend.update(mood, played_at_ms / 1000)
+        self.quantiles.update(mood)
+
+    def merge(self, other: "MoodStats") -> "MoodStats":
+        """Combine another set of plays' statistics into these, in place."""
+        self.mood.merge(other.mood)
+        self.energy.merge(other.energy)
+        self.trend.merge(other.trend)
+        self.quantiles.merge(other.quantiles)
+        return self
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the statistics served to clients."""
+        return {
+            "plays": self.count,
+            "average_mood": self.mood.mean if self.count else None,
+            "mood_volatility": self.mood.stdev if self.count else None,
+            "mood_ema": self.trend.value,
+            "average_energy": self.energy.mean if self.count else None,
+            "mood_percentiles": {
+                f"p{p}": self.quantiles.quantile(p / 100) for p in (10, 25, 50, 75, 90)
+            } if self.count else {},
+            "last_play_at": (
+                datetime.fromtimestamp(self.trend.timestamp, timezone.utc).isoformat()
+                if self.trend.timestamp is not None else None
+            ),
+        }
+
+    def dumps(self) -> str:
+        return json.dumps({
+            "mood": self.mood.to_dict(),
+            "energy": self.energy.to_dict(),
+            "trend": self.trend.to_dict(),
+            "quantiles": self.quantiles.to_dict(),
+        }, separators=(",", ":"))
+
+    @classmethod
+    def loads(cls, raw: str, time_constant: float = 7 * DAY_SECONDS) -> "MoodStats":
+        data = json.loads(raw)
+        return cls(
+            time_constant,
+            RunningStats.from_dict(data["mood"]),
+            RunningStats.from_dict(data["energy"]),
+            DecayedMean.from_dict(data["trend"], time_constant),
+            QuantileSketch.from_dict(data["quantiles"]),
+        )
+
+
+def day_bucket(played_at_ms: int) -> str:
+    """Return the UTC day of a play, the bucket its statistics are kept in."""
+    return datetime.fromtimestamp(played_at_ms / 1000, timezone.utc).strftime("%Y-%m-%d")
+
+
+class MoodStatsStore:
+    """Per-user mood statistics in Redis, all-time and per UTC day.
+
+    Plays are folded into a delta for each affected bucket, and each delta
+    is merged into Redis in a WATCH/MULTI transaction, retried when another
+    writer changed the bucket in between, so concurrent writers from
+    different workers never lose updates and never wait on each other. New
+    plays are also rolled up into the cohort and global aggregates when
+    ``aggregates`` is given.
+    """
+
+    ALL = "all"
+
+    def __init__(
+        self,
+        redis: Any,
+        prefix: str = "moodstats:",
+        time_constant: float = 7 * DAY_SECONDS,
+        day_ttl: int = 400 * DAY_SECONDS,
+        aggregates: Optional["MoodAggregates"] = None
+    ):
+        """Initialize the store.
+
+        Args:
+            redis: Redis client with ``decode_responses`` semantics
+            prefix: Key prefix
+            time_constant: Time constant of the moving average in seconds
+            day_ttl: Lifetime of daily buckets in seconds
+            aggregates: Cohort and global aggregates fed with every play
+        """
+        self.redis = redis
+        self.prefix = prefix
+        self.time_constant = time_constant
+        self.day_ttl = day_ttl
+        self.aggregates = aggregates
+
+    def _key(self, user_id: str, bucket: str) -> str:
+        return f"{self.prefix}{user_id}:{bucket}"
+
+    def record(self, user_id: str, samples: Iterable[Sample], region: Optional[str] = None) -> int:
+        """Add plays to a user's statistics.
+
+        Args:
+            user_id: Spotify user ID
+            samples: ``(played_at_ms, mood_score, energy)`` of plays not
+                recorded before; recording a play twice counts it twice
+            region: Country the plays were made in, for regional aggregates
+
+        Returns:
+            int: Number of plays recorded
+        """
+        samples = list(samples)
+        deltas: Dict[str, MoodStats] = {}
+        total = MoodStats(self.time_constant)
+        for played_at, mood, energy in samples:
+            total.update(played_at, mood, energy)
+            bucket = day_bucket(played_at)
+            if bucket not in deltas:
+                deltas[bucket] = MoodStats(self.time_constant)
+            deltas[bucket].update(played_at, mood, energy)
+        if not total.count:
+            return 0
+        self._merge(self._key(user_id, self.ALL), total, ttl=None)
+        for bucket, delta in deltas.items():
+            self._merge(self._key(user_id, bucket), delta, ttl=self.day_ttl)
+        if self.aggregates is not None:
+            self.aggregates.record(samples, region, user_id)
+        return total.count
+
+    def record_plays(
+        self,
+        user_id: str,
+        plays: Iterable[Play],
+        features: Dict[str, Dict[str, Any]],
+        analyzer: "MoodAnalyzer",
+        region: Optional[str] = None
+    ) -> int:
+        """Score new plays and add them to a user's statistics.
+
+        Args:
+            user_id: Spotify user ID
+            plays: ``(played_at_ms, track_id)`` of plays not recorded before
+            features: Audio features by track ID; plays without are left out
+            analyzer: Analyzer used for mood scores
+            region: Country the plays were made in, for regional aggregates
+
+        Returns:
+            int: Number of plays recorded
+        """
+        scores: Dict[str, Optional[float]] = {}
+        samples = []
+        for played_at, track_id in plays:
+            if track_id not in scores:
+                scores[track_id] = analyzer.score_track(features.get(track_id))
+            if scores[track_id] is not None:
+                samples.append((played_at, scores[track_id], float(features[track_id]["energy"])))
+        return self.record(user_id, samples, region)
+
+    def _merge(self, key: str, delta: MoodStats, ttl: Optional[int]) -> None:
+        """Merge a delta into a stored bucket atomically."""
+        def merge(pipe: Any) -> None:
+            raw = pipe.get(key)
+            stats = MoodStats.loads(raw, self.time_constant).merge(delta) if raw else delta
+            pipe.multi()
+            if ttl:
+                pipe.setex(key, ttl, stats.dumps())
+            else:
+                pipe.set(key, stats.dumps())
+
+        self.redis.transaction(merge, key)
+
+    def get(self, user_id: str, bucket: str = ALL) -> MoodStats:
+        """Return a user's statistics for one bucket, empty when unknown."""
+        raw = self.redis.get(self._key(user_id, bucket))
+        return MoodStats.loads(raw, self.time_constant) if raw else MoodStats(self.time_constant)
+
+    def get_days(self, user_id: str, days: int, now: Optional[datetime] = None) -> MoodStats:
+        """Return a user's statistics for the last ``days`` UTC days, today included."""
+        now = now or datetime.now(timezone.utc)
+        keys = [
+            self._key(user_id, (now - timedelta(days=offset)).strftime("%Y-%m-%d"))
+            for offset in range(days)
+        ]
+        stats = MoodStats(self.time_constant)
+        for raw in self.redis.mget(keys):
+            if raw:
+                stats.merge(MoodStats.loads(raw, self.time_constant))
+        return stats
+
+
+_store: Optional[MoodStatsStore] = None
+
+
+def get_mood_stats() -> MoodStatsStore:
+    """Return the process-wide mood statistics store, creating it on first use."""
+    global _store
+    if _store is None:
+        # Imported here as the aggregates build on this module
+        from app.services.mood_aggregates import get_mood_aggregates
+
+        _store = MoodStatsStore(
+            get_redis_client(),
+            time_constant=settings.MOOD_EMA_DAYS * DAY_SECONDS,
+            aggregates=get_mood_aggregates()
+        )
+    return _store
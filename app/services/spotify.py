@@ -1,27 +1,50 @@
 """Service for interacting with the Spotify API."""
 
+import asyncio
+import hashlib
 import logging
+import time
 from typing import Dict, List, Any, Optional
 import aiohttp
 from fastapi import HTTPException
 
+from app.core.cache import get_cache
+from app.core.circuit_breaker import CircuitOpenError, get_circuit_breaker
+from app.core.config import settings
+from app.core.http import upstream_session
+from app.core.metrics import SPOTIFY_REQUEST_SECONDS
+from app.core.tracing import record_span
+
 logger = logging.getLogger(__name__)
 
+class SpotifyUnavailable(HTTPException):
+    """Spotify is down, slow or rate limiting, rather than rejecting the request."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[float] = None):
+        headers = {"Retry-After": str(max(1, round(retry_after)))} if retry_after is not None else None
+        super().__init__(status_code=status_code, detail=detail, headers=headers)
+
 class SpotifyService:
     """Service for interacting with the Spotify API."""
 
-    def __init__(self, access_token: str):
+    def __init__(self, access_token: str, base_url: Optional[str] = None):
         """Initialize the service.
         
         Args:
             access_token: Spotify access token
+            base_url: Spotify Web API base URL, ``settings.SPOTIFY_API_BASE_URL``
+                when None
         """
         self.access_token = access_token
-        self.base_url = "https://api.spotify.com/v1"
+        self.base_url = (base_url or settings.SPOTIFY_API_BASE_URL).rstrip("/")
 
     async def _make_request(self, method: str, endpoint: str, params: Optional[Dict] = None) -> Dict[str, Any]:
         """Make a request to the Spotify API.
         
+        Each endpoint has a circuit breaker: after repeated timeouts,
+        network errors or 5xx responses, calls fail fast until a probe
+        succeeds, so an outage does not tie up workers.
+        
         Args:
             method: HTTP method
             endpoint: API endpoint
@@ -31,17 +54,41 @@ class SpotifyService:
             Response data
             
         Raises:
-            HTTPException: If request fails
+            SpotifyUnavailable: If Spotify cannot be reached, times out,
+                fails, rate limits or the endpoint's circuit is open
+            HTTPException: If Spotify rejects the request
         """
         url = f"{self.base_url}/{endpoint}"
         headers = {"Authorization": f"Bearer {self.access_token}"}
+        breaker = get_circuit_breaker(endpoint)
+        try:
+            breaker.allow()
+        except CircuitOpenError as e:
+            raise SpotifyUnavailable(503, "Spotify is unavailable", retry_after=e.retry_after)
 
+        status = "error"
+        start = time.perf_counter()
+        timeout = aiohttp.ClientTimeout(total=settings.SPOTIFY_TIMEOUT, connect=settings.SPOTIFY_CONNECT_TIMEOUT)
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.request(method, url, headers=headers, params=params) as response:
+            async with upstream_session() as session:
+                async with session.request(method, url, headers=headers, params=params, timeout=timeout) as response:
+                    status = response.status
+                    if response.status >= 500:
+                        breaker.record_failure()
+                        logger.error(f"Spotify API error: {response.status}")
+                        raise SpotifyUnavailable(502, "Spotify is unavailable")
+                    breaker.record_success()
                     if response.status == 401:
                         logger.error("Spotify token expired")
                         raise HTTPException(status_code=401, detail="Spotify token expired")
+                    elif response.status == 429:
+                        logger.error("Spotify rate limit reached")
+                        retry_after = response.headers.get("Retry-After")
+                        raise SpotifyUnavailable(
+                            429,
+                            "Spotify rate limit reached",
+                            retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None
+                        )
                     elif response.status != 200:
                         logger.error(f"Spotify API error: {response.status}")
                         error_data = await response.json()
@@ -51,15 +98,40 @@ class SpotifyService:
                         )
                     
                     return await response.json()
+        except HTTPException:
+            raise
+        except asyncio.TimeoutError:
+            breaker.record_failure()
+            logger.error(f"Spotify request timed out after {settings.SPOTIFY_TIMEOUT}s")
+            raise SpotifyUnavailable(504, "Spotify timed out")
         except aiohttp.ClientError as e:
+            breaker.record_failure()
             logger.error(f"Network error in Spotify request: {str(e)}", exc_info=True)
-            raise HTTPException(status_code=503, detail="Unable to reach Spotify")
+            raise SpotifyUnavailable(503, "Unable to reach Spotify")
+        except Exception:
+            breaker.record_failure()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            SPOTIFY_REQUEST_SECONDS.labels(endpoint, status).observe(elapsed)
+            record_span("spotify", elapsed)
 
     async def get_current_user(self) -> Dict[str, Any]:
-        """Get the current user's profile."""
-        try:
+        """Get the current user's profile.
+        
+        Profiles are cached per token for ``settings.USER_PROFILE_CACHE_TTL``
+        seconds, with one worker refreshing them at a time.
+        """
+        key = hashlib.sha256(self.access_token.encode()).hexdigest()[:32]
+
+        async def fetch() -> Dict[str, Any]:
             logger.info("Fetching current user profile")
             return await self._make_request("GET", "me")
+
+        try:
+            return await get_cache().get_or_compute(
+                key, fetch, expire=settings.USER_PROFILE_CACHE_TTL, namespace="profiles"
+            )
         except Exception as e:
             logger.error(f"Error fetching user profile: {str(e)}", exc_info=True)
             raise
@@ -74,17 +146,31 @@ class SpotifyService:
             List of track objects
         """
         try:
-            logger.info(f"Fetching {limit} recently played tracks")
-            data = await self._make_request(
-                "GET",
-                "me/player/recently-played",
-                params={"limit": min(limit, 50)}
-            )
-            return data.get("items", [])
+            return await self.fetch_recently_played(limit)
         except Exception as e:
             logger.error(f"Error fetching recent tracks: {str(e)}", exc_info=True)
             return []
 
+    async def fetch_recently_played(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Get the user's recently played tracks, raising on failure.
+        
+        Args:
+            limit: Number of tracks to return (max 50)
+            
+        Returns:
+            List of play history items, most recent first
+            
+        Raises:
+            HTTPException: If the request fails, e.g. 429 when rate limited
+        """
+        logger.info(f"Fetching {limit} recently played tracks")
+        data = await self._make_request(
+            "GET",
+            "me/player/recently-played",
+            params={"limit": min(limit, 50)}
+        )
+        return data.get("items", [])
+
     async def get_audio_features(self, track_ids: List[str]) -> List[Dict[str, Any]]:
         """Get audio features for tracks.
         
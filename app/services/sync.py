@@ -0,0 +1,431 @@
+"""Scheduled sync of recently played tracks.
+
+The dashboard used to fetch recently played tracks from Spotify on every
+load, so the first view after a gap always paid the round trip. Users who
+visit the dashboard are registered here, and schedulers, in each web
+worker or in a separate ``python -m app.cli sync-worker`` process, fetch
+their recently played tracks periodically: new plays are recorded in the
+play history and mood statistics, and the tracks are cached for the
+dashboard.
+
+The schedule is a Redis sorted set of user IDs scored by when they are
+next due, shared by every scheduler. Schedulers claim the users that are
+due, earliest first, by moving them ``claim_timeout`` into the future in
+one transaction, so each sync runs once however many schedulers there are
+and every user gets one request per turn however much they listen. A user
+whose sync never finishes, e.g. because its worker crashed or shut down,
+is due again when the claim runs out. A user's interval adapts to how often they
+listen, aiming at ``target_plays`` new plays per sync, and is jittered so
+users registered together drift apart. Requests are counted against a
+budget shared through Redis, and every scheduler pauses when Spotify
+answers 429.
+
+Schedule, tokens and budget are only shared between processes through a
+real Redis server. With the in-memory stand-in, allowed in development
+only, each worker syncs its own users against its own budget, so the rate
+limit applies per worker. Users' access and refresh tokens are stored
+encrypted with a key derived from ``SECRET_KEY``.
+"""
+
+import asyncio
+import logging
+import math
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from app.core.auth import TokenCipher, create_spotify_oauth, token_fingerprint
+from app.core.cache import get_cache
+from app.core.config import settings
+from app.core.local_cache import MISS, LocalCache
+from app.core.redis_client import get_redis_client
+from app.services.features import get_feature_store
+from app.services.history import Play, get_play_history, parse_played_at
+from app.services.mood_analyzer import MoodAnalyzer
+from app.services.mood_stats import DAY_SECONDS, get_mood_stats
+from app.services.spotify import SpotifyService
+
+logger = logging.getLogger(__name__)
+
+# Cache namespace of recently played items, keyed by user ID
+RECENTLY_PLAYED_NAMESPACE = "recently-played"
+
+# Spotify returns at most this many recently played items
+RECENTLY_PLAYED_LIMIT = 50
+
+# Access tokens are refreshed this many seconds before they expire
+TOKEN_REFRESH_MARGIN = 60
+
+# Weight of the latest observation in a user's listening rate
+RATE_SMOOTHING = 0.5
+
+
+async def store_recent_plays(
+    spotify: SpotifyService,
+    user_id: str,
+    items: List[Dict[str, Any]],
+    region: Optional[str] = None
+) -> List[Play]:
+    """Record recently played items in the play history, mood statistics and taste centroid.
+
+    Args:
+        spotify: Service used to fetch uncached audio features
+        user_id: Spotify user ID
+        items: Recently played items from Spotify
+        region: User's country, for cohort aggregates
+
+    Returns:
+        List[Play]: Plays that were not recorded before
+    """
+    new_plays = get_play_history().record_recently_played(user_id, items)
+    if new_plays:
+        features = await get_feature_store().get_features(spotify, [track_id for _, track_id in new_plays])
+        get_mood_stats().record_plays(user_id, new_plays, features, MoodAnalyzer(), region)
+        # Imported here so NumPy only loads once plays are recorded
+        from app.services.embeddings import get_taste_centroids
+        get_taste_centroids().record_plays(user_id, new_plays, features)
+        logger.info(f"Recorded {len(new_plays)} new plays")
+    return new_plays
+
+
+class RateBudget:
+    """Requests per time window, shared by every worker through Redis."""
+
+    def __init__(self, redis: Any, key: str, rate: float, window: float = 1.0):
+        """Initialize the budget.
+
+        Args:
+            redis: Redis client
+            key: Key prefix of the window counters
+            rate: Requests per second
+            window: Seconds per counting window
+        """
+        self.redis = redis
+        self.key = key
+        self.window = window
+        self.limit = max(1, round(rate * window))
+        self.pause_key = f"{key}:paused"
+
+    def try_acquire(self, now: Optional[float] = None) -> float:
+        """Take one request from the current window's budget.
+
+        Returns:
+            float: 0 if the request may be made, otherwise seconds to wait
+                before trying again
+        """
+        now = time.time() if now is None else now
+        slot = int(now // self.window)
+        key = f"{self.key}:{slot}"
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(self.pause_key)
+        pipe.incr(key)
+        pipe.expire(key, math.ceil(self.window) + 1)
+        paused_until, used, _ = pipe.execute()
+        if paused_until and float(paused_until) > now:
+            return float(paused_until) - now
+        if used <= self.limit:
+            return 0.0
+        return (slot + 1) * self.window - now
+
+    async def acquire(self) -> None:
+        """Wait until a request may be made."""
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float, now: Optional[float] = None) -> None:
+        """Hold every worker's requests for a while, e.g. after a 429."""
+        until = (time.time() if now is None else now) + seconds
+        self.redis.set(self.pause_key, repr(until), px=int(seconds * 1000))
+
+
+class SyncScheduler:
+    """Periodic sync of active users' recently played tracks."""
+
+    def __init__(
+        self,
+        redis: Any,
+        budget: RateBudget,
+        prefix: str = "sync:",
+        min_interval: float = 300.0,
+        max_interval: float = 3600.0,
+        target_plays: float = 10.0,
+        jitter: float = 0.2,
+        active_days: float = 14.0,
+        concurrency: int = 8,
+        rate_limit_backoff: float = 30.0,
+        cipher: Optional[TokenCipher] = None,
+        claim_timeout: float = 300.0,
+        register_interval: float = 3600.0
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            redis: Redis client with ``decode_responses`` semantics
+            budget: Spotify requests budget shared by every scheduler
+            prefix: Key prefix
+            min_interval: Seconds between syncs of the most active listeners
+            max_interval: Seconds between syncs of users who are not listening
+            target_plays: New plays expected per sync
+            jitter: Intervals are spread by up to this fraction either way
+            active_days: Users are dropped this many days after their last visit
+            concurrency: Users synced at once
+            rate_limit_backoff: Seconds every scheduler pauses after a 429
+            cipher: Cipher of stored tokens, keyed from ``SECRET_KEY`` when None
+            claim_timeout: Seconds before a claimed user whose sync did not
+                finish is due again
+            register_interval: Seconds this scheduler skips registering a
+                user again with an unchanged access token
+        """
+        self.redis = redis
+        self.budget = budget
+        self.prefix = prefix
+        self.due_key = f"{prefix}due"
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_plays = target_plays
+        self.jitter = jitter
+        self.active_seconds = int(active_days * DAY_SECONDS)
+        self.concurrency = concurrency
+        self.rate_limit_backoff = rate_limit_backoff
+        self.cipher = cipher or TokenCipher(settings.SECRET_KEY)
+        self.claim_timeout = claim_timeout
+        # User ID to the fingerprint of the access token last registered
+        self._registered = LocalCache(1024 * 1024, ttl=register_interval, name="sync-registrations")
+        self._stopping = asyncio.Event()
+
+    def _key(self, user_id: str) -> str:
+        return f"{self.prefix}user:{user_id}"
+
+    def register(
+        self,
+        user_id: str,
+        access_token: str,
+        refresh_token: Optional[str] = None,
+        expires_at: Optional[float] = None,
+        now: Optional[float] = None
+    ) -> None:
+        """Mark a user active and keep their tokens for syncing.
+
+        New users are first synced within ``min_interval``, spread at
+        random; users already scheduled keep their place. Stored tokens are
+        only replaced by ones that expire later, since the scheduler
+        refreshes them itself. Tokens are stored encrypted. A user
+        registered by this scheduler within ``register_interval`` with the
+        same access token is skipped without touching Redis.
+
+        Args:
+            user_id: Spotify user ID
+            access_token: Access token from the user's session
+            refresh_token: Refresh token from the user's session
+            expires_at: When the access token expires, in epoch seconds
+        """
+        fingerprint = token_fingerprint(access_token)
+        if self._registered.get(user_id) == fingerprint:
+            return
+        now = time.time() if now is None else now
+        key = self._key(user_id)
+        fields: Dict[str, Any] = {"last_seen": now}
+        stored_expiry = float(self.redis.hgetall(key).get("expires_at") or 0)
+        if expires_at is None or float(expires_at) >= stored_expiry:
+            fields["access_token"] = self.cipher.encrypt(access_token)
+            if refresh_token:
+                fields["refresh_token"] = self.cipher.encrypt(refresh_token)
+            if expires_at is not None:
+                fields["expires_at"] = expires_at
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset(key, mapping=fields)
+        pipe.expire(key, self.active_seconds)
+        pipe.zadd(self.due_key, {user_id: now + random.uniform(0, self.min_interval)}, nx=True)
+        pipe.execute()
+        self._registered.set(user_id, fingerprint, size=len(user_id) + len(fingerprint))
+
+    def unregister(self, user_id: str) -> None:
+        """Stop syncing a user and forget their tokens."""
+        self._registered.delete(user_id)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zrem(self.due_key, user_id)
+        pipe.delete(self._key(user_id))
+        pipe.execute()
+
+    def claim_due(self, limit: int, now: Optional[float] = None) -> List[str]:
+        """Take up to ``limit`` users that are due, earliest first.
+
+        Claimed users are moved ``claim_timeout`` ahead in the schedule, so
+        no other scheduler claims them until their sync reschedules them or
+        the claim runs out.
+        """
+        now = time.time() if now is None else now
+
+        def claim(pipe: Any) -> List[str]:
+            user_ids = pipe.zrangebyscore(self.due_key, "-inf", now, start=0, num=limit)
+            pipe.multi()
+            if user_ids:
+                # XX: users unregistered meanwhile stay out
+                pipe.zadd(self.due_key, {user_id: now + self.claim_timeout for user_id in user_ids}, xx=True)
+            return user_ids
+
+        # Retried when another scheduler changed the schedule in between
+        return self.redis.transaction(claim, self.due_key, value_from_callable=True)
+
+    def next_interval(self, rate: float) -> float:
+        """Return the sync interval, before jitter, of a user listening at ``rate`` plays per second."""
+        if rate <= 0:
+            return self.max_interval
+        return min(self.max_interval, max(self.min_interval, self.target_plays / rate))
+
+    def _schedule(self, user_id: str, interval: float, now: float) -> float:
+        delay = interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+        self.redis.zadd(self.due_key, {user_id: now + delay})
+        return delay
+
+    async def _access_token(self, user_id: str, state: Dict[str, str], now: float) -> Optional[str]:
+        """Return a user's access token, refreshing it when it is about to expire.
+
+        Tokens that cannot be decrypted, e.g. after ``SECRET_KEY`` changed,
+        count as missing.
+        """
+        expires_at = state.get("expires_at")
+        access_token = self.cipher.decrypt(state["access_token"]) if state.get("access_token") else None
+        if access_token and (not expires_at or float(expires_at) - TOKEN_REFRESH_MARGIN > now):
+            return access_token
+        refresh_token = self.cipher.decrypt(state["refresh_token"]) if state.get("refresh_token") else None
+        if not refresh_token:
+            return None
+        try:
+            # spotipy is synchronous
+            token_info = await asyncio.to_thread(create_spotify_oauth().refresh_access_token, refresh_token)
+        except Exception as e:
+            logger.warning(f"Could not refresh the token of user {user_id}: {str(e)}")
+            return None
+        self.redis.hset(self._key(user_id), mapping={
+            "access_token": self.cipher.encrypt(token_info["access_token"]),
+            "refresh_token": self.cipher.encrypt(token_info.get("refresh_token") or refresh_token),
+            "expires_at": token_info["expires_at"],
+        })
+        return token_info["access_token"]
+
+    async def sync_user(self, user_id: str, now: Optional[float] = None) -> Optional[int]:
+        """Sync one claimed user and schedule their next sync.
+
+        Args:
+            user_id: Spotify user ID
+
+        Returns:
+            Optional[int]: Number of new plays, or None if the user was
+                dropped for being inactive or having no usable token
+        """
+        now = time.time() if now is None else now
+        key = self._key(user_id)
+        state = self.redis.hgetall(key)
+        if not state or float(state.get("last_seen") or 0) < now - self.active_seconds:
+            logger.info(f"User {user_id} is no longer active, not syncing")
+            self.unregister(user_id)
+            return None
+        access_token = await self._access_token(user_id, state, now)
+        if access_token is None:
+            logger.info(f"User {user_id} has no usable token, not syncing")
+            self.unregister(user_id)
+            return None
+
+        spotify = SpotifyService(access_token)
+        rate = float(state["rate"]) if state.get("rate") else None
+        region = state.get("country")
+        try:
+            await self.budget.acquire()
+            items = await spotify.fetch_recently_played(RECENTLY_PLAYED_LIMIT)
+            if region is None:
+                await self.budget.acquire()
+                region = (await spotify.get_current_user()).get("country") or ""
+            # Feature lookups for new tracks are mostly cache hits and are not counted
+            new_plays = await store_recent_plays(spotify, user_id, items, region or None)
+        except HTTPException as e:
+            if e.status_code == 429:
+                logger.warning(f"Spotify rate limit reached, pausing syncs for {self.rate_limit_backoff}s")
+                self.budget.pause(self.rate_limit_backoff, now)
+                self._schedule(user_id, self.rate_limit_backoff, now)
+            elif e.status_code == 401:
+                # Refresh the token on the next turn
+                self.redis.hset(key, "expires_at", 0)
+                self._schedule(user_id, self.min_interval, now)
+            else:
+                logger.warning(f"Sync of user {user_id} failed: {e.detail}")
+                self._schedule(user_id, self.next_interval(rate or 0.0), now)
+            return 0
+
+        if state.get("last_sync"):
+            observed = len(new_plays) / max(1.0, now - float(state["last_sync"]))
+        elif items:
+            # First sync: estimate from the span of the plays Spotify returned
+            oldest = parse_played_at(items[-1]["played_at"]) / 1000
+            observed = len(items) / max(self.min_interval, now - oldest)
+        else:
+            observed = 0.0
+        rate = observed if rate is None else RATE_SMOOTHING * observed + (1 - RATE_SMOOTHING) * rate
+        delay = self._schedule(user_id, self.next_interval(rate), now)
+        self.redis.hset(key, mapping={"last_sync": now, "rate": rate, "country": region})
+        # Fresh until the next sync, with room for it to run late
+        await get_cache().set(
+            user_id, items, expire=int(delay + self.min_interval), namespace=RECENTLY_PLAYED_NAMESPACE
+        )
+        return len(new_plays)
+
+    async def run_once(self) -> int:
+        """Sync the users that are due, up to ``concurrency`` of them.
+
+        Returns:
+            int: Number of users claimed
+        """
+        user_ids = self.claim_due(self.concurrency)
+        results = await asyncio.gather(*(self.sync_user(user_id) for user_id in user_ids), return_exceptions=True)
+        for user_id, result in zip(user_ids, results):
+            if isinstance(result, Exception):
+                logger.error(f"Sync of user {user_id} failed: {str(result)}")
+                self._schedule(user_id, self.min_interval, time.time())
+        return len(user_ids)
+
+    async def run(self, poll_interval: float = 1.0) -> None:
+        """Sync due users until ``stop`` is called."""
+        self._stopping.clear()
+        while not self._stopping.is_set():
+            try:
+                if await self.run_once():
+                    continue
+            except Exception as e:
+                logger.error(f"Sync scheduling failed: {str(e)}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self) -> None:
+        """Ask ``run`` to return after the current batch of users."""
+        self._stopping.set()
+
+
+_scheduler: Optional[SyncScheduler] = None
+
+
+def get_sync_scheduler() -> SyncScheduler:
+    """Return the process-wide scheduler, creating it on first use."""
+    global _scheduler
+    if _scheduler is None:
+        redis = get_redis_client()
+        _scheduler = SyncScheduler(
+            redis,
+            RateBudget(redis, "sync:budget", settings.SYNC_RATE_LIMIT),
+            min_interval=settings.SYNC_MIN_INTERVAL,
+            max_interval=settings.SYNC_MAX_INTERVAL,
+            target_plays=settings.SYNC_TARGET_PLAYS,
+            jitter=settings.SYNC_JITTER,
+            active_days=settings.SYNC_ACTIVE_DAYS,
+            concurrency=settings.SYNC_CONCURRENCY,
+            rate_limit_backoff=settings.SYNC_RATE_LIMIT_BACKOFF,
+            claim_timeout=settings.SYNC_CLAIM_TIMEOUT,
+            register_interval=settings.SYNC_REGISTER_INTERVAL
+        )
+    return _scheduler
@@ -0,0 +1,102 @@
+import io
+import json
+
+import pytest
+
+from app.core.local_cache import LocalCache
+from app.core.redis_client import InMemoryRedis
+from app.services.backfill import BackfillCheckpoints, HistoryImporter, iter_json_array
+from app.services.features import FeatureStore
+from app.services.history import PlayHistoryStore
+
+def record(i, **overrides):
+    return {
+        "ts": f"2021-03-01T12:{i // 60:02d}:{i % 60:02d}Z",
+        "username": "user",
+        "ms_played": 200000,
+        "spotify_track_uri": f"spotify:track:track{i % 7}",
+        **overrides,
+    }
+
+@pytest.fixture
+def redis():
+    return InMemoryRedis()
+
+def make_importer(redis, **kwargs):
+    features = FeatureStore(redis, ttl=60, local=LocalCache(1024 * 1024, ttl=60))
+    return HistoryImporter(PlayHistoryStore(redis), BackfillCheckpoints(redis), batch_size=10, features=features, **kwargs)
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 65536])
+def test_iter_json_array_streams_elements(chunk_size):
+    values = [{"a": [1, 2, {"b": "]"}]}, 12345, "x, y", [], None]
+    text = " [\n" + ",\n ".join(json.dumps(v) for v in values) + "\n] "
+    assert list(iter_json_array(io.StringIO(text), chunk_size)) == values
+    assert list(iter_json_array(io.StringIO("[]"), chunk_size)) == []
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO('[{"a": 1}'), chunk_size))
+
+@pytest.mark.asyncio
+async def test_import_skips_short_plays_and_dedupes(redis, tmp_path):
+    records = [record(i) for i in range(25)]
+    records += [record(30, ms_played=1000), record(31, spotify_track_uri=None, episode_name="Podcast")]
+    path = tmp_path / "Streaming_History_Audio_2021.json"
+    path.write_text(json.dumps(records))
+
+    result = await make_importer(redis).import_file(path)
+    assert (result.records, result.new_plays, result.skipped) == (27, 25, 2)
+    assert PlayHistoryStore(redis).count("user") == 25
+
+    # A finished file is skipped; a reset checkpoint re-reads it without duplicates
+    assert (await make_importer(redis).import_file(path)).new_plays == 0
+    redis.delete("backfill:" + BackfillCheckpoints.file_key(path))
+    result = await make_importer(redis).import_file(path)
+    assert (result.new_plays, result.duplicates) == (0, 25)
+
+@pytest.mark.asyncio
+async def test_import_skips_plays_already_recorded_from_the_api(redis, tmp_path):
+    # Recently-played times have milliseconds, extended history only seconds
+    items = [{"played_at": "2021-03-01T12:00:05.789Z", "track": {"id": "track5"}}]
+    assert len(PlayHistoryStore(redis).record_recently_played("user", items)) == 1
+    path = tmp_path / "history.json"
+    path.write_text(json.dumps([record(i) for i in range(10)]))
+    result = await make_importer(redis).import_file(path)
+    assert (result.new_plays, result.duplicates) == (9, 1)
+    assert PlayHistoryStore(redis).count("user") == 10
+
+@pytest.mark.asyncio
+async def test_import_resumes_from_checkpoint(redis, tmp_path):
+    path = tmp_path / "history.json"
+    path.write_text(json.dumps([record(i) for i in range(25)]))
+    BackfillCheckpoints(redis).save(BackfillCheckpoints.file_key(path), 20)
+    result = await make_importer(redis, user_id="other").import_file(path)
+    assert (result.resumed_from, result.plays) == (20, 5)
+    assert PlayHistoryStore(redis).users() == ["other"]
+
+class Recorder:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.plays = []
+
+    def record_plays(self, user_id, plays, features, analyzer=None, region=None):
+        if self.fail:
+            raise RuntimeError("Interrupted")
+        self.plays += [(user_id, region, play) for play in plays]
+
+@pytest.mark.asyncio
+async def test_resumed_import_scores_plays_inserted_before_an_interruption(redis, tmp_path):
+    for i in range(7):
+        redis.set(f"features:track{i}", json.dumps({"id": f"track{i}", "valence": 0.5, "energy": 0.5}))
+    # Two users with the same plays in different countries
+    records = [record(i // 2, username="ab"[i % 2], conn_country=["SE", "NO"][i % 2]) for i in range(10)]
+    path = tmp_path / "history.json"
+    path.write_text(json.dumps(records))
+
+    with pytest.raises(RuntimeError):
+        await make_importer(redis, mood_stats=Recorder(), taste=Recorder(fail=True)).import_file(path)
+    assert PlayHistoryStore(redis).count("a") == 5
+
+    stats, taste = Recorder(), Recorder()
+    result = await make_importer(redis, mood_stats=stats, taste=taste).import_file(path)
+    assert result.new_plays == 0
+    assert sorted({(user_id, region) for user_id, region, _ in stats.plays}) == [("a", "SE"), ("b", "NO")]
+    assert len(stats.plays) == len(taste.plays) == 10
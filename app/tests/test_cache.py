@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.cache import TieredCache, jittered_ttl
+from app.core.local_cache import LocalCache
+from app.core.redis_client import InMemoryRedis
+
+@pytest.fixture
+def cache():
+    cache = TieredCache(LocalCache(1024 * 1024, ttl=60, negative_ttl=60), codec="json")
+    cache.redis = InMemoryRedis()
+    return cache
+
+@pytest.mark.asyncio
+async def test_get_or_compute_computes_cold_key_once(cache):
+    calls = 0
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"id": "user"}
+    results = await asyncio.gather(*(cache.get_or_compute("profile", compute, expire=60) for _ in range(20)))
+    assert calls == 1
+    assert all(result == {"id": "user"} for result in results)
+    assert cache.redis.get(cache.resolve("profile") + ":lock") is None
+
+@pytest.mark.asyncio
+async def test_get_or_compute_recomputes_before_expiry(cache):
+    await cache.set("profile", {"v": "old", "d": 3600.0, "e": time.time() + 1}, 60)
+    async def compute():
+        return "new"
+    assert await cache.get_or_compute("profile", compute, expire=60) == "new"
+    assert await cache.get_or_compute("profile", compute, expire=60, beta=0) == "new"
+
+@pytest.mark.asyncio
+async def test_get_or_compute_serves_stale_value_while_locked(cache):
+    await cache.set("profile", {"v": "old", "d": 3600.0, "e": time.time() + 1}, 60)
+    cache.redis.set(cache.resolve("profile") + ":lock", "other", nx=True, px=3000)
+    async def compute():
+        return "new"
+    assert await cache.get_or_compute("profile", compute, expire=60) == "old"
+
+def test_jittered_ttl_stays_within_bounds():
+    ttls = {jittered_ttl(100, 0.1) for _ in range(1000)}
+    assert min(ttls) >= 90 and max(ttls) <= 110
+    assert len(ttls) > 1
+    assert jittered_ttl(100, 0) == 100
@@ -0,0 +1,52 @@
+import socket
+
+import pytest
+
+from app.core import circuit_breaker
+from app.core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from app.services.spotify import SpotifyService, SpotifyUnavailable
+
+def test_breaker_opens_probes_and_closes():
+    breaker = CircuitBreaker("me", failure_threshold=3, recovery_timeout=30)
+    for _ in range(2):
+        breaker.allow(now=0)
+        breaker.record_failure(now=0)
+    breaker.allow(now=0)
+    breaker.record_success()
+    for _ in range(3):
+        breaker.allow(now=1)
+        breaker.record_failure(now=1)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as exc_info:
+        breaker.allow(now=11)
+    assert exc_info.value.retry_after == pytest.approx(20)
+
+    # One probe at a time once the recovery timeout has passed
+    breaker.allow(now=31)
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow(now=31)
+    breaker.record_failure(now=32)
+    assert breaker.state == OPEN
+    breaker.allow(now=62)
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.allow(now=62)
+
+@pytest.mark.asyncio
+async def test_unreachable_spotify_fails_fast_once_open(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "_breakers", {})
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    spotify = SpotifyService("token", base_url=f"http://127.0.0.1:{port}")
+    for _ in range(5):
+        with pytest.raises(SpotifyUnavailable) as exc_info:
+            await spotify.fetch_recently_played()
+        assert exc_info.value.status_code == 503
+    assert circuit_breaker.get_circuit_breaker("me/player/recently-played").state == OPEN
+    with pytest.raises(SpotifyUnavailable) as exc_info:
+        await spotify.fetch_recently_played()
+    assert int(exc_info.value.headers["Retry-After"]) > 0
+    # Other endpoints have their own breakers
+    assert circuit_breaker.get_circuit_breaker("me").state == CLOSED
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from app.core.concurrency import AIMDLimiter, ConcurrencyLimitMiddleware
+
+def test_limit_grows_when_used_and_backs_off_on_slow_requests():
+    limiter = AIMDLimiter("test", initial_limit=4, min_limit=2, max_limit=6, latency_target=1.0)
+    assert all(limiter.try_acquire() for _ in range(4))
+    assert not limiter.try_acquire()
+    for _ in range(4):
+        limiter.release(0.1, now=0)
+    assert limiter.limit == 6
+    # Several slow requests at once shrink the limit once per target interval
+    for _ in range(3):
+        assert limiter.try_acquire()
+    for _ in range(3):
+        limiter.release(5.0, now=10)
+    assert limiter.limit == pytest.approx(5.4)
+    for i in range(20):
+        limiter.try_acquire()
+        limiter.release(5.0, now=11 + i)
+    assert limiter.limit == 2
+
+@pytest.mark.asyncio
+async def test_saturated_routes_are_shed_but_priority_lane_is_not():
+    release = asyncio.Event()
+
+    async def app(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    middleware = ConcurrencyLimitMiddleware(
+        app,
+        limits={"dashboard": 1, "default": 10},
+        routes={"/dashboard": "dashboard"},
+        priority_paths=["/health", "/static/*"],
+        initial_limit=1,
+        retry_after=2
+    )
+
+    async def request(path):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await middleware({"type": "http", "path": path}, None, send)
+        return messages[0]
+
+    first = asyncio.create_task(request("/dashboard"))
+    await asyncio.sleep(0)
+    shed = await request("/dashboard")
+    assert shed["status"] == 503
+    assert (b"retry-after", b"2") in shed["headers"]
+    assert middleware.limiter_for("/static/app.css") is None
+    assert middleware.limiter_for("/other").name == "default"
+    health = asyncio.create_task(request("/health"))
+    release.set()
+    assert (await health)["status"] == 200
+    assert (await first)["status"] == 200
+    assert middleware.limiters["dashboard"].inflight == 0
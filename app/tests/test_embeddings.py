@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from app.core.redis_client import InMemoryRedis
+from app.services.embeddings import EMBEDDING_DIM, EmbeddingIndex, TasteCentroids, embed_features
+
+def features(valence, energy, tempo=120.0, mode=1):
+    return {"valence": valence, "energy": energy, "danceability": energy, "instrumentalness": 0.1, "tempo": tempo, "mode": mode}
+
+@pytest.fixture
+def index():
+    rng = np.random.default_rng(0)
+    index = EmbeddingIndex(capacity=2)
+    index.add_features(
+        (f"t{i}", features(*rng.random(2), tempo=60 + 120 * rng.random(), mode=int(rng.random() < 0.5)))
+        for i in range(500)
+    )
+    return index
+
+def test_embeddings_are_unit_vectors_with_opposite_moods_apart():
+    vectors = embed_features([features(0.9, 0.9), features(0.85, 0.9), features(0.1, 0.1, mode=0), {"valence": 0.5}])
+    assert vectors.shape == (4, EMBEDDING_DIM) and vectors.dtype == np.float32
+    assert np.linalg.norm(vectors[:3], axis=1) == pytest.approx(1.0, abs=1e-6)
+    assert not vectors[3].any()
+    assert vectors[0] @ vectors[1] > 0.99
+    assert vectors[0] @ vectors[2] < -0.5
+
+def test_blocked_batch_queries_match_brute_force(index):
+    assert len(index) == 500 and index.matrix.flags.c_contiguous
+    queries = index.vectors(["t1", "t2", "missing"])
+    results = index.similar(queries, k=5, exclude=["t1"], block_rows=64)
+    scores = index.matrix @ queries[:2].T
+    scores[index.rows["t1"]] = -np.inf
+    for query, result in enumerate(results[:2]):
+        expected = np.argsort(-scores[:, query])[:5]
+        assert [track_id for track_id, _ in result] == [index.ids[row] for row in expected]
+    assert results[1][0] == ("t2", pytest.approx(1.0))
+    assert "t1" not in [track_id for track_id, _ in index.similar_to_tracks(["t1", "t3"], k=10)]
+
+def test_taste_centroid_updates_incrementally():
+    centroids = TasteCentroids(InMemoryRedis())
+    catalog = {"happy": features(0.9, 0.9), "sad": features(0.1, 0.1, mode=0)}
+    assert centroids.get("user") is None
+    assert centroids.record_plays("user", [(1, "happy"), (2, "happy"), (3, "unknown")], catalog) == 2
+    assert centroids.get("user") @ embed_features([catalog["happy"]])[0] == pytest.approx(1.0, abs=1e-5)
+    centroids.record_plays("user", [(4, "sad")] * 3, catalog)
+    assert centroids.plays("user") == 5
+    # Mostly sad now, so closer to sad than to happy
+    taste = centroids.get("user")
+    happy, sad = embed_features([catalog["happy"], catalog["sad"]])
+    assert taste @ sad > taste @ happy
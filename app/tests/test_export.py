@@ -0,0 +1,55 @@
+import io
+import json
+
+import pytest
+
+from app.core.local_cache import LocalCache
+from app.core.redis_client import InMemoryRedis
+from app.services.features import FeatureStore
+from app.services.history import PlayHistoryStore, parse_played_at
+
+pa = pytest.importorskip("pyarrow")
+from app.services.export import PlayExporter  # noqa: E402
+
+@pytest.fixture
+def redis():
+    return InMemoryRedis()
+
+@pytest.fixture
+def history(redis):
+    return PlayHistoryStore(redis)
+
+def test_plays_are_deduplicated_and_paged_in_time_order(history):
+    plays = [(1000 + i // 4, f"track-{i}") for i in range(50)]
+    assert history.add_plays("user", plays) == 50
+    assert history.add_plays("user", plays[:10]) == 0
+    chunks = list(history.iter_plays("user", chunk_size=7))
+    assert [len(chunk) for chunk in chunks] == [7] * 7 + [1]
+    assert sorted(play for chunk in chunks for play in chunk) == sorted(plays)
+    assert [play[0] for chunk in chunks for play in chunk] == sorted(p[0] for p in plays)
+
+def test_records_recently_played_items(history):
+    items = [{"track": {"id": "track-a"}, "played_at": "2024-01-01T00:00:00.500Z"}]
+    assert len(history.record_recently_played("user", items)) == 1
+    assert history.users() == ["user"]
+    assert list(history.iter_plays("user")) == [[(parse_played_at("2024-01-01T00:00:00.500Z"), "track-a")]]
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_export_streams_one_chunk_per_batch(redis, history, fmt):
+    history.add_plays("user", [(1000 + i, "track-a" if i % 2 else "track-b") for i in range(25)])
+    redis.set("features:track-a", json.dumps({
+        "valence": 1.0, "energy": 0.0, "danceability": 0.0, "instrumentalness": 0.0, "tempo": 120.0, "mode": 1
+    }))
+    exporter = PlayExporter(history, FeatureStore(redis, ttl=60, local=LocalCache(1024 * 1024, ttl=60)), chunk_size=10)
+    chunks = list(exporter.iter_bytes(["user"], fmt))
+    assert len(chunks) >= 3
+    data = b"".join(chunks)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        table = pq.read_table(io.BytesIO(data))
+    else:
+        table = pa.ipc.open_stream(data).read_all()
+    assert table.num_rows == 25
+    scores = dict(zip(table.column("track_id").to_pylist(), table.column("mood_score").to_pylist()))
+    assert scores["track-a"] == pytest.approx(0.6)
+    assert scores["track-b"] is None
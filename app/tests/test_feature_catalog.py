@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from app.core.local_cache import LocalCache
+from app.core.redis_client import InMemoryRedis
+from app.schemas.mood import AudioFeatures
+from app.services.feature_catalog import CatalogError, FeatureCatalog, FeatureCatalogBuilder
+from app.services.features import FeatureStore
+from app.services.mood_analyzer import MoodAnalyzer
+
+def features(valence, mode=1):
+    return {"valence": valence, "energy": 0.5, "danceability": 0.5, "instrumentalness": 0.0, "tempo": 120.0, "mode": mode}
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    builder = FeatureCatalogBuilder()
+    builder.add("track-b", features(0.25, mode=0))
+    builder.add("track-a", features(0.75))
+    assert not builder.add("x" * 23, features(0.5))
+    builder.write(tmp_path / "features.catalog")
+    return tmp_path / "features.catalog"
+
+def test_ids_no_catalog_holds_are_not_found(tmp_path):
+    track_id = "4uLU6hMCjMI75M1A2tKUQC"
+    builder = FeatureCatalogBuilder()
+    builder.add(track_id, features(0.5))
+    builder.write(tmp_path / "features.catalog")
+    with FeatureCatalog(tmp_path / "features.catalog") as catalog:
+        # Longer IDs used to be truncated to a cataloged one; non-ASCII ones raised
+        assert catalog.indices([track_id, track_id + "x", "spotify:local:Ärtist", ""]).tolist() == [0, -1, -1, -1]
+        assert catalog.indices(np.array([track_id.encode(), track_id.encode() + b"x"])).tolist() == [0, -1]
+
+def test_catalog_lookups(catalog_path):
+    with FeatureCatalog(catalog_path) as catalog:
+        assert len(catalog) == 2
+        assert catalog.indices(["track-b", "missing", "track-a", "zzz"]).tolist() == [1, -1, 0, -1]
+        assert catalog.get("track-a") == {"id": "track-a", **features(0.75)}
+        assert catalog.get("missing") is None
+
+def test_builder_appends_to_existing_catalog(catalog_path):
+    builder = FeatureCatalogBuilder()
+    with FeatureCatalog(catalog_path) as catalog:
+        builder.add_catalog(catalog)
+    builder.add("track-a", features(0.5))
+    builder.add("track-c", features(0.5))
+    builder.write(catalog_path)
+    with FeatureCatalog(catalog_path) as catalog:
+        assert [catalog.get(t)["valence"] for t in ("track-a", "track-b", "track-c")] == [0.5, 0.25, 0.5]
+
+def test_rejects_other_files(tmp_path):
+    (tmp_path / "bad").write_bytes(b"not a catalog" * 10)
+    with pytest.raises(CatalogError):
+        FeatureCatalog(tmp_path / "bad")
+
+def test_analyze_plays_matches_scalar_scoring(catalog_path):
+    analyzer = MoodAnalyzer()
+    with FeatureCatalog(catalog_path) as catalog:
+        summary = analyzer.analyze_plays(catalog, ["track-a", "track-a", "track-b", "missing"])
+    expected = [analyzer._compute_mood_score(AudioFeatures(**features(v, m))) for v, m in ((0.75, 1), (0.75, 1), (0.25, 0))]
+    assert summary["plays"] == 4 and summary["scored"] == 3
+    assert summary["overall_mood"] == pytest.approx(sum(expected) / 3, abs=1e-6)
+
+def test_feature_store_falls_back_to_catalog(catalog_path):
+    redis = InMemoryRedis()
+    redis.set("features:track-c", '{"id": "track-c", "valence": 0.1}')
+    with FeatureCatalog(catalog_path) as catalog:
+        store = FeatureStore(redis, ttl=60, local=LocalCache(1024 * 1024, ttl=60), catalog=catalog)
+        assert store.get_cached(["track-a", "track-c"])["track-a"]["valence"] == 0.75
+        assert dict(store.iter_cached()) == {"track-c": {"id": "track-c", "valence": 0.1}}
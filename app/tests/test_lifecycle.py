@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from app.core.lifecycle import BackgroundTasks
+from app.core.redis_client import InMemoryRedis
+from app.services.features import FeatureStore
+
+class FakeSpotify:
+    def __init__(self):
+        self.requests = []
+
+    async def get_audio_features(self, track_ids):
+        self.requests.append(list(track_ids))
+        return [{"id": track_id, "valence": 0.5} for track_id in track_ids]
+
+@pytest.mark.asyncio
+async def test_drain_waits_for_tasks_and_cancels_stragglers():
+    tasks = BackgroundTasks()
+    finished = []
+
+    async def job(delay):
+        await asyncio.sleep(delay)
+        finished.append(delay)
+
+    tasks.spawn(job(0.01))
+    tasks.spawn(job(10))
+    assert await tasks.drain(timeout=0.2) == 1
+    assert finished == [0.01]
+    assert tasks.spawn(job(0)) is None
+
+@pytest.mark.asyncio
+async def test_feature_store_batches_misses_and_warms_hot_tracks():
+    redis = InMemoryRedis()
+    spotify = FakeSpotify()
+    store = FeatureStore(redis, ttl=60)
+    ids = [f"t{i}" for i in range(150)]
+
+    features = await store.get_features(spotify, ids)
+    assert len(features) == 150
+    assert [len(batch) for batch in spotify.requests] == [100, 50]
+    await store.get_features(spotify, ["t1"])
+    assert len(spotify.requests) == 2
+    store.flush_hot()
+
+    fresh = FeatureStore(redis, ttl=60)
+    assert fresh.warm(limit=10) == 10
+    assert "t1" in fresh.get_cached(["t1"])
+    assert redis.zrevrange(store.hot_key, 0, 0) == ["t1"]
+
+@pytest.mark.asyncio
+async def test_feature_lookups_reach_the_hot_ranking_only_when_flushed():
+    redis = InMemoryRedis()
+    store = FeatureStore(redis, ttl=60, max_hot_tracks=2)
+
+    await store.get_features(FakeSpotify(), ["a", "b", "c"])
+    await store.get_features(FakeSpotify(), ["a", "b"])
+    await store.get_features(FakeSpotify(), ["a"])
+    assert redis.zrevrange(store.hot_key, 0, -1) == []
+
+    assert store.flush_hot() == 3
+    assert redis.zrevrange(store.hot_key, 0, -1, withscores=True) == [("a", 3.0), ("b", 2.0), ("c", 1.0)]
+    assert store.flush_hot(trim=True) == 0
+    assert redis.zrevrange(store.hot_key, 0, -1) == ["a", "b"]
@@ -0,0 +1,52 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.core.redis_client import InMemoryRedis
+from app.services.features import FeatureStore
+from app.services.history import PlayHistoryStore
+from app.services.listening_sessions import ListeningSessionStore, segment_plays
+
+MINUTE = 60 * 1000
+
+def track(valence):
+    return {"valence": valence, "energy": valence, "danceability": valence, "mode": 1}
+
+@pytest.fixture
+def store():
+    redis = InMemoryRedis()
+    for name, valence in (("happy", 0.9), ("sad", 0.1)):
+        redis.set(f"features:{name}", json.dumps(track(valence)))
+    return ListeningSessionStore(redis, PlayHistoryStore(redis), FeatureStore(redis, ttl=60), gap=30 * 60)
+
+def test_sessions_split_at_gaps_and_mood_shifts():
+    played_at = np.array([0, 3, 6, 9, 12, 15, 18, 21, 100, 103, 106]) * MINUTE
+    scores = np.array([0.8, 0.82, 0.79, 0.81, 0.3, 0.28, 0.31, 0.3, 0.5, np.nan, 0.55])
+    first, second = segment_plays(played_at, scores, gap_ms=30 * MINUTE)
+    assert (first["plays"], second["plays"]) == (8, 3)
+    assert [segment["start"] for segment in first["segments"]] == [0, 12 * MINUTE]
+    assert [segment["mood"] for segment in first["segments"]] == [pytest.approx(0.805), pytest.approx(0.2975)]
+    # Unscored plays count as plays but not towards the mood
+    assert second["scored"] == 2 and second["mood"] == pytest.approx(0.525)
+    assert len(second["segments"]) == 1
+    assert segment_plays([], [], gap_ms=MINUTE) == []
+
+def test_only_the_open_session_is_recomputed(store, monkeypatch):
+    store.history.add_plays("user", [(i * MINUTE, "happy") for i in range(5)])
+    store.history.add_plays("user", [(600 * MINUTE + i * MINUTE, "sad") for i in range(3)])
+    sessions = store.get("user")
+    assert [session["plays"] for session in sessions] == [3, 2 + 3]
+    store.history.add_plays("user", [(610 * MINUTE, "happy"), (615 * MINUTE, "happy")])
+    segmented = []
+    segment = store.segment
+    monkeypatch.setattr(store, "segment", lambda plays: segmented.append(len(plays)) or segment(plays))
+    newest, oldest = store.get("user")
+    assert segmented == [5]
+    assert (newest["plays"], oldest["plays"]) == (5, 5)
+    assert store.get("user", limit=1) == [newest] and segmented == [5]
+
+    # Plays imported before the open session rebuild the cache
+    store.history.add_plays("user", [(300 * MINUTE, "sad")])
+    assert len(store.get("user")) == 3
+    assert segmented == [5, 11]
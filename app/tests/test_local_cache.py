@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+from app.core.cache import CacheSweeper, TieredCache
+from app.core.local_cache import ENTRY_OVERHEAD, MISS, LocalCache
+from app.core.redis_client import InMemoryRedis
+
+@pytest.fixture
+def redis():
+    return InMemoryRedis()
+
+def make_tiered(redis):
+    cache = TieredCache(LocalCache(1024 * 1024, ttl=60, negative_ttl=60), codec="json")
+    cache.redis = redis
+    return cache
+
+def test_evicts_least_recently_used_by_size():
+    cache = LocalCache(3 * (ENTRY_OVERHEAD + 100), ttl=60)
+    for key in "abc":
+        cache.set(key, key, size=100)
+    cache.get("a")
+    cache.set("d", "d", size=100)
+    assert cache.get("b") is MISS
+    assert [cache.get(key) for key in "acd"] == ["a", "c", "d"]
+    assert cache.stats()["evictions"] == 1
+
+def test_entries_expire():
+    cache = LocalCache(1024, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is MISS
+
+@pytest.mark.asyncio
+async def test_tiered_cache_negative_caches_missing_keys(redis):
+    cache = make_tiered(redis)
+    assert await cache.get("missing") is None
+    redis.set("missing", '"now present"')
+    assert await cache.get("missing") is None
+    assert cache.local.stats()["negative_hits"] == 1
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_other_workers(redis):
+    first, second = make_tiered(redis), make_tiered(redis)
+    second.start_listener()
+    try:
+        await first.set("profile", {"name": "old"})
+        assert await second.get("profile") == {"name": "old"}
+        await first.set("profile", {"name": "new"})
+        for _ in range(100):
+            if second.local.get(second.resolve("profile")) is MISS:
+                break
+            time.sleep(0.01)
+        assert await second.get("profile") == {"name": "new"}
+    finally:
+        second.stop_listener()
+
+@pytest.mark.asyncio
+async def test_namespace_invalidation_and_sweep(redis):
+    cache = make_tiered(redis)
+    redis.set("session:abc", "{}")
+    await cache.set("profile", 1, namespace="user:a")
+    await cache.set("profile", 2, namespace="user:b")
+
+    assert await cache.invalidate_namespace("user:a")
+    assert await cache.get("profile", namespace="user:a") is None
+    assert await cache.get("profile", namespace="user:b") == 2
+
+    sweeper = CacheSweeper(redis, cache.sweep_key, batch_size=1, pause=0)
+    assert await sweeper.sweep_once() == 1
+    assert await sweeper.sweep_once() is None
+
+    assert await cache.clear()
+    assert await cache.get("profile", namespace="user:b") is None
+    assert await sweeper.sweep_once() == 1
+    assert redis.get("session:abc") == "{}"
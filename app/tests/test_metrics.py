@@ -0,0 +1,42 @@
+from app.core.metrics import Counter, Histogram, Registry, batch_size_label
+
+def test_counter_labels_are_cached_and_rendered():
+    counter = Counter("cache_requests_total", "Cache lookups", ("result",))
+    hit = counter.labels("hit")
+    hit.inc()
+    counter.labels("hit").inc(2)
+    counter.labels("miss").inc()
+
+    assert counter.labels("hit") is hit
+    lines = counter.render()
+    assert 'cache_requests_total{result="hit"} 3' in lines
+    assert 'cache_requests_total{result="miss"} 1' in lines
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency", ("endpoint",), buckets=(0.1, 1.0))
+    child = histogram.labels("me")
+    for value in (0.05, 0.1, 0.5, 2.0):
+        child.observe(value)
+
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{endpoint="me",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{endpoint="me",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{endpoint="me",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{endpoint="me"} 4' in lines
+    assert 'latency_seconds_sum{endpoint="me"} 2.65' in lines
+
+def test_registry_renders_all_metrics():
+    registry = Registry()
+    registry.counter("a_total", "A").inc()
+    with registry.histogram("b_seconds", "B").time():
+        pass
+
+    text = registry.render()
+    assert "# TYPE a_total counter" in text
+    assert "a_total 1" in text
+    assert "b_seconds_count 1" in text
+
+def test_batch_size_label():
+    assert batch_size_label(5) == "1-10"
+    assert batch_size_label(500) == "101-1000"
+    assert batch_size_label(1_000_000) == "10001+"
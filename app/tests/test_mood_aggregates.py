@@ -0,0 +1,61 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.core.redis_client import InMemoryRedis
+from app.services.mood_aggregates import GLOBAL_COHORT, MoodAggregate, MoodAggregates, region_cohort
+
+DAY = datetime(2024, 1, 10, tzinfo=timezone.utc)
+
+def at(hour: int) -> int:
+    return int(DAY.timestamp() * 1000) + hour * 3600 * 1000
+
+@pytest.fixture
+def aggregates():
+    return MoodAggregates(InMemoryRedis(), min_users=1)
+
+def test_partial_aggregates_merge_across_writers(aggregates):
+    # Two workers rolling up the same hour add to the same hash
+    aggregates.record([(at(1), 1.0, 0.8), (at(1), 0.0, 0.2)], region="se", user_id="a")
+    aggregates.record([(at(1), 0.5, 0.5)], region="US", user_id="b")
+    aggregates.record([(at(30), 0.25, 0.5)], user_id="c")
+    series = aggregates.series(GLOBAL_COHORT, "hour", DAY, datetime(2024, 1, 10, 2, tzinfo=timezone.utc))
+    assert [bucket["plays"] for bucket in series["buckets"]] == [0, 3, 0]
+    assert series["total"]["overall_mood"] == pytest.approx(0.5)
+    assert series["total"]["average_energy"] == pytest.approx(0.5)
+    days = aggregates.series(GLOBAL_COHORT, "day", DAY, datetime(2024, 1, 11, tzinfo=timezone.utc))
+    assert [bucket["plays"] for bucket in days["buckets"]] == [3, 1]
+    sweden = aggregates.series(region_cohort("SE"), "day", DAY, DAY)["total"]
+    assert sweden["plays"] == 2
+    assert sweden["mood_volatility"] == pytest.approx(0.5)
+    assert aggregates.regions() == ["SE", "US"]
+    assert set(aggregates.by_region(DAY, DAY)) == {"SE", "US"}
+    with pytest.raises(ValueError):
+        aggregates.series(GLOBAL_COHORT, "week", DAY, DAY)
+
+def test_aggregates_of_few_users_are_suppressed():
+    aggregates = MoodAggregates(InMemoryRedis(), min_users=3)
+    for user_id in ("a", "b", "c"):
+        aggregates.record([(at(1), 0.5, 0.5), (at(2), 0.5, 0.5)], region="SE", user_id=user_id)
+    aggregates.record([(at(5), 0.9, 0.9)], region="SE", user_id="a")
+    aggregates.record([(at(3), 0.9, 0.9)], region="NO", user_id="d")
+    aggregates.record([(at(1), 0.1, 0.1)], region="NO")
+    series = aggregates.series(region_cohort("SE"), "hour", DAY, datetime(2024, 1, 10, 5, tzinfo=timezone.utc))
+    assert [bucket.get("users") for bucket in series["buckets"]] == [0, 3, 3, 0, 0, None]
+    assert series["buckets"][0]["plays"] == 0
+    # One person's hour of listening
+    assert series["buckets"][5] == {"bucket": "2024-01-10T05", "suppressed": True}
+    assert series["total"]["users"] == 3 and series["total"]["plays"] == 7
+    # Plays without a user never count towards the threshold
+    assert aggregates.series(region_cohort("NO"), "day", DAY, DAY)["total"] == {"suppressed": True}
+    assert list(aggregates.by_region(DAY, DAY)) == ["SE"]
+
+def test_aggregate_survives_hash_round_trip():
+    aggregate = MoodAggregate()
+    for mood in (0.1, 0.4, 0.9):
+        aggregate.update(mood, 0.5)
+    fields = {name: str(value) for name, value in aggregate.increments().items()}
+    restored = MoodAggregate.from_hash(fields)
+    assert restored.count == 3
+    assert restored.summary()["mood_percentiles"] == aggregate.summary()["mood_percentiles"]
+    assert restored.summary()["overall_mood"] == pytest.approx(aggregate.summary()["overall_mood"])
@@ -0,0 +1,82 @@
+import random
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pytest
+
+from app.core.redis_client import InMemoryRedis
+from app.services.mood_analyzer import MoodAnalyzer
+from app.services.mood_stats import DAY_SECONDS, DecayedMean, MoodStatsStore, QuantileSketch, RunningStats
+
+@pytest.fixture
+def values():
+    rng = random.Random(0)
+    return [rng.random() for _ in range(1000)]
+
+def test_running_stats_merge_matches_single_pass(values):
+    whole, left, right = RunningStats(), RunningStats(), RunningStats()
+    for i, value in enumerate(values):
+        whole.update(value)
+        (left if i % 3 else right).update(value)
+    merged = RunningStats.from_dict(left.to_dict()).merge(right)
+    for stats in (whole, merged):
+        assert stats.count == 1000
+        assert stats.mean == pytest.approx(statistics.fmean(values))
+        assert stats.stdev == pytest.approx(statistics.pstdev(values))
+        assert (stats.min, stats.max) == (min(values), max(values))
+
+def test_decayed_mean_ignores_arrival_order():
+    in_order, shuffled = DecayedMean(DAY_SECONDS), DecayedMean(DAY_SECONDS)
+    samples = [(float(i % 2), i * 3600.0) for i in range(48)]
+    for value, timestamp in samples:
+        in_order.update(value, timestamp)
+    for value, timestamp in reversed(samples):
+        shuffled.update(value, timestamp)
+    assert shuffled.value == pytest.approx(in_order.value)
+    halves = DecayedMean(DAY_SECONDS), DecayedMean(DAY_SECONDS)
+    for i, (value, timestamp) in enumerate(samples):
+        halves[i % 2].update(value, timestamp)
+    assert halves[1].merge(halves[0]).value == pytest.approx(in_order.value)
+    # Recent values dominate: the last day is all 1s after a day of 0s
+    recent = DecayedMean(DAY_SECONDS)
+    for hour in range(48):
+        recent.update(0.0 if hour < 24 else 1.0, hour * 3600.0)
+    assert 0.7 < recent.value < 0.75
+
+def test_quantile_sketch_error_is_bounded_by_bin_width(values):
+    sketch, other = QuantileSketch(), QuantileSketch()
+    for i, value in enumerate(values):
+        (sketch if i % 2 else other).update(value)
+    sketch.merge(other)
+    ordered = sorted(values)
+    for q in (0.1, 0.5, 0.9):
+        assert sketch.quantile(q) == pytest.approx(ordered[int(q * len(values))], abs=0.01)
+    with pytest.raises(ValueError):
+        sketch.merge(QuantileSketch(bins=10))
+
+def test_store_keeps_all_time_and_daily_buckets():
+    store = MoodStatsStore(InMemoryRedis())
+    day = int(datetime(2024, 1, 10, tzinfo=timezone.utc).timestamp() * 1000)
+    features = {
+        "happy": {"valence": 1.0, "energy": 1.0, "danceability": 1.0, "mode": 1},
+        "sad": {"valence": 0.0, "energy": 0.0, "danceability": 0.0, "mode": 0},
+    }
+    plays = [(day + i * 3600 * 1000, "happy" if i < 24 else "sad") for i in range(48)] + [(day, "unknown")]
+    assert store.record_plays("user", plays[:30], features, MoodAnalyzer()) == 30
+    assert store.record_plays("user", plays[30:], features, MoodAnalyzer()) == 18
+    summary = store.get("user").summary()
+    assert summary["plays"] == 48
+    assert summary["average_mood"] == pytest.approx(0.5)
+    assert summary["mood_volatility"] == pytest.approx(0.5)
+    assert summary["mood_percentiles"]["p90"] == pytest.approx(1.0, abs=0.01)
+    assert store.get("user", "2024-01-11").count == 24
+    assert store.get_days("user", 1, now=datetime(2024, 1, 10, 12, tzinfo=timezone.utc)).mood.mean == pytest.approx(1.0)
+
+def test_concurrent_writers_never_lose_updates():
+    store = MoodStatsStore(InMemoryRedis())
+    day = int(datetime(2024, 1, 10, tzinfo=timezone.utc).timestamp() * 1000)
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda i: store.record("user", [(day + i, 0.5, 0.5)] * 10), range(40)))
+    assert store.get("user").count == 400
+    assert store.get("user", "2024-01-10").count == 400
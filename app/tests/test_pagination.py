@@ -0,0 +1,56 @@
+import base64
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.pagination import cursor_snapshot, decode_cursor, encode_cursor, paginate, parse_fields
+
+def test_cursor_round_trips_offset_and_snapshot():
+    assert decode_cursor(None) == decode_cursor("") == 0
+    assert decode_cursor(encode_cursor(40)) == 40
+    assert "=" not in encode_cursor(40)
+    cursor = encode_cursor(5, "abc")
+    assert (decode_cursor(cursor), cursor_snapshot(cursor)) == (5, "abc")
+    assert cursor_snapshot(encode_cursor(5)) is None and cursor_snapshot(None) is None
+    with pytest.raises(ValueError):
+        decode_cursor("%%%")
+
+@pytest.mark.parametrize("payload", [b'{"o":-1}', b'{"o":"3"}', b'{"o":true}', b'{"x":1}', b"[1]", b"not json"])
+def test_malformed_cursors_are_rejected(payload):
+    cursor = base64.urlsafe_b64encode(payload).decode()
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+    with pytest.raises(ValueError):
+        cursor_snapshot(cursor)
+
+def test_paginate_walks_all_items_once():
+    items, cursor, seen = list(range(23)), None, []
+    while True:
+        page = paginate(items, cursor, 10, snapshot="s")
+        assert page.total == 23
+        seen += page.items
+        if page.next_cursor is None:
+            break
+        assert cursor_snapshot(page.next_cursor) == "s"
+        cursor = page.next_cursor
+    assert seen == items
+    assert paginate(items, encode_cursor(100), 10).items == []
+
+def test_parse_fields_keeps_allowed_order():
+    allowed = ("mood_score", "energy", "valence")
+    assert parse_fields(None, allowed) is None
+    assert parse_fields(" , ", allowed) is None
+    assert parse_fields("valence, mood_score", allowed) == ("mood_score", "valence")
+    with pytest.raises(ValueError, match="Unknown fields: bogus"):
+        parse_fields("valence,bogus", allowed)
+
+def test_pages_of_recent_mood_come_from_one_analysis():
+    from app.main import app
+
+    with TestClient(app) as client:
+        first = client.get("/api/v1/mood/recent", params={"page_size": 2}).json()
+        second = client.get("/api/v1/mood/recent", params={"page_size": 2, "cursor": first["next_cursor"]}).json()
+        assert second["overall_mood"] == first["overall_mood"]
+        assert second["tracks"] != first["tracks"] and second["total_tracks"] == 5
+        expired = encode_cursor(2, "unknown")
+        assert client.get("/api/v1/mood/recent", params={"cursor": expired}).status_code == 400
@@ -0,0 +1,44 @@
+import json
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from app.core import responses
+from app.core.pagination import paginate
+from app.core.responses import LAYOUT_COLUMNAR, FastJSONResponse, analysis_content, dumps
+from app.schemas.mood import MoodAnalysis, TrackMood
+
+@pytest.fixture
+def analysis():
+    tracks = [TrackMood(mood_score=i / 10, energy=0.5, valence=1 - i / 10) for i in range(7)]
+    return MoodAnalysis(overall_mood=0.3, average_energy=0.5, mood_trend=[0.1, 0.25], tracks=tracks)
+
+def test_orjson_and_stdlib_encoders_agree(monkeypatch):
+    content = {
+        "mood": 0.1 + 0.2,
+        "name": "Sigur Rós ✓",
+        "scores": np.array([0.25, 1.5, 3.0]),
+        "count": np.int64(3),
+        "at": datetime(2024, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc),
+        "nested": [{"a": None, "b": True}],
+        7: "int key",
+    }
+    if responses.orjson is None:
+        pytest.skip("orjson is not installed")
+    fast = dumps(content)
+    monkeypatch.setattr(responses, "orjson", None)
+    assert dumps(content) == fast
+    assert json.loads(fast)["scores"] == [0.25, 1.5, 3.0]
+    with pytest.raises(ValueError):
+        dumps({"mood": float("nan")})
+
+def test_columnar_layout_transposes_the_page(analysis):
+    page = paginate(analysis.tracks, None, 3)
+    content = json.loads(FastJSONResponse(analysis_content(analysis, LAYOUT_COLUMNAR, ("valence", "mood_score"), page)).body)
+    assert content["tracks"] == {"valence": [1.0, 0.9, 0.8], "mood_score": [0.0, 0.1, 0.2]}
+    assert (content["total_tracks"], content["overall_mood"]) == (7, 0.3)
+    rows = analysis_content(analysis, "rows", ("valence", "mood_score"), page)["tracks"]
+    assert [[row[field] for row in rows] for field in ("valence", "mood_score")] == list(content["tracks"].values())
+    # Without paging or fields the rows layout is the model itself
+    assert json.loads(dumps(analysis_content(analysis))) == json.loads(analysis.model_dump_json())
@@ -0,0 +1,101 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core import redis_client
+from app.core.config import Settings
+from app.core.redis_client import InMemoryRedis, create_redis_client
+from app.core.sessions import ServerSessionMiddleware, SessionStore
+
+@pytest.fixture
+def redis():
+    return InMemoryRedis()
+
+@pytest.fixture
+def client(redis):
+    app = FastAPI()
+    store = SessionStore(redis, ttl=3600)
+    app.add_middleware(ServerSessionMiddleware, store=store, session_cookie="mindbeat_session")
+
+    @app.get("/login")
+    async def login(request: Request):
+        request.session["access_token"] = "token"
+        return {}
+
+    @app.get("/relogin")
+    async def relogin(request: Request):
+        request.session.regenerate_id()
+        request.session["access_token"] = "new token"
+        return {}
+
+    @app.get("/me")
+    async def me(request: Request):
+        return dict(request.session)
+
+    @app.get("/logout")
+    async def logout(request: Request):
+        request.session.clear()
+        return {}
+
+    return TestClient(app)
+
+def test_cookie_only_carries_session_id(client, redis):
+    response = client.get("/login")
+    session_id = response.cookies["mindbeat_session"]
+    assert "token" not in response.headers["set-cookie"]
+    assert redis.get(f"session:{session_id}") == '{"access_token": "token"}'
+    assert client.get("/me").json() == {"access_token": "token"}
+
+def test_unchanged_session_is_not_rewritten(client, redis):
+    client.get("/login")
+    writes = []
+    setex = redis.setex
+    redis.setex = lambda *args: writes.append(args) or setex(*args)
+
+    response = client.get("/me")
+    assert response.json() == {"access_token": "token"}
+    assert "set-cookie" not in response.headers
+    assert writes == []
+
+def test_logout_deletes_session(client, redis):
+    client.get("/login")
+    response = client.get("/logout")
+    assert "Max-Age=0" in response.headers["set-cookie"]
+    assert list(redis.scan_iter("session:*")) == []
+    assert client.get("/me").json() == {}
+
+def test_unknown_session_id_starts_empty_session(client):
+    client.cookies.set("mindbeat_session", "forged")
+    assert client.get("/me").json() == {}
+
+def test_session_deleted_elsewhere_ends_despite_local_copy(client, redis):
+    session_id = client.get("/login").cookies["mindbeat_session"]
+    assert client.get("/me").json() == {"access_token": "token"}
+    # Logged out through another worker
+    SessionStore(redis, ttl=3600).delete(session_id)
+    assert client.get("/me").json() == {}
+
+def test_corrupt_session_counts_as_no_session(client, redis):
+    client.cookies.set("mindbeat_session", "broken")
+    redis.set("session:broken", "{not json")
+    assert client.get("/me").json() == {}
+
+def test_regenerated_session_gets_a_new_id(client, redis):
+    old_id = client.get("/login").cookies["mindbeat_session"]
+    new_id = client.get("/relogin").cookies["mindbeat_session"]
+    assert new_id != old_id
+    assert redis.get(f"session:{old_id}") is None
+    assert client.get("/me").json() == {"access_token": "new token"}
+
+def test_sessions_use_real_redis_when_configured_or_in_production(monkeypatch):
+    monkeypatch.setattr(redis_client, "settings", Settings(_env_file=None))
+    assert isinstance(create_redis_client(), InMemoryRedis)
+    monkeypatch.setattr(redis_client, "settings", Settings(_env_file=None, REDIS_HOST="redis"))
+    assert not isinstance(create_redis_client(), InMemoryRedis)
+    monkeypatch.setattr(redis_client, "settings", Settings(_env_file=None, ENVIRONMENT="production"))
+    assert not isinstance(create_redis_client(), InMemoryRedis)
+    monkeypatch.setattr(
+        redis_client, "settings", Settings(_env_file=None, ENVIRONMENT="production", REDIS_BACKEND="memory")
+    )
+    with pytest.raises(RuntimeError):
+        create_redis_client()
@@ -0,0 +1,14 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+def test_cold_start_within_budget_and_lazy():
+    result = subprocess.run(
+        [sys.executable, "scripts/check_import_time.py", "--runs", "1", "--top", "0"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
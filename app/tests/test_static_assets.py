@@ -0,0 +1,63 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.static_assets import StaticAssets, etag_matches, negotiate_encoding
+
+CSS = "body { color: #333; }\n" * 200
+
+@pytest.fixture
+def assets(tmp_path):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "app.css").write_text(CSS)
+    (tmp_path / ".hidden").write_text("secret")
+    assets = StaticAssets(str(tmp_path), prefix="/static", max_age=3600)
+    assert assets.build() == 1
+    return assets
+
+@pytest.fixture
+def client(assets):
+    app = FastAPI()
+    app.mount("/static", assets)
+    return TestClient(app)
+
+def test_fingerprinted_urls_are_immutable(assets, client):
+    url = assets.url("css/app.css")
+    assert url.startswith("/static/css/app.") and url.endswith(".css") and url != "/static/css/app.css"
+    assert assets.url("missing.js") == "/static/missing.js"
+    response = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert response.text == CSS
+    assert response.headers["cache-control"] == "public, max-age=3600, immutable"
+    assert response.headers["content-type"].startswith("text/css")
+    # The original name still works but must be revalidated
+    assert client.get("/static/css/app.css").headers["cache-control"] == "no-cache"
+    assert client.get("/static/.hidden").status_code == 404
+    assert client.post(url).status_code == 405
+
+def test_encoding_negotiation_gives_each_variant_its_etag(assets, client):
+    assert negotiate_encoding("gzip;q=0.5, br", ["br", "gzip"]) == "br"
+    assert negotiate_encoding("br;q=0, *;q=0.1", ["br", "gzip"]) == "gzip"
+    assert negotiate_encoding("", ["br", "gzip"]) == "identity"
+    url = assets.url("css/app.css")
+    etags = {}
+    for encoding in ("identity", "gzip", "br"):
+        response = client.get(url, headers={"Accept-Encoding": encoding})
+        assert response.headers.get("content-encoding", "identity") == encoding
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.text == CSS
+        etags[encoding] = response.headers["etag"]
+    assert len(set(etags.values())) == 3
+    head = client.head(url, headers={"Accept-Encoding": "gzip"})
+    assert head.content == b"" and int(head.headers["content-length"]) == len(gzip.compress(CSS.encode(), 9, mtime=0))
+
+def test_conditional_requests_compare_weakly_and_per_encoding(assets, client):
+    url = assets.url("css/app.css")
+    etag = client.get(url, headers={"Accept-Encoding": "gzip"}).headers["etag"]
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": if_none_match})
+        assert response.status_code == 304 and response.headers["etag"] == etag
+    # The gzip ETag does not validate the brotli variant
+    assert client.get(url, headers={"Accept-Encoding": "br", "If-None-Match": etag}).status_code == 200
+    assert not etag_matches('"a", W/"b"', '"c"') and not etag_matches("", '"c"')
@@ -0,0 +1,114 @@
+import pytest
+from fastapi import HTTPException
+
+from app.core.auth import TokenCipher, get_session_user, set_session_user
+from app.core.redis_client import InMemoryRedis
+from app.services import sync
+from app.services.spotify import SpotifyService
+from app.services.sync import RateBudget, SyncScheduler
+
+NOW = 1_700_000_000.0
+
+@pytest.fixture
+def redis():
+    return InMemoryRedis()
+
+@pytest.fixture
+def scheduler(redis):
+    return SyncScheduler(redis, RateBudget(redis, "sync:budget", rate=2), min_interval=300, max_interval=3600)
+
+def test_claims_due_users_once_earliest_first(redis, scheduler):
+    other = SyncScheduler(redis, scheduler.budget)
+    for i, user_id in enumerate(["c", "a", "b"]):
+        scheduler.register(user_id, "token", now=NOW - 1000 + i)
+    redis.zadd(scheduler.due_key, {"c": NOW - 50, "a": NOW - 30, "b": NOW - 10})
+    scheduler.register("later", "token", now=NOW)
+    assert scheduler.claim_due(2, now=NOW) == ["c", "a"]
+    assert other.claim_due(10, now=NOW) == ["b"]
+    assert scheduler.claim_due(10, now=NOW) == []
+
+def test_unfinished_claims_run_out(redis, scheduler):
+    scheduler.register("a", "token", now=NOW)
+    redis.zadd(scheduler.due_key, {"a": NOW})
+    assert scheduler.claim_due(10, now=NOW) == ["a"]
+    # The sync never finished, e.g. its worker crashed
+    assert scheduler.claim_due(10, now=NOW + 299) == []
+    assert scheduler.claim_due(10, now=NOW + 300) == ["a"]
+
+def test_unchanged_token_skips_registration(redis, scheduler):
+    scheduler.register("a", "token", now=NOW)
+    redis.delete(scheduler._key("a"))
+    scheduler.register("a", "token", now=NOW)
+    assert redis.hgetall(scheduler._key("a")) == {}
+    scheduler.register("a", "refreshed token", now=NOW)
+    assert redis.hgetall(scheduler._key("a"))["access_token"]
+    scheduler.unregister("a")
+    scheduler.register("a", "refreshed token", now=NOW)
+    assert redis.zcard(scheduler.due_key) == 1
+
+def test_interval_adapts_to_listening_rate(scheduler):
+    assert scheduler.next_interval(0.0) == 3600
+    assert scheduler.next_interval(10 / 3600) == 3600
+    assert scheduler.next_interval(20 / 3600) == pytest.approx(1800)
+    assert scheduler.next_interval(1.0) == 300
+
+def test_rate_budget_is_shared_and_pausable(redis):
+    first, second = RateBudget(redis, "budget", rate=2), RateBudget(redis, "budget", rate=2)
+    assert first.try_acquire(NOW + 0.1) == 0
+    assert second.try_acquire(NOW + 0.2) == 0
+    assert first.try_acquire(NOW + 0.5) == pytest.approx(0.5)
+    assert second.try_acquire(NOW + 1.0) == 0
+    second.pause(30, now=NOW + 1.0)
+    assert first.try_acquire(NOW + 2.0) == pytest.approx(29.0)
+
+@pytest.mark.asyncio
+async def test_sync_records_plays_and_backs_off_when_rate_limited(redis, scheduler, monkeypatch):
+    items = [{"played_at": "2023-11-14T22:00:00Z", "track": {"id": f"t{i}"}} for i in range(5)]
+    recorded = []
+
+    async def fetch(self, limit):
+        return items
+
+    async def store(spotify, user_id, items, region=None):
+        recorded.append((user_id, region))
+        return [(0, item["track"]["id"]) for item in items]
+
+    async def profile(self):
+        return {"id": "user", "country": "SE"}
+
+    monkeypatch.setattr(SpotifyService, "fetch_recently_played", fetch)
+    monkeypatch.setattr(SpotifyService, "get_current_user", profile)
+    monkeypatch.setattr(sync, "store_recent_plays", store)
+    scheduler.register("user", "token", now=NOW)
+    assert await scheduler.sync_user("user", now=NOW) == 5
+    assert recorded == [("user", "SE")]
+    assert redis.hgetall("sync:user:user")["country"] == "SE"
+    assert NOW + 240 <= redis.zrangebyscore(scheduler.due_key, "-inf", "+inf", withscores=True)[0][1] <= NOW + 4320
+
+    async def rate_limited(self, limit):
+        raise HTTPException(status_code=429, detail="Too many requests")
+
+    monkeypatch.setattr(SpotifyService, "fetch_recently_played", rate_limited)
+    assert await scheduler.sync_user("user", now=NOW) == 0
+    assert scheduler.budget.try_acquire(NOW + 1) == pytest.approx(29.0)
+    scheduler.redis.hset("sync:user:user", "last_seen", NOW - 15 * 86400)
+    assert await scheduler.sync_user("user", now=NOW) is None
+    assert redis.zcard(scheduler.due_key) == 0
+
+def test_session_user_is_bound_to_its_token():
+    session = {"access_token": "first"}
+    set_session_user(session, "alice")
+    assert get_session_user(session) == "alice"
+    # Another account logs in on the same browser
+    session["access_token"] = "second"
+    assert get_session_user(session) is None
+
+@pytest.mark.asyncio
+async def test_tokens_are_stored_encrypted(redis, scheduler):
+    scheduler.register("user", "access", "refresh", expires_at=NOW + 3600, now=NOW)
+    stored = redis.hgetall("sync:user:user")
+    assert "access" not in stored["access_token"] and "refresh" not in stored["refresh_token"]
+    assert await scheduler._access_token("user", stored, NOW) == "access"
+    # Tokens stored under another SECRET_KEY are unusable
+    scheduler.cipher = TokenCipher("rotated")
+    assert await scheduler._access_token("user", stored, NOW) is None
@@ -0,0 +1,60 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core import templating
+from app.core.templating import STREAM_CHUNK_SIZE, FragmentCache, TemplateRenderer
+
+@pytest.fixture
+def renderer(tmp_path):
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "tracks.html").write_text(
+        '{% cache "tracks", user_key %}{{ user_key }}:{{ tracks | join(",") }}{% endcache %}'
+    )
+    (tmp_path / "templates" / "page.html").write_text(
+        "<ul>{% for row in rows %}<li>{{ row }} {{ request.url.path }}</li>{% endfor %}</ul>"
+    )
+    return TemplateRenderer(str(tmp_path / "templates"), bytecode_cache_dir=str(tmp_path))
+
+def test_fragment_cache_expires_and_evicts_least_recently_used(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(templating.time, "monotonic", lambda: now[0])
+    cache = FragmentCache(max_entries=2, ttl=10)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"
+    cache.set("c", "C")
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("A", None, "C")
+    now[0] = 10.5
+    assert cache.get("a") is None and cache.get("c") is None
+
+def test_fragments_are_scoped_by_their_key(renderer):
+    template = renderer.get_template("tracks.html")
+    assert template.render(user_key="alice", tracks=["one"]) == "alice:one"
+    # Cached per key: a later render with other data reuses the fragment...
+    assert template.render(user_key="alice", tracks=["two"]) == "alice:one"
+    # ...but never another user's
+    assert template.render(user_key="bob", tracks=["three"]) == "bob:three"
+    renderer.env.fragment_cache.clear()
+    assert template.render(user_key="alice", tracks=["two"]) == "alice:two"
+
+def test_streamed_output_matches_rendered_response(renderer):
+    app = FastAPI()
+    rows = [f"row {i}" for i in range(2000)]
+
+    @app.get("/rendered")
+    async def rendered(request: Request):
+        return renderer.TemplateResponse("page.html", {"request": request, "rows": rows})
+
+    @app.get("/streamed")
+    async def streamed(request: Request):
+        return renderer.StreamingTemplateResponse("page.html", {"request": request, "rows": rows})
+
+    client = TestClient(app)
+    expected = client.get("/rendered").text.replace("/rendered", "/streamed")
+    response = client.get("/streamed")
+    assert len(expected) > 2 * STREAM_CHUNK_SIZE
+    assert response.text == expected
+    assert response.headers["content-type"].startswith("text/html")
+    with pytest.raises(ValueError):
+        renderer.StreamingTemplateResponse("page.html", {"rows": rows})
@@ -0,0 +1,38 @@
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse
+
+from app.core.config import Settings
+from app.core.tracing import ServerTimingMiddleware, record_span
+
+def make_client(**options):
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware, **options)
+
+    @app.get("/")
+    async def index():
+        record_span("redis", 0.002)
+        return PlainTextResponse("ok")
+
+    return TestClient(app)
+
+def test_server_timing_header_reports_spans():
+    response = make_client().get("/")
+    assert response.headers["server-timing"].startswith('redis;dur=2.0;desc="1 calls", total;dur=')
+
+def test_hidden_header_still_logs_slow_requests(caplog, monkeypatch):
+    client = make_client(slow_request_threshold=0, expose_header=False)
+    # The app's logging config stops app loggers propagating to caplog
+    logger = logging.getLogger("app.core.tracing")
+    monkeypatch.setattr(logger, "handlers", [caplog.handler])
+    with caplog.at_level(logging.WARNING, logger="app.core.tracing"):
+        response = client.get("/")
+    assert "server-timing" not in response.headers
+    assert any(record.spans_ms == {"redis": 2.0} for record in caplog.records)
+
+def test_server_timing_defaults_off_in_production():
+    assert Settings(_env_file=None).server_timing_enabled
+    assert not Settings(_env_file=None, ENVIRONMENT="production").server_timing_enabled
+    assert Settings(_env_file=None, ENVIRONMENT="production", SERVER_TIMING_ENABLED=True).server_timing_enabled
@@ -0,0 +1,160 @@
+"""Benchmark ``MoodAnalyzer.analyze_tracks`` throughput.
+
+Also times ``MoodAnalyzer.analyze_plays`` over a memory-mapped feature
+catalog, and batched ``EmbeddingIndex.similar`` queries.
+
+Usage:
+    python -m benchmarks.bench_analyzer --tracks 10 1000 100000 1000000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from typing import Any, Dict, List, Sequence
+
+from app.services.mood_analyzer import MoodAnalyzer
+from benchmarks.synthetic import audio_features, make_tracks, track_id
+
+DEFAULT_SIZES = (10, 100, 1000, 10000, 100000, 1000000)
+
+
+def run(sizes: Sequence[int] = DEFAULT_SIZES, seed: int = 0) -> List[Dict[str, Any]]:
+    """Time ``analyze_tracks`` for each batch size.
+
+    Each size is repeated until about a second of work has been done, and
+    the best run is reported.
+
+    Returns:
+        List[Dict[str, Any]]: One result per size
+    """
+    analyzer = MoodAnalyzer()
+    loop = asyncio.new_event_loop()
+    results = []
+    try:
+        for size in sizes:
+            tracks = make_tracks(size, seed)
+            timings = []
+            deadline = time.perf_counter() + 1.0
+            while len(timings) < 3 or (time.perf_counter() < deadline and len(timings) < 50):
+                start = time.perf_counter()
+                loop.run_until_complete(analyzer.analyze_tracks(tracks))
+                timings.append(time.perf_counter() - start)
+            best = min(timings)
+            results.append({
+                "name": f"analyze_tracks[{size}]",
+                "tracks": size,
+                "runs": len(timings),
+                "best_ms": best * 1000,
+                "tracks_per_second": size / best,
+            })
+    finally:
+        loop.close()
+    return results
+
+
+def run_catalog(
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    catalog_tracks: int = 100000,
+    seed: int = 0
+) -> List[Dict[str, Any]]:
+    """Time ``analyze_plays`` over a catalog for each number of plays.
+
+    Args:
+        sizes: Numbers of plays to analyze
+        catalog_tracks: Number of tracks in the catalog
+        seed: Seed for features and plays
+
+    Returns:
+        List[Dict[str, Any]]: One result per size
+    """
+    from app.services.feature_catalog import FeatureCatalog, FeatureCatalogBuilder
+
+    rng = random.Random(seed)
+    builder = FeatureCatalogBuilder()
+    ids = [track_id(i) for i in range(catalog_tracks)]
+    for tid in ids:
+        builder.add(tid, audio_features(rng))
+    analyzer = MoodAnalyzer()
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "features.catalog")
+        builder.write(path)
+        with FeatureCatalog(path) as catalog:
+            row_scores = analyzer.score_catalog(catalog)
+            for size in sizes:
+                plays = [ids[rng.randrange(catalog_tracks)] for _ in range(size)]
+                timings = []
+                deadline = time.perf_counter() + 1.0
+                while len(timings) < 3 or (time.perf_counter() < deadline and len(timings) < 50):
+                    start = time.perf_counter()
+                    analyzer.analyze_plays(catalog, plays, row_scores)
+                    timings.append(time.perf_counter() - start)
+                best = min(timings)
+                results.append({
+                    "name": f"analyze_plays[{size}]",
+                    "tracks": size,
+                    "runs": len(timings),
+                    "best_ms": best * 1000,
+                    "tracks_per_second": size / best,
+                })
+    return results
+
+
+def run_similarity(
+    batches: Sequence[int] = (1, 100, 1000),
+    index_tracks: int = 100000,
+    k: int = 10,
+    seed: int = 0
+) -> List[Dict[str, Any]]:
+    """Time batched top-k similarity queries against an embedding index.
+
+    Args:
+        batches: Numbers of query vectors per call
+        index_tracks: Number of tracks in the index
+        k: Neighbours returned per query
+        seed: Seed for features and queries
+
+    Returns:
+        List[Dict[str, Any]]: One result per batch size
+    """
+    from app.services.embeddings import EmbeddingIndex
+
+    rng = random.Random(seed)
+    index = EmbeddingIndex(capacity=index_tracks)
+    index.add_features((track_id(i), audio_features(rng)) for i in range(index_tracks))
+    results = []
+    for batch in batches:
+        queries = index.vectors([track_id(rng.randrange(index_tracks)) for _ in range(batch)])
+        timings = []
+        deadline = time.perf_counter() + 1.0
+        while len(timings) < 3 or (time.perf_counter() < deadline and len(timings) < 50):
+            start = time.perf_counter()
+            index.similar(queries, k)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        results.append({
+            "name": f"similar[{batch}x{index_tracks}]",
+            "tracks": batch,
+            "runs": len(timings),
+            "best_ms": best * 1000,
+            "tracks_per_second": batch / best,
+        })
+    return results
+
+
+def main(argv: List[str] = None) -> None:
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tracks", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    args = parser.parse_args(argv)
+
+    print(f"{'benchmark':>24} {'best ms':>10} {'tracks/s':>12}")
+    for result in run(args.tracks) + run_catalog(args.tracks) + run_similarity():
+        print(f"{result['name']:>24} {result['best_ms']:>10.2f} {result['tracks_per_second']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark ``RedisCache`` codecs.
+
+Round-trips a cached analysis payload through every codec in
+``app.core.cache.CODECS`` against the in-memory Redis stand-in, so the
+numbers measure serialization and cache overhead rather than the network.
+
+Usage:
+    python -m benchmarks.bench_cache --tracks 10 1000 10000
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List, Sequence
+
+from app.core.cache import CODECS, RedisCache
+from app.core.redis_client import InMemoryRedis
+from app.services.mood_analyzer import MoodAnalyzer
+from benchmarks.synthetic import make_tracks
+
+DEFAULT_SIZES = (10, 1000, 10000)
+
+
+def _payload(size: int, seed: int) -> Dict[str, Any]:
+    loop = asyncio.new_event_loop()
+    try:
+        analysis = loop.run_until_complete(MoodAnalyzer().analyze_tracks(make_tracks(size, seed)))
+    finally:
+        loop.close()
+    return analysis.model_dump()
+
+
+def run(sizes: Sequence[int] = DEFAULT_SIZES, seed: int = 0) -> List[Dict[str, Any]]:
+    """Time ``set`` and ``get`` for each codec and payload size.
+
+    Returns:
+        List[Dict[str, Any]]: One result per codec and size
+    """
+    results = []
+    loop = asyncio.new_event_loop()
+    redis = InMemoryRedis()
+    try:
+        for size in sizes:
+            payload = _payload(size, seed)
+            repeat = max(5, 20000 // max(size, 1))
+            for name in CODECS:
+                cache = RedisCache(codec=name)
+                cache.redis = redis
+                key = f"bench:{name}:{size}"
+
+                async def round_trips() -> tuple:
+                    set_total = get_total = 0.0
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        await cache.set(key, payload)
+                        set_total += time.perf_counter() - start
+                        start = time.perf_counter()
+                        await cache.get(key)
+                        get_total += time.perf_counter() - start
+                    return set_total / repeat, get_total / repeat
+
+                set_s, get_s = min(loop.run_until_complete(round_trips()) for _ in range(3))
+                results.append({
+                    "name": f"cache[{name},{size}]",
+                    "codec": name,
+                    "tracks": size,
+                    "set_ms": set_s * 1000,
+                    "get_ms": get_s * 1000,
+                    "value_bytes": len(redis.get(cache.resolve(key))),
+                })
+    finally:
+        loop.close()
+    return results
+
+
+def main(argv: List[str] = None) -> None:
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tracks", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    args = parser.parse_args(argv)
+
+    print(f"{'codec':>8} {'tracks':>8} {'set ms':>9} {'get ms':>9} {'KB':>8}")
+    for result in run(args.tracks):
+        print(
+            f"{result['codec']:>8} {result['tracks']:>8} {result['set_ms']:>9.3f}"
+            f" {result['get_ms']:>9.3f} {result['value_bytes'] / 1024:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark response compression for dashboard and API payloads.
+
+Runs representative payloads through ``CompressionMiddleware`` in-process
+and reports bytes on the wire, server-side time, and the estimated
+transfer time at a given bandwidth.
+
+Usage:
+    python -m benchmarks.bench_compression --tracks 1000 --bandwidth-mbps 10
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.api.frontend import templates
+from app.core.compression import CompressionMiddleware
+from app.core.responses import analysis_content, dumps, LAYOUT_COLUMNAR
+from benchmarks.bench_response import make_analysis
+
+
+def dashboard_html(num_tracks: int) -> bytes:
+    """Render the dashboard template with synthetic data."""
+    scope = {"type": "http", "method": "GET", "path": "/dashboard", "headers": [], "session": {}}
+    templates.env.fragment_cache = None
+    context = {
+        "request": Request(scope),
+        "user_key": "bench",
+        "current_mood": {"primary_mood": "Energetic", "description": "Upbeat"},
+        "recent_tracks": [
+            {
+                "id": str(i),
+                "name": f"Track {i}",
+                "artist": f"Artist {i % 50}",
+                "image_url": f"https://i.scdn.co/image/{i:040x}",
+                "played_at": f"2025-03-27T10:{i % 60:02d}:00Z",
+            }
+            for i in range(num_tracks)
+        ],
+        "tracks_cursor": None,
+        "tracks_next_cursor": None,
+        "trend_data": {"labels": [f"Day {i}" for i in range(1, 8)], "values": [50] * 7},
+        "recommendations": "<p>Keep the energy high</p>",
+    }
+    return templates.get_template("dashboard.html").render(context).encode()
+
+
+async def run_once(app, accept_encoding: str) -> Tuple[int, float]:
+    """Run one request through ``app`` and return (body bytes, seconds)."""
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }
+    size = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    return size, time.perf_counter() - start
+
+
+def make_app(body: bytes, media_type: str):
+    """Build an ASGI app that always returns ``body``."""
+    async def app(scope, receive, send):
+        await Response(body, media_type=media_type)(scope, receive, send)
+    return app
+
+
+def main(argv: List[str] = None) -> None:
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tracks", type=int, default=1000)
+    parser.add_argument("--bandwidth-mbps", type=float, default=10.0)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    analysis = make_analysis(args.tracks)
+    payloads = [
+        ("dashboard html", dashboard_html(args.tracks), "text/html"),
+        ("analysis json", dumps(analysis_content(analysis)), "application/json"),
+        ("columnar json", dumps(analysis_content(analysis, LAYOUT_COLUMNAR)), "application/json"),
+    ]
+    bytes_per_ms = args.bandwidth_mbps * 1e6 / 8 / 1000
+
+    print(f"{'payload':<15} {'encoding':<9} {'bytes':>9} {'server ms':>10} {'transfer ms':>12} {'total ms':>9}")
+    loop = asyncio.new_event_loop()
+    for name, body, media_type in payloads:
+        inner = make_app(body, media_type)
+        compressed = CompressionMiddleware(inner)
+        for label, app, accept in (
+            ("none", inner, "identity"),
+            ("gzip", compressed, "gzip"),
+            ("br", compressed, "br"),
+        ):
+            timings = [loop.run_until_complete(run_once(app, accept)) for _ in range(args.repeat)]
+            size = timings[0][0]
+            server_ms = min(t for _, t in timings) * 1000
+            transfer_ms = size / bytes_per_ms
+            print(
+                f"{name:<15} {label:<9} {size:>9} {server_ms:>10.3f}"
+                f" {transfer_ms:>12.2f} {server_ms + transfer_ms:>9.2f}"
+            )
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark mood analysis response rendering.
+
+Compares FastAPI's default response path (dump, re-validate against
+``response_model``, serialize, ``json.dumps``) with the fast path in
+``app.core.responses``.
+
+Usage:
+    python -m benchmarks.bench_response --tracks 10 1000 10000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Callable, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.core.responses import LAYOUT_COLUMNAR, LAYOUT_ROWS, render_analysis
+from app.schemas.mood import MoodAnalysis, TrackMood
+
+
+def make_analysis(num_tracks: int, seed: int = 0) -> MoodAnalysis:
+    """Build a validated analysis with ``num_tracks`` synthetic tracks."""
+    rng = random.Random(seed)
+    tracks = [
+        TrackMood(
+            mood_score=rng.random(),
+            energy=rng.random(),
+            valence=rng.random()
+        )
+        for _ in range(num_tracks)
+    ]
+    return MoodAnalysis(
+        overall_mood=0.5,
+        average_energy=0.5,
+        mood_trend=[rng.random() for _ in range(7)],
+        tracks=tracks
+    )
+
+
+def time_per_call(func: Callable[[], object], repeat: int) -> float:
+    """Return the best average wall time of ``func`` in milliseconds."""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best * 1000
+
+
+def main(argv: List[str] = None) -> None:
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tracks", type=int, nargs="+", default=[10, 1000, 10000])
+    args = parser.parse_args(argv)
+
+    field = create_response_field(name="response", type_=MoodAnalysis)
+    loop = asyncio.new_event_loop()
+
+    print(f"{'tracks':>8} {'default ms':>11} {'rows ms':>9} {'columnar ms':>12} {'rows KB':>8} {'columnar KB':>12}")
+    for num_tracks in args.tracks:
+        analysis = make_analysis(num_tracks)
+        repeat = max(1, 20000 // max(num_tracks, 1))
+
+        def default_path():
+            content = loop.run_until_complete(
+                serialize_response(field=field, response_content=analysis)
+            )
+            return JSONResponse(content).body
+
+        default_ms = time_per_call(default_path, repeat)
+        rows_ms = time_per_call(lambda: render_analysis(analysis, LAYOUT_ROWS).body, repeat)
+        columnar_ms = time_per_call(lambda: render_analysis(analysis, LAYOUT_COLUMNAR).body, repeat)
+        rows_kb = len(render_analysis(analysis, LAYOUT_ROWS).body) / 1024
+        columnar_kb = len(render_analysis(analysis, LAYOUT_COLUMNAR).body) / 1024
+        print(
+            f"{num_tracks:>8} {default_ms:>11.3f} {rows_ms:>9.3f} {columnar_ms:>12.3f}"
+            f" {rows_kb:>8.1f} {columnar_kb:>12.1f}"
+        )
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark ``SpotifyService`` against the local mock Spotify server.
+
+Issues concurrent requests for recently played tracks and their audio
+features, the calls the dashboard makes, and reports latency percentiles
+and how many requests were rate limited.
+
+Usage:
+    python -m benchmarks.bench_spotify --requests 500 --concurrency 20 --latency-ms 20 --rate-limit 0.05
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List
+
+from fastapi import HTTPException
+
+from app.services.spotify import SpotifyService
+from benchmarks.mock_spotify import MockSpotifyConfig, MockSpotifyServer
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Return the ``q`` percentile (0-100) of ``values`` by nearest rank."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def _run(requests: int, concurrency: int, config: MockSpotifyConfig) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with MockSpotifyServer(config) as server:
+        service = SpotifyService("benchmark-token", base_url=server.base_url)
+
+        async def one() -> None:
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    data = await service._make_request("GET", "me/player/recently-played", params={"limit": 50})
+                    ids = [item["track"]["id"] for item in data["items"]]
+                    await service._make_request("GET", "audio-features", params={"ids": ",".join(ids)})
+                    status = 200
+                except HTTPException as e:
+                    status = e.status_code
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+        upstream_requests = sum(server.stats.values())
+
+    return {
+        "name": f"spotify[c={concurrency},latency={config.latency * 1000:g}ms,429={config.rate_limit:g}]",
+        "requests": requests,
+        "concurrency": concurrency,
+        "latency_ms": config.latency * 1000,
+        "rate_limit": config.rate_limit,
+        "upstream_requests": upstream_requests,
+        "rate_limited": statuses.get(429, 0),
+        "errors": sum(count for status, count in statuses.items() if status not in (200, 429)),
+        "requests_per_second": requests / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def run(
+    requests: int = 200,
+    concurrency: int = 10,
+    latency_ms: float = 10.0,
+    rate_limit: float = 0.05
+) -> List[Dict[str, Any]]:
+    """Run the benchmark once with the given mock behaviour.
+
+    Returns:
+        List[Dict[str, Any]]: A single result
+    """
+    config = MockSpotifyConfig(latency=latency_ms / 1000, rate_limit=rate_limit)
+    return [asyncio.run(_run(requests, concurrency, config))]
+
+
+def main(argv: List[str] = None) -> None:
+    """Run the benchmark and print the result."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=10.0)
+    parser.add_argument("--rate-limit", type=float, default=0.05, help="Probability of a 429 response")
+    args = parser.parse_args(argv)
+
+    for result in run(args.requests, args.concurrency, args.latency_ms, args.rate_limit):
+        for key, value in result.items():
+            print(f"{key:<20} {value:.2f}" if isinstance(value, float) else f"{key:<20} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Load test the dashboard flow end to end against the mock Spotify API.
+
+By default the app is served in-process by uvicorn, with
+``SPOTIFY_API_BASE_URL`` pointed at a mock server running on its own
+thread, and one session is created per simulated user. The driver shares
+the app's event loop, so for absolute numbers run the app on its own and
+pass ``--url``; sessions are then written through ``get_redis_client()``,
+which must reach the same Redis as the app (set ``REDIS_URL`` in both).
+
+Usage:
+    python -m benchmarks.load_dashboard --requests 1000 --concurrency 50 --profile realistic
+    python -m benchmarks.load_dashboard --url http://127.0.0.1:8000 --requests 1000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+from app.core.config import settings
+from app.core.redis_client import get_redis_client
+from app.core.sessions import SessionStore
+from benchmarks.bench_spotify import percentile
+from benchmarks.mock_spotify import MockSpotifyServer, add_arguments, config_from_args
+
+
+def create_sessions(users: int) -> List[str]:
+    """Store a logged-in session per user and return their session IDs."""
+    store = SessionStore(get_redis_client(), ttl=settings.SESSION_MAX_AGE)
+    session_ids = []
+    for user in range(users):
+        session_id = store.new_session_id()
+        store.save(session_id, {"access_token": f"load-test-user-{user}"})
+        session_ids.append(session_id)
+    return session_ids
+
+
+async def drive(
+    url: str,
+    session_ids: List[str],
+    requests: int,
+    concurrency: int,
+    path: str = "/dashboard"
+) -> Dict[str, Any]:
+    """Issue ``requests`` GETs for ``path``, ``concurrency`` at a time.
+
+    Requests rotate through the sessions; each latency covers the full
+    response body.
+
+    Returns:
+        Dict[str, Any]: Throughput, status counts and latency percentiles
+    """
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(session_ids[i % len(session_ids)])
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as client:
+        async def worker() -> None:
+            while not queue.empty():
+                session_id = queue.get_nowait()
+                cookies = {settings.SESSION_COOKIE_NAME: session_id}
+                start = time.perf_counter()
+                try:
+                    async with client.get(url + path, cookies=cookies, allow_redirects=False) as response:
+                        await response.read()
+                        status = response.status
+                except aiohttp.ClientError:
+                    status = 0
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "path": path,
+        "requests": requests,
+        "concurrency": concurrency,
+        "users": len(session_ids),
+        "statuses": statuses,
+        "requests_per_second": requests / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+
+async def run_in_process(args: argparse.Namespace) -> Dict[str, Any]:
+    """Serve the app with uvicorn in this process and drive it."""
+    import uvicorn
+
+    mock = MockSpotifyServer(config_from_args(args))
+    mock.start_in_thread()
+    settings.SPOTIFY_API_BASE_URL = mock.base_url
+
+    from app.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    try:
+        while not server.started:
+            if serving.done():
+                serving.result()
+            await asyncio.sleep(0.05)
+        session_ids = create_sessions(args.users)
+        url = f"http://127.0.0.1:{args.port}"
+        if args.warmup:
+            await drive(url, session_ids, args.warmup, args.concurrency)
+        result = await drive(url, session_ids, args.requests, args.concurrency)
+    finally:
+        server.should_exit = True
+        await serving
+        mock.stop_thread()
+    result["spotify_statuses"] = mock.stats
+    return result
+
+
+async def run_against(args: argparse.Namespace) -> Dict[str, Any]:
+    """Drive an app that is already running at ``args.url``."""
+    session_ids = create_sessions(args.users)
+    if args.warmup:
+        await drive(args.url, session_ids, args.warmup, args.concurrency)
+    return await drive(args.url, session_ids, args.requests, args.concurrency)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the load test and print the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Base URL of a running app; served in-process when omitted")
+    parser.add_argument("--port", type=int, default=8010, help="Port for the in-process app")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--users", type=int, default=50, help="Distinct logged-in sessions")
+    parser.add_argument("--warmup", type=int, default=50, help="Requests sent before measuring")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.url:
+        result = asyncio.run(run_against(args))
+    else:
+        result = asyncio.run(run_in_process(args))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
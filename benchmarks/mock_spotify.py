@@ -0,0 +1,329 @@
+"""Local stand-in for the Spotify Web API.
+
+Serves ``me``, ``me/player/recently-played`` and ``audio-features`` from a
+deterministic synthetic catalog, with configurable latency, error and rate
+limit profiles, so the dashboard flow can be load tested without touching
+Spotify. Point the app at it with ``SPOTIFY_API_BASE_URL``:
+
+    python -m benchmarks.mock_spotify --port 8765 --profile realistic
+    SPOTIFY_API_BASE_URL=http://127.0.0.1:8765/v1 uvicorn app.main:app
+
+Every user has an endless listening history: play ``n`` happened
+``n * play_interval`` seconds after ``HISTORY_START`` and is a catalog
+track picked by a per-user permutation, so pages are stable across
+requests and ``before``/``after`` cursors behave like Spotify's.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from aiohttp import web
+
+from app.core.responses import dumps
+from benchmarks.synthetic import audio_features, play_history_item, track_id
+
+HISTORY_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+# Coprime with every catalog size that is not a multiple of it
+_PERMUTATION_STRIDE = 1_000_003
+
+
+@dataclass(frozen=True)
+class MockSpotifyConfig:
+    """Behaviour of the mock server.
+
+    Attributes:
+        latency: Fixed delay added to every response in seconds
+        jitter: Extra delay in seconds, exponentially distributed with this mean
+        error_rate: Probability of answering with one of ``error_statuses``
+        error_statuses: Statuses used for injected errors
+        rate_limit: Probability of answering with 429
+        retry_after: Value of the Retry-After header on 429 responses
+        catalog_size: Number of distinct tracks in the catalog
+        play_interval: Seconds between plays in every user's history
+        seed: Seed for injected latency and failures
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    error_statuses: Sequence[int] = (500, 502, 503)
+    rate_limit: float = 0.0
+    retry_after: int = 1
+    catalog_size: int = 5_000_000
+    play_interval: int = 180
+    seed: int = 0
+
+
+PROFILES: Dict[str, MockSpotifyConfig] = {
+    "instant": MockSpotifyConfig(),
+    "realistic": MockSpotifyConfig(latency=0.06, jitter=0.04),
+    "degraded": MockSpotifyConfig(latency=0.25, jitter=0.5, error_rate=0.05),
+    "throttled": MockSpotifyConfig(latency=0.06, jitter=0.04, rate_limit=0.2, retry_after=2),
+}
+
+
+def _json(content: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> web.Response:
+    return web.Response(body=dumps(content), status=status, headers=headers, content_type="application/json")
+
+
+def _error(status: int, message: str, headers: Optional[Dict[str, str]] = None) -> web.Response:
+    return _json({"error": {"status": status, "message": message}}, status, headers)
+
+
+def _epoch_ms(moment: datetime) -> int:
+    return int(moment.timestamp() * 1000)
+
+
+class ListeningHistory:
+    """Deterministic, endless listening history of one user."""
+
+    def __init__(self, user: str, config: MockSpotifyConfig):
+        self.config = config
+        digest = hashlib.blake2b(user.encode(), digest_size=8).digest()
+        self.offset = int.from_bytes(digest, "big") % config.catalog_size
+        self.interval_ms = config.play_interval * 1000
+        self.start_ms = _epoch_ms(HISTORY_START)
+
+    def latest(self) -> int:
+        """Index of the most recent play."""
+        return max(0, (int(time.time() * 1000) - self.start_ms) // self.interval_ms)
+
+    def played_at_ms(self, play: int) -> int:
+        """Time of a play in Unix milliseconds."""
+        return self.start_ms + play * self.interval_ms
+
+    def track_index(self, play: int) -> int:
+        """Catalog entry played at index ``play``."""
+        return (play * _PERMUTATION_STRIDE + self.offset) % self.config.catalog_size
+
+    def page(self, limit: int, before: Optional[int] = None, after: Optional[int] = None) -> List[int]:
+        """Play indexes of one page, most recent first.
+
+        Args:
+            limit: Maximum number of plays
+            before: Only plays strictly before this Unix time in milliseconds
+            after: Only plays strictly after this Unix time in milliseconds
+        """
+        latest = self.latest()
+        if after is not None:
+            oldest = max(0, (after - self.start_ms) // self.interval_ms + 1)
+            newest = min(latest, oldest + limit - 1)
+        else:
+            newest = latest
+            if before is not None:
+                newest = min(latest, math.ceil((before - self.start_ms) / self.interval_ms) - 1)
+            oldest = max(0, newest - limit + 1)
+        return list(range(newest, oldest - 1, -1))
+
+    def item(self, play: int) -> Dict[str, Any]:
+        """Spotify play history object for a play."""
+        played_at = HISTORY_START + timedelta(milliseconds=play * self.interval_ms)
+        return play_history_item(self.track_index(play), played_at)
+
+
+def create_app(config: Optional[MockSpotifyConfig] = None) -> web.Application:
+    """Create the mock server application.
+
+    Routes are served under ``/v1``, so ``SPOTIFY_API_BASE_URL`` should be
+    ``http://host:port/v1``. ``app["stats"]`` counts requests by status.
+    """
+    config = config or MockSpotifyConfig()
+    rng = random.Random(config.seed)
+    app = web.Application()
+    app["config"] = config
+    app["stats"] = {}
+
+    @web.middleware
+    async def behaviour(request: web.Request, handler) -> web.StreamResponse:
+        delay = config.latency + (rng.expovariate(1 / config.jitter) if config.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            response = _error(401, "No token provided")
+        elif config.rate_limit and rng.random() < config.rate_limit:
+            response = _error(429, "API rate limit exceeded", {"Retry-After": str(config.retry_after)})
+        elif config.error_rate and rng.random() < config.error_rate:
+            response = _error(rng.choice(config.error_statuses), "Server error")
+        else:
+            response = await handler(request)
+        stats = request.app["stats"]
+        stats[response.status] = stats.get(response.status, 0) + 1
+        return response
+
+    def user_of(request: web.Request) -> str:
+        return request.headers["Authorization"][len("Bearer "):]
+
+    async def me(request: web.Request) -> web.Response:
+        user = user_of(request)
+        user_id = track_id(ListeningHistory(user, config).offset)
+        return _json({"id": user_id, "display_name": f"User {user_id[-6:]}", "type": "user"})
+
+    async def recently_played(request: web.Request) -> web.Response:
+        try:
+            limit = int(request.query.get("limit", 20))
+            before = int(request.query["before"]) if "before" in request.query else None
+            after = int(request.query["after"]) if "after" in request.query else None
+        except ValueError:
+            return _error(400, "Invalid query parameter")
+        if not 1 <= limit <= 50:
+            return _error(400, "Invalid limit")
+        if before is not None and after is not None:
+            return _error(400, "Only one of before or after may be given")
+
+        history = ListeningHistory(user_of(request), config)
+        plays = history.page(limit, before, after)
+        href = f"{request.scheme}://{request.host}{request.path}"
+        cursors = None
+        next_url = None
+        if plays:
+            cursors = {
+                "after": str(history.played_at_ms(plays[0])),
+                "before": str(history.played_at_ms(plays[-1])),
+            }
+            if plays[-1] > 0:
+                next_url = f"{href}?before={cursors['before']}&limit={limit}"
+        return _json({
+            "items": [history.item(play) for play in plays],
+            "next": next_url,
+            "cursors": cursors,
+            "limit": limit,
+            "href": f"{href}?{request.query_string}",
+        })
+
+    async def audio_features_handler(request: web.Request) -> web.Response:
+        ids = [i for i in request.query.get("ids", "").split(",") if i]
+        if not ids or len(ids) > 100:
+            return _error(400, "Between 1 and 100 ids must be requested")
+        features = [
+            {"id": id_, "type": "audio_features", **audio_features(random.Random(id_))}
+            for id_ in ids
+        ]
+        return _json({"audio_features": features})
+
+    app.middlewares.append(behaviour)
+    app.router.add_get("/v1/me", me)
+    app.router.add_get("/v1/me/player/recently-played", recently_played)
+    app.router.add_get("/v1/audio-features", audio_features_handler)
+    return app
+
+
+class MockSpotifyServer:
+    """Run the mock server on a local port.
+
+    Used as an async context manager it serves from the current event
+    loop; ``start_in_thread`` serves from a loop of its own instead, so
+    the mock does not compete with the code under test::
+
+        async with MockSpotifyServer(PROFILES["realistic"]) as server:
+            service = SpotifyService(token, base_url=server.base_url)
+    """
+
+    def __init__(self, config: Optional[MockSpotifyConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.app = create_app(config)
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to use in place of ``https://api.spotify.com/v1``."""
+        return f"http://{self.host}:{self.port}/v1"
+
+    @property
+    def stats(self) -> Dict[int, int]:
+        """Responses served so far by status."""
+        return dict(self.app["stats"])
+
+    async def start(self) -> None:
+        """Start serving; a free port is picked when ``port`` is 0."""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_in_thread(self) -> None:
+        """Start serving from a background thread with its own event loop."""
+        self._loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def serve() -> None:
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.start())
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, name="mock-spotify", daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def stop_thread(self) -> None:
+        """Stop a server started with ``start_in_thread``."""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+    async def __aenter__(self) -> "MockSpotifyServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+
+def config_from_args(args: argparse.Namespace) -> MockSpotifyConfig:
+    """Build a config from a profile and the overrides added by ``add_arguments``."""
+    overrides = {
+        "latency": None if args.latency_ms is None else args.latency_ms / 1000,
+        "jitter": None if args.jitter_ms is None else args.jitter_ms / 1000,
+        "error_rate": args.error_rate,
+        "rate_limit": args.rate_limit,
+        "retry_after": args.retry_after,
+        "catalog_size": args.catalog_size,
+    }
+    return replace(PROFILES[args.profile], **{k: v for k, v in overrides.items() if v is not None})
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the mock behaviour options to a parser."""
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="instant")
+    parser.add_argument("--latency-ms", type=float, help="Override the profile's fixed latency")
+    parser.add_argument("--jitter-ms", type=float, help="Override the profile's mean extra latency")
+    parser.add_argument("--error-rate", type=float, help="Probability of a 5xx response")
+    parser.add_argument("--rate-limit", type=float, help="Probability of a 429 response")
+    parser.add_argument("--retry-after", type=int)
+    parser.add_argument("--catalog-size", type=int)
+
+
+def main(argv: List[str] = None) -> None:
+    """Serve the mock API until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    web.run_app(create_app(config_from_args(args)), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
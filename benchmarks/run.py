@@ -0,0 +1,143 @@
+"""Run the benchmark suite and save the results as JSON.
+
+Each run writes ``benchmarks/results/<timestamp>_<commit>.json`` with the
+environment it ran in, so results from different commits can be compared:
+
+    python -m benchmarks.run --quick
+    python -m benchmarks.run --compare benchmarks/results/a.json benchmarks/results/b.json
+
+Only compare results recorded on the same machine.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+from benchmarks import bench_analyzer, bench_cache, bench_spotify
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# Metric name to True when higher is better
+METRICS = {
+    "best_ms": False,
+    "tracks_per_second": True,
+    "set_ms": False,
+    "get_ms": False,
+    "requests_per_second": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+}
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(quick: bool = False) -> Dict[str, Any]:
+    """Run every benchmark.
+
+    Args:
+        quick: Use small sizes, for smoke testing the suite
+
+    Returns:
+        Dict[str, Any]: Environment and results, keyed by benchmark
+    """
+    analyzer_sizes = (10, 1000) if quick else bench_analyzer.DEFAULT_SIZES
+    cache_sizes = (10, 1000) if quick else bench_cache.DEFAULT_SIZES
+    spotify_requests = 20 if quick else 200
+    similarity_tracks = 10000 if quick else 100000
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "quick": quick,
+        "results": {
+            "analyzer": bench_analyzer.run(analyzer_sizes) + bench_analyzer.run_catalog(analyzer_sizes),
+            "similarity": bench_analyzer.run_similarity(index_tracks=similarity_tracks),
+            "cache": bench_cache.run(cache_sizes),
+            "spotify": bench_spotify.run(requests=spotify_requests),
+        },
+    }
+
+
+def save(report: Dict[str, Any], directory: str = RESULTS_DIR) -> str:
+    """Write a report to ``directory`` and return its path."""
+    os.makedirs(directory, exist_ok=True)
+    stamp = time.strftime("%Y%m%dT%H%M%S")
+    path = os.path.join(directory, f"{stamp}_{report['commit']}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.1) -> List[str]:
+    """Compare two reports.
+
+    Args:
+        baseline: Earlier report
+        current: Later report
+        threshold: Relative change above which a metric is flagged
+
+    Returns:
+        List[str]: One line per metric present in both reports
+    """
+    lines = []
+    for suite, results in current["results"].items():
+        previous = {r["name"]: r for r in baseline["results"].get(suite, [])}
+        for result in results:
+            before = previous.get(result["name"])
+            if before is None:
+                continue
+            for metric, higher_is_better in METRICS.items():
+                if metric not in result or not before.get(metric):
+                    continue
+                change = (result[metric] - before[metric]) / before[metric]
+                worse = change < -threshold if higher_is_better else change > threshold
+                better = change > threshold if higher_is_better else change < -threshold
+                flag = "REGRESSION" if worse else "improved" if better else ""
+                lines.append(
+                    f"{result['name']:<40} {metric:<20} {before[metric]:>12.3f} "
+                    f"{result[metric]:>12.3f} {change:>+8.1%} {flag}"
+                )
+    return lines
+
+
+def main(argv: List[str] = None) -> None:
+    """Run the suite, or compare two saved reports."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="Run with small sizes")
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"))
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        print(f"{baseline['commit']} -> {current['commit']}")
+        lines = compare(baseline, current, args.threshold)
+        print("\n".join(lines))
+        if any(line.endswith("REGRESSION") for line in lines):
+            sys.exit(1)
+        return
+
+    report = run_suite(args.quick)
+    print(f"Saved {save(report, args.output_dir)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Deterministic synthetic data for benchmarks.
+
+Values follow the ranges used by ``MoodAnalyzer.analyze_debug_data`` so
+the benchmarks exercise the same shapes as the debug endpoint.
+"""
+
+import random
+import string
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List
+
+from app.schemas.mood import AudioFeatures
+
+_ID_ALPHABET = string.ascii_letters + string.digits
+
+
+def track_id(index: int) -> str:
+    """Return a deterministic 22-character, Spotify-style track ID."""
+    chars = []
+    value = index
+    for _ in range(22):
+        value, digit = divmod(value, len(_ID_ALPHABET))
+        chars.append(_ID_ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def audio_features(rng: random.Random) -> Dict[str, Any]:
+    """Return a Spotify-style audio features payload."""
+    return {
+        "valence": rng.uniform(0.3, 0.9),
+        "energy": rng.uniform(0.4, 0.8),
+        "danceability": rng.random(),
+        "instrumentalness": rng.random(),
+        "tempo": rng.uniform(60.0, 180.0),
+        "mode": rng.randint(0, 1),
+    }
+
+
+def iter_tracks(num_tracks: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """Yield track dicts in the shape ``MoodAnalyzer.analyze_tracks`` expects.
+
+    Features are built with ``model_construct`` since the generated values
+    are valid by construction and validation would dominate large runs.
+    """
+    rng = random.Random(seed)
+    for index in range(num_tracks):
+        yield {
+            "id": track_id(index),
+            "features": AudioFeatures.model_construct(**audio_features(rng)),
+        }
+
+
+def make_tracks(num_tracks: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Return ``num_tracks`` synthetic tracks, see :func:`iter_tracks`."""
+    return list(iter_tracks(num_tracks, seed))
+
+
+def catalog_track(index: int) -> Dict[str, Any]:
+    """Return the Spotify track object for catalog entry ``index``.
+
+    The same index always yields the same track, so catalogs of any size
+    need no storage.
+    """
+    image = f"https://i.scdn.co/image/{index:040x}"
+    return {
+        "id": track_id(index),
+        "name": f"Track {index}",
+        "artists": [{"id": track_id(index // 10), "name": f"Artist {index // 10}"}],
+        "album": {
+            "name": f"Album {index // 12}",
+            "images": [
+                {"url": image, "height": 640, "width": 640},
+                {"url": f"{image}s", "height": 64, "width": 64},
+            ],
+        },
+        "duration_ms": 120000 + (index * 7919) % 180000,
+    }
+
+
+def play_history_item(track_index: int, played_at: datetime) -> Dict[str, Any]:
+    """Return a Spotify recently-played item for catalog entry ``track_index``."""
+    return {
+        "track": catalog_track(track_index),
+        "played_at": played_at.astimezone(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+    }
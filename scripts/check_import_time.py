@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Check the cold-start import time of the application.
+
+Imports ``app.main`` in fresh interpreters with ``-X importtime`` and fails
+when the median import time exceeds the budget, or when a module that
+should only be loaded on demand is imported at startup.
+
+Usage:
+    python scripts/check_import_time.py --budget-ms 2500 --runs 3 --top 15
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", 3000))
+
+# Heavy modules that must load lazily, on first use
+LAZY_MODULES = ["numpy", "spotipy", "redis", "requests"]
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+def profile_import(module: str = "app.main") -> Tuple[float, Dict[str, int]]:
+    """Import a module in a fresh interpreter.
+
+    Args:
+        module: Module to import
+
+    Returns:
+        Tuple[float, Dict[str, int]]: Cumulative import time of ``module`` in
+            milliseconds, and self time in microseconds of every module loaded
+    """
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    self_times: Dict[str, int] = {}
+    total_ms = 0.0
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        self_times[name] = int(self_us)
+        if name == module and not indent:
+            total_ms = int(cumulative_us) / 1000
+    return total_ms, self_times
+
+def eagerly_loaded(self_times: Dict[str, int]) -> List[str]:
+    """Return the lazy modules that were imported at startup."""
+    return [
+        name for name in LAZY_MODULES
+        if any(loaded == name or loaded.startswith(name + ".") for loaded in self_times)
+    ]
+
+def main(argv: List[str] = None) -> int:
+    """Run the check and return the exit code."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="Show the slowest modules by self time")
+    args = parser.parse_args(argv)
+
+    totals = []
+    self_times: Dict[str, int] = {}
+    for _ in range(args.runs):
+        total_ms, self_times = profile_import()
+        totals.append(total_ms)
+    median_ms = statistics.median(totals)
+
+    print(f"app.main import time: {median_ms:.0f}ms (median of {args.runs}, budget {args.budget_ms:.0f}ms)")
+    for name, self_us in sorted(self_times.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f}ms  {name}")
+
+    failed = False
+    eager = eagerly_loaded(self_times)
+    if eager:
+        print(f"FAIL: imported at startup, should load lazily: {', '.join(eager)}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f"FAIL: import time over budget by {median_ms - args.budget_ms:.0f}ms")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())